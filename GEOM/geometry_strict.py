@@ -1,10 +1,12 @@
 # GEOM/geometry_strict.py — strict幾何（4D対応 + Γ再評価RK4 + オプションキャッシュ）
 from __future__ import annotations
-from typing import Dict, List, Tuple
-import math, random, os
+from typing import Dict, List, Optional, Tuple
+import math, random, os, threading
+from collections import OrderedDict
 from functools import lru_cache
 
 _USE_CACHE = (os.getenv("GEOM_CACHE","0")=="1")
+_USE_WARM = (os.getenv("GEOM_WARM","0")=="1")
 
 def clamp01(x: float) -> float:
     return max(0.0, min(1.0, x))
@@ -135,25 +137,124 @@ def rk4_step(state: List[float], h: float) -> List[float]:
     k4 = deriv([state[i] + h*k3[i] for i in range(len(state))])
     return [state[i] + (h/6.0)*(k1[i]+2*k2[i]+2*k3[i]+k4[i]) for i in range(len(state))]
 
-def geodesic_shoot(q1: Dict[str,float], q2: Dict[str,float], steps: int=200, iters: int=12, lr: float=0.2) -> Tuple[float, List[List[float]]]:
+class _WarmCache:
+    """収束済み初速 v の置き場。キーは (x0, xT) を cell 幅で量子化した8次元セル。
+    引くときは同じセル＋直近 recent 件から (x0, xT) の L1 距離が最小のものを選ぶ（radius 以内）。"""
+    def __init__(self, cell: float=0.05, cap: int=4096, per_cell: int=4, recent: int=8, radius: float=0.2) -> None:
+        self.cell, self.cap, self.per_cell, self.radius = cell, cap, per_cell, radius
+        self._cells: "OrderedDict[Tuple[int,...], List[tuple]]" = OrderedDict()  # 要素: (x0, xT, v, J)
+        self._recent: List[tuple] = []
+        self._nrecent = recent
+        self._lock = threading.Lock()
+        self.stats = {"shots": 0, "hits": 0, "iters_hit": 0, "iters_miss": 0, "misses": 0, "unconverged": 0}
+    def _key(self, x0: List[float], xT: List[float]) -> Tuple[int,...]:
+        return tuple(int(math.floor(c / self.cell)) for c in x0 + xT)
+    def seed(self, x0: List[float], xT: List[float]) -> Optional[Tuple[List[float], Optional[List[List[float]]]]]:
+        """最も近い解の初速を端点のずれで平行移動して返す: v = v_c + (xT-xT_c) - (x0-x0_c)。
+        その解で推定した端点ヤコビアン（Broyden）も一緒に返す。"""
+        with self._lock:
+            cands = list(self._cells.get(self._key(x0, xT), ())) + self._recent
+            best, bd = None, self.radius
+            for e in cands:
+                d = sum(abs(a-b) for a, b in zip(x0 + xT, e[0] + e[1]))
+                if d < bd: best, bd = e, d
+            if best is None: return None
+            a0, aT, va, Ja = best
+            return [va[i] + (xT[i]-aT[i]) - (x0[i]-a0[i]) for i in range(len(x0))], Ja
+    def put(self, x0: List[float], xT: List[float], v: List[float], J: Optional[List[List[float]]]=None) -> None:
+        e = (x0[:], xT[:], v[:], J); k = self._key(x0, xT)
+        with self._lock:
+            lst = self._cells.pop(k, [])
+            lst.append(e); del lst[:-self.per_cell]
+            self._cells[k] = lst
+            while len(self._cells) > self.cap: self._cells.popitem(last=False)
+            self._recent.append(e); del self._recent[:-self._nrecent]
+    def record(self, hit: bool, used: int, converged: bool) -> None:
+        with self._lock:   # 並列の呼び出し元（geomd・裏検証スレッド等）から来るので集計もロック下で
+            st = self.stats; st["shots"] += 1
+            if not converged: st["unconverged"] += 1
+            if hit: st["hits"] += 1; st["iters_hit"] += used
+            else: st["misses"] += 1; st["iters_miss"] += used
+    def snapshot(self) -> Dict[str,int]:
+        with self._lock: return dict(self.stats)
+    def clear(self) -> None:
+        with self._lock:
+            self._cells.clear(); self._recent.clear()
+            for k in self.stats: self.stats[k] = 0
+
+_WARM = _WarmCache()
+
+def warm_stats() -> Dict[str,float]:
+    """ウォームスタートの集計。iters_saved_est は「ミス時の平均反復数 − ヒット時の平均反復数」× ヒット数。"""
+    st = _WARM.snapshot()
+    mh = st["iters_hit"] / st["hits"] if st["hits"] else 0.0
+    mm = st["iters_miss"] / st["misses"] if st["misses"] else 0.0
+    st.update(mean_iters_hit=mh, mean_iters_miss=mm, iters_saved_est=max(0.0, (mm - mh) * st["hits"]))
+    return st
+
+def warm_clear() -> None:
+    _WARM.clear()
+
+def _integrate(x0: List[float], v0: List[float], steps: int) -> Tuple[float, List[List[float]]]:
+    n = len(x0)
+    state = x0 + v0; path = [x0[:]]; L = 0.0; h = 1.0/steps
+    for _ in range(steps):
+        state = rk4_step(state, h)
+        x_next = state[0:n]
+        mid = [(x_next[i]+path[-1][i])*0.5 for i in range(n)]
+        q_mid = unembed(mid)
+        g = metric_g(q_mid)
+        dx = [x_next[i]-path[-1][i] for i in range(n)]
+        quad = 0.0
+        for i in range(n):
+            for j in range(n):
+                quad += dx[i]*g[i][j]*dx[j]
+        L += math.sqrt(max(1e-12, quad))
+        path.append(x_next[:])
+    return L, path
+
+def _shoot_warm(x0: List[float], xT: List[float], steps: int, iters: int, tol: float) -> Tuple[float, List[List[float]]]:
+    """収束まで撃つ版。端点ヤコビアン J=∂end/∂v を Broyden で推定し（初期値は I か既解の J）、
+    v -= step·J⁻¹·err で補正する（誤差が増えたら step を半分）。err<tol の解を J ごとキャッシュする。
+    戻り値の長さは「最後に撃った（=収束した）経路」の長さ。キャッシュの当たり外れで収束解は変わらない。"""
+    n = len(x0)
+    sd = _WARM.seed(x0, xT); hit = sd is not None
+    v, J = sd if sd is not None else ([xT[i]-x0[i] for i in range(n)], None)
+    J = [row[:] for row in J] if J else [[1.0 if i == j else 0.0 for j in range(n)] for i in range(n)]
+    step, prev, used, conv = 1.0, float("inf"), 0, False
+    L, path = 0.0, []; last = None
+    for _ in range(max(1, iters)):
+        L, path = _integrate(x0, v, steps); used += 1
+        err = [path[-1][i]-xT[i] for i in range(n)]
+        en = math.sqrt(sum(e*e for e in err))
+        if last is not None:  # Broyden: J += (Δerr - J·Δv) Δvᵀ / |Δv|²
+            dv, de = last[0], [err[i]-last[1][i] for i in range(n)]
+            dd = sum(x*x for x in dv)
+            if dd > 1e-18:
+                r = [de[i] - sum(J[i][j]*dv[j] for j in range(n)) for i in range(n)]
+                for i in range(n):
+                    for j in range(n): J[i][j] += r[i]*dv[j]/dd
+        if en < tol:
+            _WARM.put(x0, xT, v, J); conv = True; break
+        if en > prev: step *= 0.5
+        prev = en
+        Ji = mat_inv(J)
+        dv = [-step*sum(Ji[i][j]*err[j] for j in range(n)) for i in range(n)]
+        for i in range(n): v[i] += dv[i]
+        last = (dv, err)
+    _WARM.record(hit, used, conv)
+    return L, path
+
+def geodesic_shoot(q1: Dict[str,float], q2: Dict[str,float], steps: int=200, iters: int=12, lr: float=0.2,
+                   warm: Optional[bool]=None, tol: float=1e-4) -> Tuple[float, List[List[float]]]:
+    """端点 q2 に当たる測地線を射撃法で求める。
+    warm=False（既定、GEOM_WARM=1 で True）: 従来どおり lr 減衰の補正を iters 回。反復中の最短長を返す。
+    warm=True: 近い既解から初速を引き継ぎ、全量補正で err<tol まで撃つ（反復数は warm_stats() で確認）。"""
     x0 = embed(q1); xT = embed(q2); n = len(x0)
+    if _USE_WARM if warm is None else warm:
+        return _shoot_warm(x0, xT, steps, iters, tol)
     v = [xT[i]-x0[i] for i in range(n)]
-    def integrate(v0):
-        state = x0 + v0; path = [x0[:]]; L = 0.0; h = 1.0/steps
-        for _ in range(steps):
-            state = rk4_step(state, h)
-            x_next = state[0:n]
-            mid = [(x_next[i]+path[-1][i])*0.5 for i in range(n)]
-            q_mid = unembed(mid)
-            g = metric_g(q_mid)
-            dx = [x_next[i]-path[-1][i] for i in range(n)]
-            quad = 0.0
-            for i in range(n):
-                for j in range(n):
-                    quad += dx[i]*g[i][j]*dx[j]
-            L += math.sqrt(max(1e-12, quad))
-            path.append(x_next[:])
-        return L, path
+    integrate = lambda v0: _integrate(x0, v0, steps)
     best_L, best_path = float("inf"), None
     for _ in range(iters):
         L, path = integrate(v)
@@ -169,7 +270,8 @@ def geodesic_shoot(q1: Dict[str,float], q2: Dict[str,float], steps: int=200, ite
         lr *= 0.9
     return best_L, best_path if best_path is not None else []
 
-def dist_strict(q1: Dict[str,float], q2: Dict[str,float], steps: int=200, iters: int=12) -> float:
-    L, _path = geodesic_shoot(q1, q2, steps=steps, iters=iters)
+def dist_strict(q1: Dict[str,float], q2: Dict[str,float], steps: int=200, iters: int=12,
+                warm: Optional[bool]=None) -> float:
+    L, _path = geodesic_shoot(q1, q2, steps=steps, iters=iters, warm=warm)
     return L
 
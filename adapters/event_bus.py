@@ -0,0 +1,313 @@
+# adapters/event_bus.py — プロセス内イベントバス（センサー定期取得・有界キュー・バッチ配送・アクチュエータ実行）
+"""
+流れ:
+  Sensor.pull()（周期ごと, スケジューラ1本）─┐
+  bus.push(name, ev) / bus.emitter(name)  ──┴→ 発生源ごとの有界キュー → 配送スレッドがまとめて deliver(batch)
+  bus.act(name, timeout=..., **kw) → ワーカープールで Actuator.act を実行（Future）
+キューの方針（発生源ごと）:
+  "oldest" 満杯なら最古を捨てる / "new" 満杯なら新着を捨てる /
+  "coalesce" 同じ key（ev["key"]、無ければ発生源名）の未配送イベントを最新で上書き（満杯時は最古を捨てる）
+イベント:
+  dict。バスが "src"（発生源名）と "ts"（time.time()）を補う。pull() が None/空 dict を返したら何も積まない。
+配送:
+  deliver(batch) は配送スレッドから呼ばれる（同時に1つだけ）。batch は最大 batch_max 件で、
+  最初の1件から batch_window_s 待って溜まった分をまとめる。例外は数えて捨てる（バスは止めない）。
+  agent に流すなら agent_sink(agent)（type "user"/"kpi" は core.conv_replay と同じ形）。
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional
+import heapq, threading, time
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as _FutTimeout
+from adapters.io_if import AdapterRegistry
+
+Event = Dict[str, Any]
+POLICIES = ("oldest", "new", "coalesce")
+
+class _Lat:
+    """レイテンシ統計（秒）。"""
+    __slots__ = ("n", "last", "max", "ewma")
+    def __init__(self) -> None: self.n = 0; self.last = self.max = self.ewma = 0.0
+    def add(self, x: float) -> None:
+        self.n += 1; self.last = x; self.max = max(self.max, x)
+        self.ewma = x if self.n == 1 else 0.9*self.ewma + 0.1*x
+    def as_dict(self, p: str) -> Dict[str,float]:
+        return {f"{p}_last_s": self.last, f"{p}_max_s": self.max, f"{p}_ewma_s": self.ewma}
+
+class _SourceQueue:
+    def __init__(self, maxsize: int, policy: str) -> None:
+        if policy not in POLICIES: raise ValueError(f"unknown queue policy {policy}")
+        self.maxsize, self.policy = max(1, maxsize), policy
+        self.q: "OrderedDict[Any, Event]" = OrderedDict()  # coalesce 用に key で引ける順序付き辞書
+        self.seq = 0
+        self.m = {"pushed": 0, "dropped": 0, "coalesced": 0, "delivered": 0, "depth_max": 0}
+        self.lag = _Lat()
+        # pull 側（センサーのみ）
+        self.interval_s: Optional[float] = None
+        self.pulls = 0; self.pull_errors = 0; self.overruns = 0; self.pull_lat = _Lat()
+
+    def put(self, ev: Event) -> bool:
+        m = self.m; m["pushed"] += 1
+        if self.policy == "coalesce":
+            k = ev.get("key", ev["src"])
+            if k in self.q:
+                ev["_t"] = self.q[k]["_t"]  # 位置（配送順）と遅延の起点は最初の到着のまま
+                self.q[k] = ev; m["coalesced"] += 1
+                return True
+        else:
+            self.seq += 1; k = self.seq
+        if len(self.q) >= self.maxsize:
+            m["dropped"] += 1
+            if self.policy == "new": return False
+            self.q.popitem(last=False)
+        self.q[k] = ev
+        m["depth_max"] = max(m["depth_max"], len(self.q))
+        return True
+
+    def metrics(self) -> Dict[str,Any]:
+        out = {**self.m, "depth": len(self.q), "maxsize": self.maxsize, "policy": self.policy, **self.lag.as_dict("lag")}
+        if self.interval_s is not None:
+            out.update(interval_s=self.interval_s, pulls=self.pulls, pull_errors=self.pull_errors,
+                       overruns=self.overruns, **self.pull_lat.as_dict("pull"))
+        return out
+
+class _ActStats:
+    __slots__ = ("calls", "errors", "timeouts", "inflight", "lat")
+    def __init__(self) -> None: self.calls = self.errors = self.timeouts = self.inflight = 0; self.lat = _Lat()
+
+class EventBus:
+    """AdapterRegistry の Sensor/Actuator を動かすバス。start() 前に schedule()/configure() しておく。"""
+    def __init__(self, registry: AdapterRegistry, deliver: Callable[[List[Event]], Any],
+                 batch_max: int=64, batch_window_s: float=0.05, act_workers: int=4,
+                 default_maxsize: int=256, default_policy: str="oldest") -> None:
+        if default_policy not in POLICIES: raise ValueError(f"unknown queue policy {default_policy}")
+        self.registry, self.deliver = registry, deliver
+        self.batch_max, self.batch_window_s = max(1, batch_max), max(0.0, batch_window_s)
+        self.default_maxsize, self.default_policy = default_maxsize, default_policy
+        self._src: Dict[str,_SourceQueue] = {}
+        self._order: "deque[str]" = deque()  # 配送時の巡回順（発生源間の公平性）
+        self._cv = threading.Condition()
+        self._due: List[tuple] = []         # (next_due, name)
+        self._stop = threading.Event()
+        self._busy = False; self._flushing = 0
+        self._th: List[threading.Thread] = []
+        self._pool = ThreadPoolExecutor(max_workers=max(1, act_workers), thread_name_prefix="bus-act")
+        self._acts: Dict[str,_ActStats] = {}
+        self._m = {"batches": 0, "events": 0, "deliver_errors": 0}
+        self._dlat = _Lat()
+
+    # ---- 設定 ----
+    def configure(self, name: str, maxsize: Optional[int]=None, policy: Optional[str]=None) -> None:
+        """発生源 name のキューを作る/変える（既存の中身は捨てない。縮めた分は次の put で方針どおり落ちる）。"""
+        with self._cv:
+            s = self._src.get(name)
+            if s is None:
+                s = self._src[name] = _SourceQueue(maxsize or self.default_maxsize, policy or self.default_policy)
+                self._order.append(name)
+            else:
+                if policy is not None:
+                    if policy not in POLICIES: raise ValueError(f"unknown queue policy {policy}")
+                    s.policy = policy
+                if maxsize is not None: s.maxsize = max(1, maxsize)
+
+    def schedule(self, name: str, interval_s: float, maxsize: Optional[int]=None, policy: Optional[str]=None) -> None:
+        """registry のセンサー name を interval_s 秒ごとに pull する。"""
+        if interval_s <= 0: raise ValueError("interval_s must be > 0")
+        self.registry.sensor(name)  # 未登録なら KeyError
+        self.configure(name, maxsize, policy)
+        with self._cv:
+            first = self._src[name].interval_s is None
+            self._src[name].interval_s = float(interval_s)
+            if first: heapq.heappush(self._due, (time.monotonic(), name))
+            self._cv.notify_all()
+
+    # ---- 積む側 ----
+    def push(self, name: str, ev: Event) -> bool:
+        """イベントを発生源 name のキューへ。捨てられたら False。"""
+        ev = dict(ev); ev.setdefault("src", name); ev.setdefault("ts", time.time())
+        ev["_t"] = time.monotonic()
+        with self._cv:
+            if name not in self._src: self.configure(name)
+            ok = self._src[name].put(ev)
+            self._cv.notify_all()
+        return ok
+
+    def emitter(self, name: str) -> "_Emitter":
+        """EventSensor.push を満たす受け口（外部コールバックにそのまま渡せる）。"""
+        self.configure(name)
+        return _Emitter(self, name)
+
+    # ---- 起動/停止 ----
+    def start(self) -> "EventBus":
+        for tgt, nm in ((self._poll_loop, "bus-poll"), (self._deliver_loop, "bus-deliver")):
+            t = threading.Thread(target=tgt, name=nm, daemon=True); t.start(); self._th.append(t)
+        return self
+
+    def flush(self, timeout: Optional[float]=None) -> bool:
+        """キューが空になり配送中のバッチも終わるまで待つ（集約待ちはしない）。"""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cv:
+            self._flushing += 1; self._cv.notify_all()
+            try:
+                while self._busy or any(s.q for s in self._src.values()):
+                    left = None if end is None else end - time.monotonic()
+                    if left is not None and left <= 0: return False
+                    self._cv.wait(left)
+            finally:
+                self._flushing -= 1
+        return True
+
+    def stop(self, drain: bool=True, timeout: Optional[float]=None) -> None:
+        if drain and self._th: self.flush(timeout)
+        self._stop.set()
+        with self._cv: self._cv.notify_all()
+        for t in self._th: t.join(timeout)
+        self._th = []
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---- スケジューラ ----
+    def _poll_loop(self) -> None:
+        while not self._stop.is_set():
+            with self._cv:
+                if not self._due:
+                    self._cv.wait(0.5); continue
+                due, name = self._due[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cv.wait(wait); continue
+                heapq.heappop(self._due)
+                s = self._src[name]
+            t0 = time.monotonic()
+            try:
+                ev = self.registry.sensor(name).pull()
+            except Exception:
+                ev = None
+                with self._cv: s.pull_errors += 1
+            dt = time.monotonic() - t0
+            with self._cv:
+                s.pulls += 1; s.pull_lat.add(dt)
+                nxt = due + s.interval_s
+                now = time.monotonic()
+                if nxt <= now:  # 遅れた分は詰めて撃たない（次の周期へ飛ばす）
+                    s.overruns += 1
+                    nxt = now + s.interval_s - ((now - due) % s.interval_s)
+                heapq.heappush(self._due, (nxt, name))
+            if ev: self.push(name, ev)
+
+    # ---- 配送 ----
+    def _take_batch(self) -> Optional[List[Event]]:
+        with self._cv:
+            while True:
+                if self._stop.is_set(): return None
+                oldest = min((next(iter(s.q.values()))["_t"] for s in self._src.values() if s.q), default=None)
+                if oldest is None:
+                    self._cv.wait(0.5); continue
+                n = sum(len(s.q) for s in self._src.values())
+                wait = oldest + self.batch_window_s - time.monotonic()
+                if wait > 0 and n < self.batch_max and not self._flushing:
+                    self._cv.wait(wait); continue
+                # 発生源を巡回して1件ずつ取る（1つの騒がしいセンサーがバッチを占有しないように）
+                batch: List[Event] = []; now = time.monotonic()
+                while len(batch) < self.batch_max and any(s.q for s in self._src.values()):
+                    name = self._order[0]; self._order.rotate(-1)
+                    s = self._src[name]
+                    if not s.q: continue
+                    _, ev = s.q.popitem(last=False)
+                    s.m["delivered"] += 1; s.lag.add(now - ev.pop("_t"))
+                    batch.append(ev)
+                self._busy = True
+                return batch
+
+    def _deliver_loop(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None: return
+            t0 = time.monotonic()
+            try:
+                self.deliver(batch)
+            except Exception:
+                with self._cv: self._m["deliver_errors"] += 1
+            finally:
+                with self._cv:
+                    self._m["batches"] += 1; self._m["events"] += len(batch)
+                    self._dlat.add(time.monotonic() - t0)
+                    self._busy = False; self._cv.notify_all()
+
+    # ---- アクチュエータ ----
+    def act(self, name: str, timeout: Optional[float]=None, **kw) -> Future:
+        """Actuator.act(**kw) をプールで実行する。timeout 秒を超えたら Future は TimeoutError で失敗する
+        （スレッドは止められないので本体は走り切る。その間 inflight に数える）。"""
+        a = self.registry.actuator(name)
+        with self._cv: st = self._acts.setdefault(name, _ActStats()); st.calls += 1; st.inflight += 1
+        out: Future = Future()
+        t0 = time.monotonic()
+        def run() -> Dict[str,Any]:
+            try:
+                return a.act(**kw)
+            finally:
+                with self._cv: st.inflight -= 1; st.lat.add(time.monotonic() - t0)
+        settled = [False]
+        def settle(fn: Callable, x: Any) -> bool:  # 時間切れと完了のどちらか先の方だけが out を確定させる
+            with self._cv:
+                if settled[0]: return False
+                settled[0] = True
+            fn(x); return True
+        inner = self._pool.submit(run)
+        timer = None
+        if timeout is not None:
+            def expire() -> None:
+                if settle(out.set_exception, TimeoutError(f"actuator {name} timed out after {timeout}s")):
+                    with self._cv: st.timeouts += 1
+            timer = threading.Timer(timeout, expire); timer.daemon = True; timer.start()
+        def done(f: Future) -> None:
+            if timer is not None: timer.cancel()
+            e = f.exception()
+            if e is not None:
+                with self._cv: st.errors += 1
+                settle(out.set_exception, e)
+            else:
+                settle(out.set_result, f.result())
+        inner.add_done_callback(done)
+        return out
+
+    def act_sync(self, name: str, timeout: Optional[float]=None, **kw) -> Dict[str,Any]:
+        """act() を待つ版。失敗/時間切れは {"ok": False, "error": ...} で返す。"""
+        try:
+            return self.act(name, timeout=timeout, **kw).result()
+        except (_FutTimeout, TimeoutError) as e:
+            return {"ok": False, "error": "timeout", "detail": str(e)}
+        except Exception as e:
+            return {"ok": False, "error": type(e).__name__, "detail": str(e)}
+
+    # ---- 計測 ----
+    def metrics(self) -> Dict[str,Any]:
+        with self._cv:
+            return {
+                "bus": {**self._m, "batch_max": self.batch_max, **self._dlat.as_dict("deliver")},
+                "sources": {n: s.metrics() for n, s in self._src.items()},
+                "actuators": {n: {"calls": a.calls, "errors": a.errors, "timeouts": a.timeouts,
+                                  "inflight": a.inflight, **a.lat.as_dict("lat")} for n, a in self._acts.items()},
+            }
+
+class _Emitter:
+    __slots__ = ("bus", "name")
+    def __init__(self, bus: EventBus, name: str) -> None: self.bus, self.name = bus, name
+    def push(self, event: Event) -> None: self.bus.push(self.name, event)
+
+def agent_sink(agent: Any, lock: Optional[Any]=None, explain: bool=False) -> Callable[[List[Event]], None]:
+    """バッチを agent に流す deliver を作る。
+    type "user"（text）→ respond、"kpi"（task/before/after）→ RewardBridge.report、その他は監査に件数だけ残す。
+    lock: 他スレッドと agent を共有するなら渡す（RewardBridge.lock 等）。"""
+    from core.reward_bridge import RewardBridge
+    rb = RewardBridge(agent)
+    lk = lock if lock is not None else rb.lock
+    def deliver(batch: List[Event]) -> None:
+        other: Dict[str,int] = {}
+        with lk:
+            for ev in batch:
+                typ = ev.get("type")
+                if typ == "user": agent.respond(str(ev.get("text", "")), explain=explain)
+                elif typ == "kpi": rb.report(ev["task"], ev["before"], ev["after"], metrics=ev.get("metrics"), d_norm=ev.get("d_norm"))
+                else: other[ev["src"]] = other.get(ev["src"], 0) + 1
+            if other: agent._audit.emit("adapter_events", counts=other)
+    return deliver
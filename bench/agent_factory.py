@@ -0,0 +1,23 @@
+# bench/agent_factory.py — 個体生成スループット（__init__ 直呼び vs AgentFactory.create）
+import sys, time
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile, load_card_from_json_str, DEMO_CARD_JSON
+from core.agent_factory import AgentFactory
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+card = load_card_from_json_str(DEMO_CARD_JSON)
+card.meta.valid_from, card.meta.valid_to = "2020-01-01T00:00:00Z", "2099-01-01T00:00:00Z"
+
+def bench(label, make):
+    make(0)  # warm-up
+    t0 = time.perf_counter()
+    for i in range(N): make(i)
+    dt = time.perf_counter() - t0
+    print(f"{label:10s} {N} agents: {dt:.3f}s  {N/dt:,.0f} agents/s")
+
+def direct(i):
+    a = WisePartnerAgent(seed=i, profile=Profile.MOBILE)
+    a.cards_activate(card, mode="lenient")
+
+f = AgentFactory(profile=Profile.MOBILE, cards=[card], card_mode="lenient")
+bench("__init__", direct)
+bench("factory", lambda i: f.create(seed=i))
@@ -0,0 +1,29 @@
+# bench/audit_ingest.py — 監査 SQLite ストアの取り込み速度（emit 側のコストと書き込みスループット）
+import os, sys, tempfile, time
+from core.audit_store import AuditStore
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000  # 既定の queue_max 以下（超えると最古から捨てる）
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(prefix="wpaudit"), "audit.db")
+    st = AuditStore(path)
+    a = WisePartnerAgent(profile=Profile.DESKTOP); a.set_audit_store(st)
+    emit = a._audit.emit
+    t0 = time.perf_counter(); ts0 = time.time()
+    for i in range(N):  # respond 1回分の監査イベントに近い形
+        emit("respond", turn=i, conf=0.5 + (i % 50) / 100.0, d_norm=0.01, act="answer", mode="geo", len=120, in_domain=True)
+    t_emit = time.perf_counter() - t0
+    st.flush(); t_all = time.perf_counter() - t0
+    s = st.stats()
+    print(f"emit      {t_emit / N * 1e6:.2f} µs/event (caller side)")
+    print(f"ingest    {N / t_all:,.0f} events/s end-to-end ({s['batches']} batches, max batch write {s['write_ms_max']:.1f} ms, dropped {s['dropped']})")
+    t0 = time.perf_counter(); n = len(st.query(type="respond", where=[("conf", "<", 0.55)], limit=None))
+    print(f"query     conf<0.55 → {n} rows in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+    t0 = time.perf_counter(); n = len(st.query(type="respond", since=ts0, limit=100, newest_first=True))
+    print(f"query     newest 100 since start → {n} rows in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+    print(f"db size   {os.path.getsize(path) / 1e6:.1f} MB")
+    st.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# bench/mem_agent.py — 1体あたり/1k link あたりのメモリ（tracemalloc）
+import gc, random, sys, tracemalloc
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile, GeometryS, LinkRow, _TraceBuf
+from core.agent_factory import AgentFactory
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+ORDER = GeometryS.ORDER
+
+def measure(make):
+    gc.collect(); tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = make()
+    gc.collect(); used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop(); del keep
+    return used
+
+def links(n, compact):
+    rng = random.Random(1); out = {}
+    for i in range(n):
+        row = {m: (round(rng.uniform(-0.2, 0.2), 6), 0.8) for m in ORDER}
+        out[f"task:t{i}|external"] = LinkRow(row) if compact else row
+    return out
+
+def traces(n, compact):
+    if not compact:
+        return [{"metric": ORDER[i % 4], "delta": 0.01*i, "created_ts": 1.7e9 + i, "tau_s": 86400.0} for i in range(n)]
+    t = _TraceBuf()
+    for i in range(n): t.append(ORDER[i % 4], 0.01*i, 1.7e9 + i, 86400.0)
+    return t
+
+f = AgentFactory(profile=Profile.MOBILE)
+WisePartnerAgent(profile=Profile.MOBILE)  # import/遅延初期化を先に済ませる
+print(f"idle agent (__init__) : {measure(lambda: [WisePartnerAgent(seed=i, profile=Profile.MOBILE) for i in range(N)]) / N:10,.0f} B/agent")
+print(f"idle agent (factory)  : {measure(lambda: [f.create(seed=i) for i in range(N)]) / N:10,.0f} B/agent")
+print(f"1k links (LinkRow)    : {measure(lambda: links(1000, True)):10,.0f} B")
+print(f"1k links (dict/tuple) : {measure(lambda: links(1000, False)):10,.0f} B")
+print(f"500 traces (配列)      : {measure(lambda: traces(500, True)):10,.0f} B")
+print(f"500 traces (dict)     : {measure(lambda: traces(500, False)):10,.0f} B")
@@ -0,0 +1,106 @@
+# bench/pareto_geo.py — geo/line のパラメタを strict 基準で掃引し、精度×遅延の Pareto 前線と profile 別推奨を出す
+"""
+同じ固定ペア集合（seed 固定）で strict を真値とし、各設定の MAPE と1対あたり遅延を測る。
+  geo : steps × iters × jitter（GeometryS.geodesic_length）
+  line: steps（GeometryS.riem_line_length）
+使い方:
+  PYTHONPATH=. python bench/pareto_geo.py --pairs 24 --workers 4 --out pareto.json
+  PYTHONPATH=. python bench/pareto_geo.py --truth-cache strict_truth.json   # strict の真値を再利用
+  --target mobile=0.08 --target desktop=0.05 で profile 別の MAPE 目標を変えられる（既定は両方 SPEC の 8%）
+注意: 遅延は並列ワーカー内で測るので絶対値より相対比較として見る（--workers 1 なら素の値）。
+"""
+import argparse, json, os, random, statistics, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from core.wise_partner_core_v52_plus import GeometryS
+
+GEO_STEPS = (16, 24, 32, 48, 64)
+GEO_ITERS = (0, 1, 2, 3, 5)
+GEO_JITTER = (0.08, 0.15, 0.25)
+LINE_STEPS = (4, 8, 16, 32, 48)
+
+def make_pairs(n: int, seed: int) -> List[Tuple[Dict[str,float], Dict[str,float]]]:
+    rng = random.Random(seed)
+    q = lambda: {k: rng.random() for k in GeometryS.ORDER}
+    return [(q(), q()) for _ in range(n)]
+
+def _strict(pair) -> float:
+    from GEOM.geometry_strict import dist_strict
+    return dist_strict(pair[0], pair[1], steps=200, iters=12)
+
+def _eval(job) -> Dict:
+    cfg, pairs, truth = job
+    errs, lat = [], []
+    for (q1, q2), Ls in zip(pairs, truth):
+        t0 = time.perf_counter()
+        if cfg["mode"] == "line":
+            L = GeometryS.riem_line_length(q1, q2, steps=cfg["steps"])
+        else:
+            L, _, _ = GeometryS.geodesic_length(q1, q2, steps=cfg["steps"], iters=cfg["iters"], jitter=cfg["jitter"], seed=42)
+        lat.append(time.perf_counter() - t0)
+        if Ls > 1e-9: errs.append(abs(L - Ls) / Ls)
+    return {**cfg, "mape": statistics.mean(errs), "p95_err": sorted(errs)[int(0.95*(len(errs)-1))],
+            "lat_ms": statistics.median(lat) * 1e3}
+
+def configs() -> List[Dict]:
+    out = [{"mode": "line", "steps": s} for s in LINE_STEPS]
+    out += [{"mode": "geo", "steps": s, "iters": i, "jitter": j}
+            for s in GEO_STEPS for i in GEO_ITERS for j in (GEO_JITTER if i else GEO_JITTER[:1])]
+    return out
+
+def pareto(rows: List[Dict]) -> List[Dict]:
+    front, best = [], float("inf")
+    for r in sorted(rows, key=lambda r: (r["lat_ms"], r["mape"])):
+        if r["mape"] < best:
+            front.append(r); best = r["mape"]
+    return front
+
+def recommend(rows: List[Dict], targets: Dict[str,float]) -> Dict[str, Dict]:
+    rec = {}
+    for prof, tgt in targets.items():
+        ok = [r for r in rows if r["mape"] <= tgt]
+        # 目標未達なら最小 MAPE の設定を met=False で返す（黙って None にしない）
+        r = min(ok, key=lambda r: r["lat_ms"]) if ok else min(rows, key=lambda r: (r["mape"], r["lat_ms"]))
+        rec[prof] = {**r, "met": bool(ok)}
+    return rec
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pairs", type=int, default=24); ap.add_argument("--seed", type=int, default=20240801)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--truth-cache"); ap.add_argument("--out")
+    ap.add_argument("--target", action="append", default=[], help="profile=mape (例: mobile=0.08)")
+    a = ap.parse_args(argv)
+    targets = {"mobile": 0.08, "desktop": 0.08}
+    for t in a.target:
+        k, v = t.split("="); targets[k] = float(v)
+    pairs = make_pairs(a.pairs, a.seed)
+    truth = None
+    if a.truth_cache and os.path.exists(a.truth_cache):
+        with open(a.truth_cache, "r", encoding="utf-8") as f: doc = json.load(f)
+        if doc.get("seed") == a.seed and len(doc.get("truth", [])) == a.pairs: truth = doc["truth"]
+    with ProcessPoolExecutor(max_workers=max(1, a.workers)) as ex:
+        if truth is None:
+            t0 = time.perf_counter()
+            truth = list(ex.map(_strict, pairs))
+            print(f"strict truth: {a.pairs} pairs in {time.perf_counter()-t0:.1f}s")
+            if a.truth_cache:
+                with open(a.truth_cache, "w", encoding="utf-8") as f: json.dump({"seed": a.seed, "truth": truth}, f)
+        rows = list(ex.map(_eval, [(c, pairs, truth) for c in configs()]))
+    front = pareto(rows); rec = recommend(rows, targets)
+    print(f"\nPareto frontier ({len(front)}/{len(rows)} configs):")
+    for r in front:
+        p = f"steps={r['steps']}" + (f" iters={r['iters']} jitter={r['jitter']}" if r["mode"] == "geo" else "")
+        print(f"  {r['mode']:4s} {p:32s} MAPE {r['mape']*100:6.2f}%  p95 {r['p95_err']*100:6.2f}%  {r['lat_ms']:8.3f} ms")
+    print("\nrecommendation (lowest latency meeting target):")
+    for prof, r in rec.items():
+        tag = "" if r["met"] else "  (目標未達: 最小MAPEの設定)"
+        print(f"  {prof:8s} target ≤{targets[prof]*100:.1f}%: " + json.dumps({k: r[k] for k in r if k not in ("p95_err", "met")}) + tag)
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as f:
+            json.dump({"seed": a.seed, "pairs": a.pairs, "targets": targets, "rows": rows,
+                       "frontier": front, "recommend": rec}, f, ensure_ascii=False, indent=1)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
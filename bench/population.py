@@ -0,0 +1,24 @@
+# bench/population.py — 集団シミュレーション 1 tick の所要（個体ごとの respond vs Population.step）。numpy が必要
+import sys, time
+from core.wise_partner_core_v52_plus import Profile
+from core.agent_factory import AgentFactory
+from core.population import Population
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+MODE = sys.argv[2] if len(sys.argv) > 2 else "line"
+TEXT = "計画を立てたい"
+
+f = AgentFactory(profile=Profile.LAB_STRICT)
+agents = [f.create() for _ in range(N)]
+agents[0].respond(TEXT, explain=False, metric_mode=MODE)   # 参照長のキャッシュを温める
+t0 = time.perf_counter()
+for a in agents: a.respond(TEXT, explain=False, metric_mode=MODE)
+dt_obj = time.perf_counter() - t0
+
+pop = Population.replicate(f.prototype, N, metric_mode=MODE, seed=1)
+pop.step(TEXT)
+t0 = time.perf_counter()
+ticks = 5
+for _ in range(ticks): pop.step(TEXT)
+dt_pop = (time.perf_counter() - t0) / ticks
+print(f"{N} agents mode={MODE}: respond loop {dt_obj*1e3:.1f} ms/tick  Population.step {dt_pop*1e3:.1f} ms/tick  x{dt_obj/dt_pop:.1f}")
@@ -0,0 +1,45 @@
+# bench/startup.py — コールドスタート計測（import 内訳 + プロセス起動→初回 respond() まで）
+import os, re, statistics, subprocess, sys, time
+
+PROFILE = os.getenv("WPCORE_BENCH_PROFILE", "mobile")
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+ENV = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [".", os.environ.get("PYTHONPATH", "")]))}
+
+FIRST = f"""
+import time; t0 = time.perf_counter()
+from core.wise_partner_core_v52_plus import WisePartnerAgent
+t1 = time.perf_counter()
+a = WisePartnerAgent(profile={PROFILE!r}); t2 = time.perf_counter()
+a.respond("こんにちは", explain=False); t3 = time.perf_counter()
+print(t1-t0, t2-t1, t3-t2)
+"""
+
+def importtime():
+    """python -X importtime の出力から (自己us, 累積us, モジュール名) を取る。"""
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", "import core.wise_partner_core_v52_plus"],
+                       env=ENV, capture_output=True, text=True, check=True)
+    rows = []
+    for line in p.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if m: rows.append((int(m.group(1)), int(m.group(2)), m.group(4)))
+    return rows
+
+def first_respond():
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, "-c", FIRST], env=ENV, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - t0
+    imp, init, resp = (float(x) for x in p.stdout.split())
+    return wall, imp, init, resp
+
+rows = importtime()
+core = [r for r in rows if r[2] == "core.wise_partner_core_v52_plus"]
+print(f"import core (cumulative): {core[0][1]/1000:.1f} ms" if core else "import core: n/a")
+print("top self-time imports:")
+for self_us, cum_us, name in sorted(rows, reverse=True)[:8]:
+    print(f"  {self_us/1000:7.2f} ms  (cum {cum_us/1000:7.2f})  {name}")
+print("strict backend imported eagerly:", any(r[2] == "GEOM.geometry_strict" for r in rows))
+
+runs = [first_respond() for _ in range(N)]
+med = lambda i: statistics.median(r[i] for r in runs) * 1000
+print(f"profile={PROFILE} runs={N}  process start→first respond (wall): {med(0):.1f} ms")
+print(f"  import {med(1):.1f} ms | __init__ {med(2):.2f} ms | first respond {med(3):.1f} ms")
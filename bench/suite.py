@@ -0,0 +1,136 @@
+# bench/suite.py — 回帰検出用ベンチ一式（ウォームアップ＋反復、中央値/IQR、JSON出力、ベースライン比較）
+"""
+使い方:
+  PYTHONPATH=. python bench/suite.py --out bench_out.json
+  PYTHONPATH=. python bench/suite.py --save-baseline bench/baseline.local.json
+  PYTHONPATH=. python bench/suite.py --baseline bench/baseline.local.json --tol 0.25   # 遅くなったら exit 1
+オプション: --quick（反復少なめ） --strict（strict 系も測る。重い） --only <部分一致>
+"""
+import argparse, json, os, platform, random, statistics, sys, time
+from typing import Callable, Dict, List, Optional
+from core.wise_partner_core_v52_plus import (
+    WisePartnerAgent, Profile, GeometryS, load_card_from_json_str, DEMO_CARD_JSON,
+    card_body_bytes, sig_sign, _CARD_VERIFY_CACHE)
+
+SECRET = bytes.fromhex("5a"*32)
+ORDER = GeometryS.ORDER
+
+def _pairs(n: int, seed: int=1):
+    rng = random.Random(seed)
+    return [({k: rng.random() for k in ORDER}, {k: rng.random() for k in ORDER}) for _ in range(n)]
+
+def _cards(n: int):
+    out = []
+    for i in range(n):
+        d = json.loads(DEMO_CARD_JSON)
+        d["meta"].update(id=f"bench.{i}", valid_from="2020-01-01T00:00:00Z", valid_to="2099-01-01T00:00:00Z")
+        d["policy"].update(namespace=f"bench.ns{i}", forbidden=[f"tok{i}"])
+        d["nonce"] = None
+        c = load_card_from_json_str(json.dumps(d))
+        c.meta.sig = sig_sign("HMAC-SHA256", SECRET, card_body_bytes(c))
+        out.append(c)
+    return out
+
+def _agent_with_links(n: int, profile: str=Profile.DESKTOP) -> WisePartnerAgent:
+    a = WisePartnerAgent(profile=profile)
+    rng = random.Random(n)
+    for i in range(n):
+        a.state.world_model.links[f"task:t{i}|external"] = {m: (round(rng.uniform(-0.2, 0.2), 6), 0.8) for m in ORDER}
+    return a
+
+# ---- ケース定義: name -> (setup() -> fn, 反復数, quick時の反復数) ----
+def cases(with_strict: bool) -> Dict[str, tuple]:
+    C: Dict[str, tuple] = {}
+    pairs = _pairs(8)
+    def dist(mode):
+        def setup():
+            it = iter(pairs * 1000)
+            return lambda: GeometryS.dist(*next(it), mode=mode)
+        return setup
+    C["dist.line"] = (dist("line"), 200, 50)
+    C["dist.geo"] = (dist("geo"), 20, 5)
+    if with_strict: C["dist.strict"] = (dist("strict"), 3, 1)
+    for prof in (Profile.MOBILE, Profile.DESKTOP) + ((Profile.LAB_STRICT,) if with_strict else ()):
+        def setup(prof=prof):
+            a = WisePartnerAgent(profile=prof)
+            return lambda: a.respond("今日の計画を立てたい", explain=False)
+        C[f"respond.{prof}"] = (setup, 20 if prof != Profile.LAB_STRICT else 2, 5 if prof != Profile.LAB_STRICT else 1)
+    def sim_setup():
+        a = WisePartnerAgent(profile=Profile.DESKTOP)
+        opt = {"action": "respond_helpfully", "influential_norms": ["be_kind"]}
+        return lambda: a._simulate_outcome(opt, "今日の計画")
+    C["simulate_outcome"] = (sim_setup, 500, 100)
+    for n in (1, 10, 100):
+        cards = _cards(n)
+        def setup(cards=cards, cold=True):
+            def run():
+                if cold: _CARD_VERIFY_CACHE.clear()
+                a = WisePartnerAgent(card_secret=SECRET, profile=Profile.DESKTOP)
+                for c in cards: a.cards_activate(c, mode="strict")
+            return run
+        C[f"cards.activate.{n}"] = (setup, 20, 5)
+        C[f"cards.activate_warm.{n}"] = (lambda cards=cards, setup=setup: setup(cards, cold=False), 20, 5)
+    for n in (10, 1000, 10000):
+        def ex_setup(n=n):
+            a = _agent_with_links(n)
+            return a.export_state
+        def im_setup(n=n):
+            a = _agent_with_links(n); s = a.export_state(); b = WisePartnerAgent(profile=Profile.DESKTOP)
+            return lambda: b.import_state(s)
+        def ck_setup(n=n):
+            a = _agent_with_links(n)
+            return lambda: a.checkpoint("bench")
+        reps = 20 if n < 10000 else 5
+        C[f"state.export.{n}"] = (ex_setup, reps, 3)
+        C[f"state.import.{n}"] = (im_setup, reps, 3)
+        C[f"checkpoint.{n}"] = (ck_setup, reps, 3)
+    return C
+
+def measure(setup: Callable, reps: int, warmup: int=2) -> Dict[str, float]:
+    fn = setup()
+    for _ in range(warmup): fn()
+    ts: List[float] = []
+    for _ in range(reps):
+        t0 = time.perf_counter(); fn(); ts.append(time.perf_counter() - t0)
+    q = statistics.quantiles(ts, n=4, method="inclusive") if len(ts) > 1 else [ts[0]]*3
+    return {"median_s": statistics.median(ts), "iqr_s": q[2]-q[0], "min_s": min(ts), "reps": reps}
+
+def compare(res: Dict[str, dict], base: Dict[str, dict], tol: float) -> List[str]:
+    bad = []
+    for name, r in res.items():
+        b = base.get(name)
+        if not b: continue
+        # IQR ぶんの揺らぎは許容してから比率で判定
+        limit = b["median_s"] * (1.0 + tol) + b.get("iqr_s", 0.0)
+        ratio = r["median_s"] / max(1e-12, b["median_s"])
+        r["baseline_median_s"] = b["median_s"]; r["ratio"] = ratio
+        if r["median_s"] > limit: bad.append(f"{name}: {r['median_s']*1e3:.3f} ms vs {b['median_s']*1e3:.3f} ms (x{ratio:.2f})")
+    return bad
+
+def main(argv: Optional[List[str]]=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out"); ap.add_argument("--baseline"); ap.add_argument("--save-baseline")
+    ap.add_argument("--tol", type=float, default=0.2)
+    ap.add_argument("--quick", action="store_true"); ap.add_argument("--strict", action="store_true")
+    ap.add_argument("--only", default="")
+    a = ap.parse_args(argv)
+    res: Dict[str, dict] = {}
+    for name, (setup, reps, qreps) in cases(a.strict).items():
+        if a.only and a.only not in name: continue
+        r = measure(setup, qreps if a.quick else reps, warmup=1 if a.quick else 2)
+        res[name] = r
+        print(f"{name:28s} median {r['median_s']*1e3:10.3f} ms  IQR {r['iqr_s']*1e3:8.3f} ms  (n={r['reps']})")
+    doc = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                    "clock": "perf_counter", "quick": a.quick, "ts": time.time()}, "results": res}
+    bad: List[str] = []
+    if a.baseline:
+        with open(a.baseline, "r", encoding="utf-8") as f:
+            bad = compare(res, json.load(f)["results"], a.tol)
+        print(f"\nbaseline {a.baseline} tol={a.tol:.0%}: " + ("OK" if not bad else f"{len(bad)} regression(s)"))
+        for b in bad: print("  REGRESSION", b)
+    for path in filter(None, (a.out, a.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f: json.dump(doc, f, ensure_ascii=False, indent=1)
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# bench/warm_strict.py — strict 射撃のウォームスタート効果（会話っぽい小刻みな状態列で測る）
+"""
+各トレースは q1, q2 をランダムウォーク（1ターンの揺れ --sigma）させた連続クエリ。
+  cold: 毎回キャッシュを空にして warm 版ソルバ（全量補正・err<tol まで）で撃つ
+  warm: キャッシュを残したまま同じ列を撃つ
+  --legacy: 従来ソルバ（lr 減衰・固定 iters）の長さ/時間も並べる（重い）
+使い方: PYTHONPATH=. python bench/warm_strict.py --traces 3 --turns 10 [--steps 200] [--legacy]
+"""
+import argparse, random, statistics, time
+import GEOM.geometry_strict as G
+
+K = ("project_success_prob", "trust_level", "stress_level", "reality")
+
+def traces(n, turns, sigma, seed):
+    rng = random.Random(seed); out = []
+    for _ in range(n):
+        a = {k: rng.random() for k in K}; b = {k: rng.random() for k in K}; tr = []
+        for _ in range(turns):
+            a = {k: min(1.0, max(0.0, v + rng.gauss(0, sigma))) for k, v in a.items()}
+            b = {k: min(1.0, max(0.0, v + rng.gauss(0, sigma))) for k, v in b.items()}
+            tr.append((a, b))
+        out.append(tr)
+    return out
+
+def run(ts, steps, iters, clear_each):
+    G.warm_clear(); Ls = []; t0 = time.perf_counter()
+    for tr in ts:
+        for a, b in tr:
+            if clear_each:
+                st = dict(G._WARM.stats); G._WARM.clear(); G._WARM.stats.update(st)
+            Ls.append(G.dist_strict(a, b, steps=steps, iters=iters, warm=True))
+    return Ls, time.perf_counter() - t0, G.warm_stats()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--traces", type=int, default=3); ap.add_argument("--turns", type=int, default=10)
+    ap.add_argument("--sigma", type=float, default=0.02); ap.add_argument("--seed", type=int, default=5)
+    ap.add_argument("--steps", type=int, default=200); ap.add_argument("--iters", type=int, default=12)
+    ap.add_argument("--legacy", action="store_true")
+    a = ap.parse_args()
+    ts = traces(a.traces, a.turns, a.sigma, a.seed); nq = a.traces * a.turns
+    Lc, tc, sc = run(ts, a.steps, a.iters, clear_each=True)
+    Lw, tw, sw = run(ts, a.steps, a.iters, clear_each=False)
+    dev = max(abs(x - y) / y for x, y in zip(Lw, Lc))
+    print(f"queries={nq} steps={a.steps}")
+    print(f"cold : {sc['iters_miss']:4d} iters ({sc['iters_miss']/nq:.2f}/query)  {tc:7.2f}s  unconverged={sc['unconverged']}")
+    print(f"warm : {sw['iters_hit']+sw['iters_miss']:4d} iters  hits={sw['hits']}/{sw['shots']}  "
+          f"hit {sw['mean_iters_hit']:.2f} / miss {sw['mean_iters_miss']:.2f} iters  saved≈{sw['iters_saved_est']:.0f}  {tw:7.2f}s")
+    print(f"max |L_warm - L_cold| / L_cold = {dev:.2e}（収束解は同じ）")
+    if a.legacy:
+        t0 = time.perf_counter(); Ll = [G.dist_strict(x, y, steps=a.steps, iters=a.iters, warm=False) for tr in ts for x, y in tr]
+        tl = time.perf_counter() - t0
+        d = statistics.mean(abs(x - y) / y for x, y in zip(Ll, Lc))
+        print(f"legacy: {nq*a.iters:4d} iters (固定)  {tl:7.2f}s  収束解との平均相対差 {d*100:.2f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# core/agent_factory.py — 雛形エージェントを複製して高速に個体を作る
+from __future__ import annotations
+from typing import List, Optional
+import threading
+from core.wise_partner_core_v52_plus import WisePartnerAgent, PersonCard, Profile
+
+class AgentFactory:
+    """プロセス内不変量（自己SHA-256・adapters解決・カード検証・既定 world model）を雛形で1回だけ用意し、
+    create() は雛形の複製で個体を作る。カード索引と link 行はコピーオンライトで共有する。
+    seed 未指定なら seed_base から連番（同じ工場・同じ順序なら同じ seed 列）。
+    """
+    def __init__(self, profile: str=Profile.MOBILE, card_secret: Optional[bytes]=None,
+                 ck_secret: Optional[bytes]=None, cards: Optional[List[PersonCard]]=None,
+                 card_mode: str="strict", persona_bleed_enabled: Optional[bool]=None, seed_base: int=7) -> None:
+        self.prototype = WisePartnerAgent(seed=seed_base, card_secret=card_secret, ck_secret=ck_secret,
+                                          persona_bleed_enabled=persona_bleed_enabled, profile=profile)
+        self.rejected: List[str] = []
+        for c in cards or []:
+            if not self.prototype.cards_activate(c, mode=card_mode):
+                self.rejected.append(c.meta.id)
+        self._next_seed = seed_base
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def create(self, seed: Optional[int]=None) -> WisePartnerAgent:
+        with self._lock:
+            if seed is None:
+                seed = self._next_seed; self._next_seed += 1
+            self.created += 1
+        return self.prototype._clone(seed)
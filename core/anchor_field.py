@@ -0,0 +1,185 @@
+# core/anchor_field.py — 固定アンカーからの距離場（4D格子上の Dijkstra を事前計算→補間で O(1) 参照）
+"""
+用途: 「いつも同じ点から測る」距離（introspect の中立点 0.5、ref_length の角、ダッシュボードの目標状態）を
+  毎回解かずに表引きする。
+作り方:
+  埋め込み座標 [0,1]^4 を各軸 n 点の格子にし、各節点の初期値を「アンカーからの計量直線長」
+  （GeometryS.riem_line_length）にしたうえで、近傍 3^4-1=80 方向の辺で Dijkstra 緩和する。
+  辺の長さは両端の計量での二次形式の平均の平方根 sqrt((dvᵀg(a)dv + dvᵀg(b)dv)/2)（g は GeometryS.metric）。
+  ※格子辺だけの Dijkstra は方向が 80 通りに制限されて ~10% 長めに出る（細かくしても減らない）ため、
+    直線を「アンカーから各節点への辺」として足し、曲がった方が短い所だけ格子経路が勝つようにしている。
+  参照は多重線形補間（16隅）。格子外の値は [0,1] に丸めてから引く。
+誤差:
+  アンカー近傍は距離が錐状で補間誤差が大きい。validate() で geo（任意で strict）との MAPE/最大誤差を
+  測って確認すること。実測の目安は API-DETAILS 参照。
+ファイル形式（format 1, little endian）:
+  "WPAF" | fmt(u8) | n(u16) | name_len(u16) | name(utf-8) | anchor 4×f64 | 値 n^4×f32 | sha256(ここまで全部, 32B)
+使い方:
+  PYTHONPATH=. python -m core.anchor_field build --anchor neutral --n 13 --out fields/neutral.wpaf
+  PYTHONPATH=. python -m core.anchor_field validate fields/neutral.wpaf --samples 200 [--strict 10]
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence
+import argparse, hashlib, heapq, itertools, math, random, struct, sys, time
+from array import array
+from core.wise_partner_core_v52_plus import GeometryS
+
+MAGIC = b"WPAF"
+FIELD_FORMAT = 1
+_HEAD = struct.Struct("<4sBHH")
+
+ANCHORS: Dict[str, Dict[str,float]] = {
+    "neutral": {"project_success_prob": 0.5, "trust_level": 0.5, "stress_level": 0.5, "reality": 0.5},
+    "ref_low": GeometryS._ref_pair()[0],
+    "ref_high": GeometryS._ref_pair()[1],
+}
+
+def _stencil() -> List[tuple]:
+    return [d for d in itertools.product((-1, 0, 1), repeat=4) if any(d)]
+
+class AnchorField:
+    """アンカー1点からの距離場。values は n^4 個（添字は i0*n^3 + i1*n^2 + i2*n + i3、座標は埋め込み系）。"""
+    def __init__(self, anchor: Dict[str,float], n: int, values: array, name: str="") -> None:
+        if len(values) != n**4: raise ValueError("field size mismatch")
+        self.anchor = {k: float(anchor[k]) for k in GeometryS.ORDER}
+        self.n, self.values, self.name = n, values, name
+        self._a = GeometryS._embed(self.anchor)
+
+    # ---- 構築 ----
+    @classmethod
+    def build(cls, anchor: Dict[str,float], n: int=13, name: str="", line_steps: int=16) -> "AnchorField":
+        if n < 2 or n > 64: raise ValueError("n must be in 2..64")
+        h = 1.0 / (n - 1)
+        strides = (n**3, n**2, n, 1)
+        coords = [[i * h for i in idx] for idx in itertools.product(range(n), repeat=4)]
+        dirs = [d for d in _stencil() if d > (0, 0, 0, 0)]  # ±d は同じ二次形式なので半分だけ
+        # 各節点・各方向の dvᵀ g dv を先に計算（辺ごとに計量を評価しない）
+        Q = []
+        for x in coords:
+            g = GeometryS.metric(GeometryS._unembed(x))
+            Q.append([GeometryS.quad_form(g, [c*h for c in d]) for d in dirs])
+        offs = []
+        for k, d in enumerate(dirs):
+            off = sum(c*s for c, s in zip(d, strides))
+            offs.append((d, off, k)); offs.append((tuple(-c for c in d), -off, k))
+        dist = array("d", (GeometryS.riem_line_length(anchor, GeometryS._unembed(x), steps=line_steps) for x in coords))
+        pq = [(d, u) for u, d in enumerate(dist)]
+        heapq.heapify(pq)
+        while pq:
+            du, u = heapq.heappop(pq)
+            if du > dist[u]: continue
+            iu = (u // strides[0], u // strides[1] % n, u // strides[2] % n, u % n)
+            Qu = Q[u]
+            for d, off, k in offs:
+                if not all(0 <= iu[j] + d[j] < n for j in range(4)): continue
+                v = u + off
+                nd = du + math.sqrt(max(1e-24, 0.5*(Qu[k] + Q[v][k])))
+                if nd < dist[v]:
+                    dist[v] = nd; heapq.heappush(pq, (nd, v))
+        return cls(anchor, n, array("f", dist), name=name)
+
+    # ---- 参照 ----
+    def lookup(self, q: Dict[str,float]) -> float:
+        n = self.n; h = 1.0 / (n - 1); vals = self.values
+        x = [min(1.0, max(0.0, c)) / h for c in GeometryS._embed(q)]
+        i = [min(n-2, int(c)) for c in x]
+        t = [c - b for c, b in zip(x, i)]
+        base = ((i[0]*n + i[1])*n + i[2])*n + i[3]
+        acc = 0.0
+        for c0 in (0, 1):
+            w0 = t[0] if c0 else 1.0 - t[0]
+            for c1 in (0, 1):
+                w1 = w0 * (t[1] if c1 else 1.0 - t[1])
+                for c2 in (0, 1):
+                    w2 = w1 * (t[2] if c2 else 1.0 - t[2])
+                    row = base + ((c0*n + c1)*n + c2)*n
+                    acc += w2 * ((1.0 - t[3]) * vals[row] + t[3] * vals[row+1])
+        return acc
+
+    def is_anchor(self, q: Dict[str,float], eps: float=1e-9) -> bool:
+        return all(abs(a - b) <= eps for a, b in zip(self._a, GeometryS._embed(q)))
+
+    # ---- 保存/読込 ----
+    def to_bytes(self) -> bytes:
+        name = self.name.encode("utf-8")
+        vals = array("f", self.values)
+        if sys.byteorder != "little": vals.byteswap()
+        body = (_HEAD.pack(MAGIC, FIELD_FORMAT, self.n, len(name)) + name
+                + struct.pack("<4d", *self._a) + vals.tobytes())
+        return body + hashlib.sha256(body).digest()
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f: f.write(self.to_bytes())
+
+    @classmethod
+    def from_bytes(cls, b: bytes) -> "AnchorField":
+        if len(b) < _HEAD.size + 32 + 32: raise ValueError("truncated field file")
+        body, dg = b[:-32], b[-32:]
+        if hashlib.sha256(body).digest() != dg: raise ValueError("field digest mismatch")
+        magic, fmt, n, ln = _HEAD.unpack_from(body, 0)
+        if magic != MAGIC: raise ValueError("not an anchor field file")
+        if fmt != FIELD_FORMAT: raise ValueError(f"unsupported field format {fmt}")
+        p = _HEAD.size; name = body[p:p+ln].decode("utf-8"); p += ln
+        a = struct.unpack_from("<4d", body, p); p += 32
+        vals = array("f"); vals.frombytes(body[p:])
+        if sys.byteorder != "little": vals.byteswap()
+        return cls(GeometryS._unembed(list(a)), n, vals, name=name)
+
+    @classmethod
+    def load(cls, path: str) -> "AnchorField":
+        with open(path, "rb") as f: return cls.from_bytes(f.read())
+
+    # ---- 検証 ----
+    def validate(self, samples: int=200, seed: int=1, strict: int=0, min_dist: float=0.05) -> Dict[str,Any]:
+        """乱択した点で lookup と geo（strict>0 なら先頭 strict 点だけ strict も）を比べる。
+        アンカー直近（geo 距離 < min_dist）は相対誤差が発散するので除外して数える。"""
+        rng = random.Random(seed)
+        rows = []
+        for _ in range(samples):
+            q = {k: rng.random() for k in GeometryS.ORDER}
+            Lg, _ = GeometryS.dist(self.anchor, q, mode="geo")
+            if Lg < min_dist: continue
+            rows.append((q, self.lookup(q), Lg))
+        rel = sorted(abs(f - g) / g for _, f, g in rows)
+        out = {"n": self.n, "samples": len(rows),
+               "geo_mape": sum(rel) / len(rel) if rel else 0.0,
+               "geo_p95": rel[int(0.95 * (len(rel)-1))] if rel else 0.0,
+               "geo_max": rel[-1] if rel else 0.0,
+               "geo_bias": sum((f - g) / g for _, f, g in rows) / len(rows) if rows else 0.0}
+        if strict > 0:
+            from GEOM.geometry_strict import dist_strict
+            rs = [abs(f - Ls) / Ls for q, f, _ in rows[:strict] for Ls in [dist_strict(self.anchor, q)]]
+            out.update(strict_samples=len(rs), strict_mape=sum(rs)/len(rs) if rs else 0.0, strict_max=max(rs, default=0.0))
+        return out
+
+def register_dir(directory: str) -> List[AnchorField]:
+    """directory 内の *.wpaf を読み込んで GeometryS に登録する。"""
+    import glob, os
+    out = [AnchorField.load(p) for p in sorted(glob.glob(os.path.join(directory, "*.wpaf")))]
+    for f in out: GeometryS.register_field(f)
+    return out
+
+def main(argv: Optional[Sequence[str]]=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m core.anchor_field")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("--anchor", default="neutral", help="neutral / ref_low / ref_high か JSON の q")
+    b.add_argument("--name"); b.add_argument("--n", type=int, default=13); b.add_argument("--out", required=True)
+    v = sub.add_parser("validate")
+    v.add_argument("path"); v.add_argument("--samples", type=int, default=200); v.add_argument("--strict", type=int, default=0)
+    a = ap.parse_args(argv)
+    if a.cmd == "build":
+        import json
+        q = ANCHORS.get(a.anchor) or json.loads(a.anchor)
+        t0 = time.perf_counter()
+        f = AnchorField.build(q, n=a.n, name=a.name or (a.anchor if a.anchor in ANCHORS else ""))
+        f.save(a.out)
+        print(f"built n={a.n} ({a.n**4} nodes) in {time.perf_counter()-t0:.1f}s → {a.out} ({len(f.to_bytes())} bytes)")
+    else:
+        f = AnchorField.load(a.path)
+        for k, x in f.validate(samples=a.samples, strict=a.strict).items():
+            print(f"  {k:14s} {x*100:.2f}%" if isinstance(x, float) else f"  {k:14s} {x}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
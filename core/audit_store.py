@@ -0,0 +1,215 @@
+# core/audit_store.py — 監査イベントの永続ストア（stdlib sqlite3, WAL, バッチ挿入, 保持期間で削除, 絞り込み検索）
+"""
+使い方:
+  a.set_audit_store("audit.db", retention_days=30)     # 監査を ON にして以後のイベントを DB にも流す
+  a.audit_query(type="card_verify_fail", match={"reason": "sig_bad"}, since=time.time()-7*86400)
+  a.audit_query(type="respond", where=[("conf", "<", 0.35)])
+  環境変数 WPCORE_AUDIT_DB=audit.db でも全 agent に付く（同じパスは1プロセス1ストアを共有）。
+書き込み:
+  emit は put() でメモリのキューに積むだけ（ロック1回。JSON 化も書き込みスレッド側）。書き込みスレッドが最大 batch 件 / flush_s 秒ごとに
+  1トランザクションで executemany する。キューが queue_max を超えたら最古から捨てて dropped に数える
+  （監査で応答を止めない）。
+表:
+  events(id, ts, type, card, turn, src, data)  data はイベント全体の JSON。card/turn はイベントにあれば列にも入れる。
+  索引: (type, ts) / (ts) / (card, ts)
+検索:
+  where の項目は data の JSON から json_extract で引く（SQLite の JSON1。標準の sqlite3 に同梱）。
+  項目名は英数字と _ のみ、演算子は = != < <= > >= のみ受け付ける（値は常にバインド）。
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import atexit, json, os, re, sqlite3, threading, time
+from collections import deque
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY, ts REAL NOT NULL, type TEXT NOT NULL,"
+    " card TEXT, turn INTEGER, src TEXT, data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_events_type_ts ON events(type, ts)",
+    "CREATE INDEX IF NOT EXISTS ix_events_ts ON events(ts)",
+    "CREATE INDEX IF NOT EXISTS ix_events_card_ts ON events(card, ts) WHERE card IS NOT NULL",
+)
+_FIELD = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_OPS = ("=", "!=", "<", "<=", ">", ">=")
+
+def _connect(path: str) -> sqlite3.Connection:
+    c = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
+    return c
+
+def _row(ev: Dict[str,Any], src: str) -> Tuple:
+    card = ev.get("card"); turn = ev.get("turn")
+    return (float(ev.get("ts", time.time())), str(ev.get("type", "")),
+            card if isinstance(card, str) else None, turn if isinstance(turn, int) else None,
+            src or None, json.dumps(ev, ensure_ascii=False, separators=(",", ":"), default=str))
+
+class AuditStore:
+    _shared: Dict[str, "AuditStore"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str, batch: int=512, flush_s: float=0.5, queue_max: int=100_000,
+                 retention_days: Optional[float]=None, prune_every_s: float=300.0) -> None:
+        self.path, self.batch, self.flush_s, self.queue_max = path, max(1, batch), max(0.0, flush_s), max(1, queue_max)
+        self.retention_s = None if retention_days is None else float(retention_days) * 86400.0
+        self.prune_every_s = prune_every_s
+        d = os.path.dirname(path)
+        if d: os.makedirs(d, exist_ok=True)
+        c = _connect(path)
+        for q in _SCHEMA: c.execute(q)
+        c.close()
+        self._q: "deque[Tuple]" = deque()
+        self._cv = threading.Condition()
+        self._stop = False; self._busy = False; self._flushing = 0
+        self._m = {"queued": 0, "inserted": 0, "dropped": 0, "batches": 0, "pruned": 0, "errors": 0,
+                   "write_ms_last": 0.0, "write_ms_max": 0.0}
+        self._th = threading.Thread(target=self._run, name="audit-store", daemon=True)
+        self._th.start()
+
+    @classmethod
+    def shared(cls, path: str, **kw) -> "AuditStore":
+        """同じパスにはプロセス内で1つだけ（書き込みスレッドと接続を共有）。kw は初回だけ効く。"""
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            s = cls._shared.get(key)
+            if s is None or s._stop:
+                s = cls._shared[key] = cls(path, **kw)
+            return s
+
+    @classmethod
+    def _close_shared(cls, timeout: float=5.0) -> None:
+        # 書き込みスレッドは daemon なので、終了時にキューの残り（最大 flush_s 秒分）を書き切る
+        with cls._shared_lock: stores = list(cls._shared.values())
+        for s in stores: s.close(timeout)
+
+    # ---- 書き込み ----
+    def put(self, ev: Dict[str,Any], src: str="") -> None:
+        # 直列化は書き込みスレッド側（emit は毎回新しい dict を作るので後から書き換わらない）
+        with self._cv:
+            if self._stop: return
+            self._q.append((ev, src)); self._m["queued"] += 1
+            if len(self._q) > self.queue_max:
+                self._q.popleft(); self._m["dropped"] += 1
+            if len(self._q) == 1 or len(self._q) >= self.batch: self._cv.notify()  # 起床は空→非空と満杯のときだけ
+
+    def _take(self) -> Optional[List[Tuple]]:
+        with self._cv:
+            while True:
+                if self._q and (len(self._q) >= self.batch or self._flushing or self._stop):
+                    break
+                if self._q:
+                    self._cv.wait(self.flush_s)
+                    if self._q: break  # flush_s 経過（少量でも書く）
+                elif self._stop:
+                    return None
+                else:
+                    self._cv.wait(self.prune_every_s if self.retention_s else None)
+                    if not self._q and self.retention_s: return []  # 空でも定期削除の機会を作る
+            n = min(self.batch, len(self._q))
+            rows = [self._q.popleft() for _ in range(n)]
+            self._busy = True
+            return rows
+
+    def _run(self) -> None:
+        con = _connect(self.path)
+        last_prune = 0.0
+        try:
+            while True:
+                rows = self._take()
+                if rows is None: return
+                try:
+                    if rows:
+                        t0 = time.perf_counter()
+                        con.execute("BEGIN")
+                        con.executemany("INSERT INTO events(ts, type, card, turn, src, data) VALUES (?,?,?,?,?,?)",
+                                        [_row(ev, src) for ev, src in rows])
+                        con.execute("COMMIT")
+                        dt = (time.perf_counter() - t0) * 1e3
+                        with self._cv:
+                            m = self._m; m["inserted"] += len(rows); m["batches"] += 1
+                            m["write_ms_last"] = dt; m["write_ms_max"] = max(m["write_ms_max"], dt)
+                    if self.retention_s and time.monotonic() - last_prune >= self.prune_every_s:
+                        last_prune = time.monotonic()
+                        self._prune(con, time.time() - self.retention_s)
+                except sqlite3.Error:
+                    if con.in_transaction: con.execute("ROLLBACK")
+                    with self._cv: self._m["errors"] += 1
+                finally:
+                    with self._cv:
+                        self._busy = False; self._cv.notify_all()
+        finally:
+            con.close()
+
+    def _prune(self, con: sqlite3.Connection, before_ts: float) -> int:
+        n = con.execute("DELETE FROM events WHERE ts < ?", (before_ts,)).rowcount
+        with self._cv: self._m["pruned"] += n
+        return n
+
+    def prune(self, older_than_days: Optional[float]=None) -> int:
+        """保持期間より古いイベントを消す（引数で上書き可）。戻り値は削除数。"""
+        days = older_than_days if older_than_days is not None else (None if self.retention_s is None else self.retention_s / 86400.0)
+        if days is None: raise ValueError("no retention configured")
+        self.flush()
+        con = _connect(self.path)
+        try: return self._prune(con, time.time() - days * 86400.0)
+        finally: con.close()
+
+    def flush(self, timeout: Optional[float]=None) -> bool:
+        """キューが空になり書き込み中のバッチも終わるまで待つ。"""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cv:
+            self._flushing += 1; self._cv.notify_all()
+            try:
+                while self._q or self._busy:
+                    left = None if end is None else end - time.monotonic()
+                    if left is not None and left <= 0: return False
+                    self._cv.wait(left)
+            finally:
+                self._flushing -= 1
+        return True
+
+    def close(self, timeout: Optional[float]=None) -> None:
+        self.flush(timeout)
+        with self._cv:
+            self._stop = True; self._cv.notify_all()
+        self._th.join(timeout)
+
+    def stats(self) -> Dict[str,Any]:
+        with self._cv: return {**self._m, "depth": len(self._q)}
+
+    # ---- 検索 ----
+    def query(self, type: Optional[str]=None, since: Optional[float]=None, until: Optional[float]=None,
+              card: Optional[str]=None, turn: Optional[int]=None, src: Optional[str]=None,
+              match: Optional[Dict[str,Any]]=None, where: Optional[Iterable[Tuple[str,str,Any]]]=None,
+              limit: Optional[int]=1000, newest_first: bool=False, flush: bool=True) -> List[Dict[str,Any]]:
+        """条件に合うイベント（emit した dict そのもの）を返す。
+        match={"reason": "sig_bad"} は data 項目の等値、where=[("conf", "<", 0.35)] は比較。"""
+        if flush: self.flush()
+        cond: List[str] = []; args: List[Any] = []
+        for col, v in (("type", type), ("card", card), ("turn", turn), ("src", src)):
+            if v is not None: cond.append(f"{col} = ?"); args.append(v)
+        if since is not None: cond.append("ts >= ?"); args.append(float(since))
+        if until is not None: cond.append("ts < ?"); args.append(float(until))
+        terms = [(k, "=", v) for k, v in (match or {}).items()] + list(where or ())
+        for k, op, v in terms:
+            if not _FIELD.match(k): raise ValueError(f"bad field name {k!r}")
+            if op not in _OPS: raise ValueError(f"bad operator {op!r}")
+            cond.append(f"json_extract(data, '$.{k}') {op} ?"); args.append(v)
+        sql = "SELECT data FROM events" + (" WHERE " + " AND ".join(cond) if cond else "")
+        sql += " ORDER BY ts DESC, id DESC" if newest_first else " ORDER BY ts, id"
+        if limit is not None: sql += " LIMIT ?"; args.append(int(limit))
+        con = _connect(self.path)
+        try:
+            return [json.loads(r[0]) for r in con.execute(sql, args)]
+        finally:
+            con.close()
+
+    def count_by_type(self, since: Optional[float]=None) -> Dict[str,int]:
+        self.flush()
+        con = _connect(self.path)
+        try:
+            q = "SELECT type, COUNT(*) FROM events" + (" WHERE ts >= ?" if since is not None else "") + " GROUP BY type"
+            return dict(con.execute(q, (float(since),) if since is not None else ()))
+        finally:
+            con.close()
+
+atexit.register(AuditStore._close_shared)
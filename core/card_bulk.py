@@ -0,0 +1,224 @@
+# core/card_bulk.py — 役割カードの一括署名/検証（ディレクトリ or JSONL カタログ、並列、マニフェスト、差分）
+"""
+署名は実行時の検証と同じ関数で作る: body = card_body_bytes(card)（sig 以外の meta + caps + policy の canonical JSON）、
+sig = sig_sign(alg, secret, body)。したがって「ここで通る」⇔「CardManager の strict 検証で sig_bad にならない」。
+入力:
+  ディレクトリ: 直下の *.json（*.signed.json は除く）→ 出力ディレクトリに <名前>.signed.json
+  JSONL カタログ: 1行=1カード → 出力も JSONL（入力と同じ順）
+マニフェスト（JSON）:
+  {"format":1, "alg":..., "key_fp":鍵の指紋(sha256 先頭16桁), "device_lock":..., "cards": {
+     <src>: {"id":..., "src_hash":入力の内容ハッシュ, "body_hash":sha256(body), "sig":...}, ...}}
+  src はディレクトリならファイル名、カタログならカード id。
+差分（--incremental）:
+  src_hash（sig を除いた入力の canonical JSON の sha256）と鍵指紋・device_lock・alg が前回と同じで、
+  出力が残っているカードは署名し直さない。
+使い方:
+  PYTHONPATH=. python -m core.card_bulk sign --secret ~/.sola/card_secret.hex --in cards/src --out cards/signed \
+      --manifest cards/signed/MANIFEST.json --workers 4 --incremental [--device-lock "$DEVICE_ID"]
+  PYTHONPATH=. python -m core.card_bulk verify --secret ~/.sola/card_secret.hex --in cards/signed \
+      [--manifest cards/signed/MANIFEST.json] [--device "$DEVICE_ID"]
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse, copy, glob, hashlib, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from core.wise_partner_core_v52_plus import (
+    load_card_from_dict, card_body_bytes, sig_sign, sig_verify, sha256_bytes, canonical_json, SIG_ALGS)
+
+MANIFEST_FORMAT = 1
+_SECRET: Optional[bytes] = None  # ワーカーごとに1回だけ受け取る
+
+def key_fingerprint(secret: bytes) -> str:
+    return hashlib.sha256(b"wpcore-card-key:" + secret).hexdigest()[:16]
+
+def source_hash(d: Dict[str,Any]) -> str:
+    """入力カードの内容ハッシュ（meta.sig を除く）。差分判定用。"""
+    x = copy.deepcopy(d); x.get("meta", {}).pop("sig", None)
+    return sha256_bytes(canonical_json(x))
+
+def sign_card_dict(d: Dict[str,Any], secret: bytes, alg: str="HMAC-SHA256",
+                   device_lock: Optional[str]=None) -> Tuple[Dict[str,Any], str, str]:
+    """カード dict に署名して (署名済み dict, body_hash, sig) を返す。device_lock を渡せば meta に入れてから署名。"""
+    if (alg or "").upper() not in SIG_ALGS: raise ValueError(f"unsupported alg {alg}")
+    out = copy.deepcopy(d)
+    meta = out.setdefault("meta", {}); meta["alg"] = alg
+    if device_lock: meta["device_lock"] = device_lock
+    meta["sig"] = ""
+    card = load_card_from_dict(out)  # 実行時と同じ正規化（既定値の埋め込み）を通す
+    body = card_body_bytes(card)
+    sig = sig_sign(alg, secret, body)
+    meta["sig"] = sig
+    return out, sha256_bytes(body), sig
+
+def verify_card_dict(d: Dict[str,Any], secret: bytes, device: Optional[str]=None) -> Tuple[bool, str, str]:
+    """(ok, reason, body_hash)。署名と（device を渡せば）device_lock を見る。期限は見ない（配布前検査用）。"""
+    try:
+        card = load_card_from_dict(d)
+    except Exception as e:
+        return False, f"parse:{type(e).__name__}", ""
+    body = card_body_bytes(card); bh = sha256_bytes(body)
+    if (card.meta.alg or "").upper() not in SIG_ALGS: return False, "alg_unsupported", bh
+    if not card.meta.sig: return False, "sig_missing", bh
+    if not sig_verify(card.meta.alg, secret, body, card.meta.sig): return False, "sig_bad", bh
+    if device is not None and card.meta.device_lock and card.meta.device_lock != device:
+        return False, "device_lock_mismatch", bh
+    return True, "ok", bh
+
+# ---- 並列ジョブ ----
+def _init(secret: bytes) -> None:
+    global _SECRET
+    _SECRET = secret
+
+def _sign_job(job) -> List[Tuple[str, Dict[str,Any], str, str, str]]:
+    items, alg, dev = job
+    return [(src, *sign_card_dict(d, _SECRET, alg=alg, device_lock=dev), sh) for src, d, sh in items]
+
+def _verify_job(job) -> List[Tuple[str, str, bool, str, str]]:
+    items, dev = job
+    return [(src, str(d.get("meta", {}).get("id", "")), *verify_card_dict(d, _SECRET, device=dev)) for src, d in items]
+
+def _map(fn, jobs: List[Any], secret: bytes, workers: int) -> List[Any]:
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init, initargs=(secret,)) as ex:
+            return [r for part in ex.map(fn, jobs) for r in part]
+    _init(secret)
+    return [r for j in jobs for r in fn(j)]
+
+def _chunks(xs: List[Any], workers: int) -> List[List[Any]]:
+    n = max(1, min(256, len(xs) // max(1, workers*4) or 1))
+    return [xs[i:i+n] for i in range(0, len(xs), n)]
+
+# ---- 入出力 ----
+def _is_catalog(path: str) -> bool:
+    return path.endswith(".jsonl")
+
+def read_cards(path: str) -> List[Tuple[str, Dict[str,Any]]]:
+    """(src, card dict) の並び。"""
+    if _is_catalog(path):
+        out = []
+        with open(path, "r", encoding="utf-8") as f:
+            for ln in f:
+                if ln.strip():
+                    d = json.loads(ln); out.append((str(d["meta"]["id"]), d))
+        return out
+    files = sorted(p for p in glob.glob(os.path.join(path, "*.json"))
+                   if not p.endswith(".signed.json") and os.path.basename(p) != "MANIFEST.json")
+    out = []
+    for p in files:
+        with open(p, "r", encoding="utf-8") as f: out.append((os.path.basename(p), json.load(f)))
+    return out
+
+def _signed_name(src: str) -> str:
+    return src[:-5] + ".signed.json" if src.endswith(".json") else src + ".signed.json"
+
+def _dump(d: Dict[str,Any]) -> str:
+    return json.dumps(d, ensure_ascii=False, separators=(",", ":"))
+
+def load_manifest(path: Optional[str]) -> Dict[str,Any]:
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f: return json.load(f)
+    return {}
+
+def sign_tree(src: str, out: str, secret: bytes, manifest: Optional[str]=None, workers: int=0,
+              incremental: bool=False, alg: str="HMAC-SHA256", device_lock: Optional[str]=None) -> Dict[str,Any]:
+    """src（ディレクトリ or .jsonl）を一括署名して out に書き、マニフェストを更新する。戻り値は件数と時間。"""
+    t0 = time.perf_counter()
+    cards = read_cards(src)
+    ids = [d.get("meta", {}).get("id") for _, d in cards]
+    if _is_catalog(src) and len(set(ids)) != len(ids): raise ValueError("duplicate card id in catalog")
+    old = load_manifest(manifest) if incremental else {}
+    fp = key_fingerprint(secret)
+    same_cfg = (old.get("format") == MANIFEST_FORMAT and old.get("key_fp") == fp and old.get("alg") == alg
+                and old.get("device_lock") == (device_lock or None))
+    prev = old.get("cards", {}) if same_cfg else {}
+    catalog = _is_catalog(src)
+    prev_lines: Dict[str,str] = {}
+    if catalog and prev and os.path.exists(out):
+        with open(out, "r", encoding="utf-8") as f:
+            for ln in f:
+                if ln.strip(): prev_lines[str(json.loads(ln)["meta"]["id"])] = ln.rstrip("\n")
+    todo, keep = [], {}
+    for s, d in cards:
+        sh = source_hash(d); p = prev.get(s)
+        have = (s in prev_lines) if catalog else os.path.exists(os.path.join(out, _signed_name(s)))
+        if p is not None and p.get("src_hash") == sh and have:
+            keep[s] = p
+        else:
+            todo.append((s, d, sh))
+    done = _map(_sign_job, [(c, alg, device_lock) for c in _chunks(todo, workers)], secret, workers)
+    entries = dict(keep)
+    signed: Dict[str,Dict[str,Any]] = {}
+    for s, sd, bh, sig, sh in done:
+        entries[s] = {"id": sd["meta"].get("id"), "src_hash": sh, "body_hash": bh, "sig": sig}
+        signed[s] = sd
+    if catalog:
+        d = os.path.dirname(out)
+        if d: os.makedirs(d, exist_ok=True)
+        tmp = out + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for s, _ in cards: f.write((_dump(signed[s]) if s in signed else prev_lines[s]) + "\n")
+        os.replace(tmp, out)
+    else:
+        os.makedirs(out, exist_ok=True)
+        for s, sd in signed.items():
+            with open(os.path.join(out, _signed_name(s)), "w", encoding="utf-8") as f: f.write(_dump(sd))
+    if manifest:
+        doc = {"format": MANIFEST_FORMAT, "alg": alg, "key_fp": fp, "device_lock": device_lock or None,
+               "cards": {s: entries[s] for s, _ in cards}}
+        tmp = manifest + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(doc, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, manifest)
+    return {"cards": len(cards), "signed": len(done), "skipped": len(keep), "elapsed_s": time.perf_counter() - t0}
+
+def verify_tree(path: str, secret: bytes, manifest: Optional[str]=None, workers: int=0,
+                device: Optional[str]=None) -> Dict[str,Any]:
+    """署名済みのディレクトリ（*.signed.json）か .jsonl を検証する。manifest を渡せば body_hash/sig の一致も見る。"""
+    t0 = time.perf_counter()
+    if _is_catalog(path):
+        cards = read_cards(path)
+    else:
+        cards = []
+        for p in sorted(glob.glob(os.path.join(path, "*.signed.json"))):
+            with open(p, "r", encoding="utf-8") as f: cards.append((os.path.basename(p)[:-12] + ".json", json.load(f)))
+    res = _map(_verify_job, [(c, device) for c in _chunks(cards, workers)], secret, workers)
+    man = load_manifest(manifest).get("cards", {}) if manifest else None
+    bad: List[Dict[str,Any]] = []
+    for src, cid, ok, reason, bh in res:
+        if ok and man is not None:
+            m = man.get(src)
+            if m is None: ok, reason = False, "not_in_manifest"
+            elif m.get("body_hash") != bh: ok, reason = False, "manifest_body_mismatch"
+        if not ok: bad.append({"src": src, "id": cid, "reason": reason})
+    if man is not None:
+        seen = {s for s, *_ in res}
+        bad += [{"src": s, "id": m.get("id"), "reason": "missing"} for s, m in sorted(man.items()) if s not in seen]
+    return {"cards": len(res), "ok": not bad, "bad": bad, "elapsed_s": time.perf_counter() - t0}
+
+def _read_secret(path: str) -> bytes:
+    with open(os.path.expanduser(path), "r", encoding="utf-8") as f: return bytes.fromhex(f.read().strip())
+
+def main(argv: Optional[Sequence[str]]=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m core.card_bulk")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("sign")
+    s.add_argument("--secret", required=True); s.add_argument("--in", dest="inp", required=True)
+    s.add_argument("--out", required=True); s.add_argument("--manifest")
+    s.add_argument("--workers", type=int, default=os.cpu_count() or 1); s.add_argument("--incremental", action="store_true")
+    s.add_argument("--alg", default="HMAC-SHA256"); s.add_argument("--device-lock", default=os.getenv("DEVICE_ID") or None)
+    v = sub.add_parser("verify")
+    v.add_argument("--secret", required=True); v.add_argument("--in", dest="inp", required=True); v.add_argument("--manifest")
+    v.add_argument("--workers", type=int, default=os.cpu_count() or 1); v.add_argument("--device")
+    a = ap.parse_args(argv)
+    secret = _read_secret(a.secret)
+    if a.cmd == "sign":
+        r = sign_tree(a.inp, a.out, secret, manifest=a.manifest, workers=a.workers, incremental=a.incremental,
+                      alg=a.alg, device_lock=a.device_lock)
+        print(f"cards={r['cards']} signed={r['signed']} skipped={r['skipped']} in {r['elapsed_s']:.2f}s → {a.out}")
+        return 0
+    r = verify_tree(a.inp, secret, manifest=a.manifest, workers=a.workers, device=a.device)
+    print(f"cards={r['cards']} {'OK' if r['ok'] else 'FAILED'} in {r['elapsed_s']:.2f}s")
+    for b in r["bad"][:50]: print(f"  {b['src']} ({b['id']}): {b['reason']}")
+    return 0 if r["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
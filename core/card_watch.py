@@ -0,0 +1,107 @@
+# core/card_watch.py — カードディレクトリのホットロード（変更分だけ再検証→装着集合を原子的に差し替え）
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+import glob, hashlib, os, threading
+from core.wise_partner_core_v52_plus import (
+    WisePartnerAgent, CardManager, PersonCard, load_card_from_json_str, now_iso)
+
+class _Entry:
+    __slots__ = ("stat", "sha", "card", "ok")
+    def __init__(self, stat: Tuple[int,int], sha: str, card: Optional[PersonCard], ok: bool) -> None:
+        self.stat, self.sha, self.card, self.ok = stat, sha, card, ok
+
+class CardDirWatcher:
+    """directory 内の *.signed.json を見張り、追加/変更/削除を agents に反映する。
+    - mtime/size が同じファイルは読まない。変わっていても内容の SHA-256 が同じなら再検証しない
+    - 変更分だけ検証（結果はプロセス共有の検証キャッシュに載るので各 agent 側は暗号計算をしない）
+    - 各 agent の装着集合は CardManager.replace_active で1回の代入により入れ替える
+      poll() を直接呼んだときはその場で、start() の裏ループからは agent.cards_post で予約し、
+      各 agent の次の respond（応答スレッド）で入れ替える
+    並び順: priority 降順 → ファイル名（同じディレクトリなら全 agent で同じ結果になる）
+    """
+    def __init__(self, directory: str, agents: Optional[List[WisePartnerAgent]]=None,
+                 secret: Optional[bytes]=None, mode: str="strict", pattern: str="*.signed.json") -> None:
+        self.directory, self.mode, self.pattern = directory, mode, pattern
+        self.agents: List[WisePartnerAgent] = list(agents or [])
+        self._mgr = CardManager(secret=secret)
+        self._files: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event(); self._th: Optional[threading.Thread] = None
+        self.stats = {"polls": 0, "reads": 0, "verifies": 0, "swaps": 0, "rejected": 0, "errors": 0}
+        self.last_error: Optional[str] = None   # 直近の読み込み/検証/走査の失敗（"ファイル名: 例外"）
+
+    def add_agent(self, agent: WisePartnerAgent) -> None:
+        with self._lock:
+            self.agents.append(agent)
+            self._apply([agent])
+
+    def cards(self) -> List[PersonCard]:
+        items = sorted(((e.card, os.path.basename(p)) for p, e in self._files.items() if e.ok and e.card),
+                       key=lambda t: (-t[0].policy.priority, t[1]))
+        return [c for c, _ in items]
+
+    def poll(self, defer: bool=False) -> Dict[str, List[str]]:
+        """1回走査して差分を返す。差分があれば全 agent に反映（defer=True なら予約だけ）。"""
+        with self._lock:
+            self.stats["polls"] += 1
+            diff: Dict[str, List[str]] = {"added": [], "changed": [], "removed": [], "rejected": []}
+            seen = set()
+            now_s = now_iso()
+            for path in sorted(glob.glob(os.path.join(self.directory, self.pattern))):
+                seen.add(path)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                sig = (st.st_mtime_ns, st.st_size)
+                old = self._files.get(path)
+                if old is not None and old.stat == sig: continue
+                try:
+                    with open(path, "rb") as f: raw = f.read()
+                except OSError as e:   # 走査中に消えた等。この回は飛ばして次の poll で読み直す
+                    self.stats["errors"] += 1; self.last_error = f"{os.path.basename(path)}: {type(e).__name__}: {e}"
+                    continue
+                self.stats["reads"] += 1
+                sha = hashlib.sha256(raw).hexdigest()
+                if old is not None and old.sha == sha:
+                    old.stat = sig; continue
+                try:
+                    card: Optional[PersonCard] = load_card_from_json_str(raw.decode("utf-8"))
+                    ok = self._mgr._verify_meta(card, self.mode, now_s)
+                    self.stats["verifies"] += 1
+                except Exception as e:
+                    card, ok = None, False
+                    self.last_error = f"{os.path.basename(path)}: {type(e).__name__}: {e}"
+                self._files[path] = _Entry(sig, sha, card, ok)
+                diff["changed" if old is not None else "added"].append(path)
+                if not ok: diff["rejected"].append(path); self.stats["rejected"] += 1
+            for path in [p for p in self._files if p not in seen]:
+                del self._files[path]; diff["removed"].append(path)
+            if diff["added"] or diff["changed"] or diff["removed"]:
+                self._apply(self.agents, defer)
+            return diff
+
+    def _apply(self, agents: List[WisePartnerAgent], defer: bool=False) -> None:
+        cards = self.cards(); now_s = now_iso()
+        for a in agents:
+            if defer: a.cards_post(cards, mode=self.mode)   # agent の状態と監査は応答スレッドだけが触る
+            else: a.card_mgr.replace_active(cards, now_s, mode=self.mode)
+        self.stats["swaps"] += 1
+
+    def start(self, interval_s: float=2.0) -> None:
+        """バックグラウンドで interval_s ごとに poll する。"""
+        if self._th is not None: return
+        self._stop.clear()
+        def loop() -> None:
+            while not self._stop.is_set():
+                try: self.poll(defer=True)
+                except Exception as e:   # 走査ごと失敗しても見張りは続ける（数と直近の内容は stats / last_error に残す）
+                    with self._lock:
+                        self.stats["errors"] += 1; self.last_error = f"poll: {type(e).__name__}: {e}"
+                self._stop.wait(interval_s)
+        self._th = threading.Thread(target=loop, name="card-dir-watch", daemon=True)
+        self._th.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._th is not None: self._th.join(); self._th = None
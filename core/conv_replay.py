@@ -0,0 +1,172 @@
+# core/conv_replay.py — 会話トランスクリプトを多数の agent に流すリプレイ（負荷試験＋決定性チェック）
+"""
+入力: JSONL。1行=1イベント。conv ごとに1 agent、conv 内はファイル順に実行。
+  {"conv":"c1","type":"user","text":"計画を立てたい","dt_s":30}
+  {"conv":"c1","type":"kpi","task":"todo_plan","before":{...},"after":{...}}
+  {"conv":"c1","type":"card_on","card":{...署名済みカードdict...},"mode":"strict"}   # "path" でファイル指定も可
+  {"conv":"c1","type":"card_off","card_id":"tutor.v1"}
+  type 省略時は "user"。dt_s は仮想時計の進み（省略時は turn_dt_s）。
+決定性:
+  seed = sha256("<seed>:<conv>") 由来、時計は t0 から始まる仮想時計（agent.set_clock）。
+  そのため最終 export_state の hash はワーカー数・実行回数に依らず一致するはず。ずれたら非決定性の混入。
+使い方:
+  PYTHONPATH=. python -m core.conv_replay conv.jsonl --workers 4
+  PYTHONPATH=. python -m core.conv_replay conv.jsonl --check 1,4      # ワーカー数を変えて hash を突き合わせ
+  PYTHONPATH=. python -m core.conv_replay --synth 200x20 conv.jsonl   # 合成トランスクリプトを書く
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import argparse, hashlib, json, os, random, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile, load_card_from_dict
+from core.reward_bridge import RewardBridge
+
+try:
+    import resource  # POSIX のみ
+except ImportError:  # pragma: no cover
+    resource = None
+
+T0 = 1_700_000_000.0  # 仮想時計の起点（固定）
+
+def iter_events(path: str) -> Iterator[Dict[str,Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for ln in f:
+            ln = ln.strip()
+            if ln: yield json.loads(ln)
+
+def load_conversations(path: str) -> Dict[str, List[Dict[str,Any]]]:
+    """conv ごとにイベントを束ねる（conv の並びは初出順）。"""
+    convs: Dict[str, List[Dict[str,Any]]] = {}
+    for ev in iter_events(path):
+        convs.setdefault(str(ev.get("conv", "default")), []).append(ev)
+    return convs
+
+def conv_seed(seed: int, conv: str) -> int:
+    return int.from_bytes(hashlib.sha256(f"{seed}:{conv}".encode("utf-8")).digest()[:4], "big")
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None: return None
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / (1024.0*1024.0) if sys.platform == "darwin" else r / 1024.0  # macOS は bytes、Linux は KB
+
+def _run_conv(job) -> Dict[str,Any]:
+    conv, events, o = job
+    a = WisePartnerAgent(seed=conv_seed(o["seed"], conv), card_secret=o["card_secret"], profile=o["profile"])
+    now = [T0]
+    a.set_clock(lambda: now[0])
+    rb = RewardBridge(a)
+    lat: List[float] = []; n_ev = 0; card_rej = 0
+    for ev in events:
+        n_ev += 1
+        now[0] += float(ev.get("dt_s", o["turn_dt_s"]))
+        typ = ev.get("type", "user")
+        if typ == "user":
+            t0 = time.perf_counter()
+            a.respond(str(ev.get("text", "")), explain=o["explain"])
+            lat.append(time.perf_counter() - t0)
+        elif typ == "kpi":
+            rb.report(ev["task"], ev["before"], ev["after"], metrics=ev.get("metrics"), d_norm=ev.get("d_norm"))
+        elif typ == "card_on":
+            d = ev.get("card")
+            if d is None:
+                with open(ev["path"], "r", encoding="utf-8") as f: d = json.load(f)
+            if not a.cards_activate(load_card_from_dict(d), mode=ev.get("mode", "strict")): card_rej += 1
+        elif typ == "card_off":
+            a.cards_deactivate(ev["card_id"])
+        else:
+            raise ValueError(f"unknown event type: {typ}")
+    h = json.loads(a.export_state())["hash"]
+    return {"conv": conv, "events": n_ev, "lat": lat, "hash": h, "card_rejected": card_rej, "rss_mb": _peak_rss_mb()}
+
+def _pct(xs: Sequence[float], p: float) -> float:
+    if not xs: return 0.0
+    return xs[min(len(xs)-1, int(round(p * (len(xs)-1))))]
+
+def replay_conversations(path: str, workers: int=0, profile: str=Profile.MOBILE, seed: int=7,
+                         card_secret: Optional[bytes]=None, turn_dt_s: float=1.0, explain: bool=False) -> Dict[str,Any]:
+    """トランスクリプトを流して統計を返す。workers>1 でプロセスプール（conv 単位で配る）。
+    戻り値: convs / turns / events / elapsed_s / turns_per_s / lat_ms(p50,p90,p99,max) / peak_rss_mb /
+            hashes(conv→最終 export_state hash) / digest（全 hash の要約）
+    """
+    convs = load_conversations(path)
+    o = {"seed": seed, "profile": profile, "card_secret": card_secret, "turn_dt_s": turn_dt_s, "explain": explain}
+    jobs = [(c, evs, o) for c, evs in convs.items()]
+    t0 = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            res = list(ex.map(_run_conv, jobs, chunksize=max(1, len(jobs) // (workers*4))))
+    else:
+        res = [_run_conv(j) for j in jobs]
+    el = time.perf_counter() - t0
+    lat = sorted(x for r in res for x in r["lat"])
+    hashes = {r["conv"]: r["hash"] for r in res}
+    rss = [r["rss_mb"] for r in res if r["rss_mb"] is not None]
+    return {
+        "convs": len(res), "turns": len(lat), "events": sum(r["events"] for r in res),
+        "workers": max(1, workers), "elapsed_s": el, "turns_per_s": len(lat) / el if el > 0 else 0.0,
+        "lat_ms": {k: _pct(lat, p) * 1e3 for k, p in (("p50", .50), ("p90", .90), ("p99", .99), ("max", 1.0))},
+        "peak_rss_mb": max(rss) if rss else None,
+        "card_rejected": sum(r["card_rejected"] for r in res),
+        "hashes": hashes,
+        "digest": hashlib.sha256("".join(f"{c}={h}\n" for c, h in sorted(hashes.items())).encode("utf-8")).hexdigest(),
+    }
+
+def check_determinism(path: str, worker_counts: Sequence[int]=(1, 2), **kw) -> Dict[str,Any]:
+    """ワーカー数を変えて同じトランスクリプトを流し、conv ごとの最終 hash を突き合わせる。"""
+    runs = [replay_conversations(path, workers=w, **kw) for w in worker_counts]
+    base = runs[0]["hashes"]
+    bad = sorted({c for r in runs[1:] for c, h in r["hashes"].items() if base.get(c) != h})
+    return {"ok": not bad, "mismatch": bad, "digests": [r["digest"] for r in runs], "runs": runs}
+
+_SYNTH_TEXT = ("今日の計画を立てたい。", "タスクを3分割して。", "締め切りが近くて不安です。",
+               "さっきの続き。次の一手は？", "進捗を整理したい。", "少し休んだほうがいい？")
+
+def synth_transcripts(path: str, convs: int, turns: int, seed: int=1, kpi_every: int=5) -> int:
+    """合成トランスクリプトを書き出す（負荷試験用）。戻り値は行数。"""
+    rng = random.Random(seed); n = 0
+    q = lambda: {k: round(rng.random(), 3) for k in ("project_success_prob", "trust_level", "stress_level", "reality")}
+    with open(path, "w", encoding="utf-8") as f:
+        for t in range(turns):  # 会話を交互に並べる（実トラフィックに近い順序）
+            for c in range(convs):
+                ev = {"conv": f"c{c}", "type": "user", "text": rng.choice(_SYNTH_TEXT), "dt_s": rng.randint(5, 120)}
+                f.write(json.dumps(ev, ensure_ascii=False) + "\n"); n += 1
+                if kpi_every and (t+1) % kpi_every == 0:
+                    ev = {"conv": f"c{c}", "type": "kpi", "task": "todo_plan", "before": q(), "after": q(), "dt_s": 0}
+                    f.write(json.dumps(ev, ensure_ascii=False) + "\n"); n += 1
+    return n
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m core.conv_replay")
+    ap.add_argument("path")
+    ap.add_argument("--workers", type=int, default=0)
+    ap.add_argument("--profile", default=Profile.MOBILE, choices=[Profile.MOBILE, Profile.DESKTOP, Profile.LAB_STRICT])
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--turn-dt", type=float, default=1.0)
+    ap.add_argument("--secret-env", default="WPCORE_CARD_SECRET", help="カード検証鍵を読む環境変数名")
+    ap.add_argument("--check", help="ワーカー数の並び（例: 1,4）で hash 再現性を確認")
+    ap.add_argument("--synth", help="CONVSxTURNS を path へ書き出して終了（例: 200x20）")
+    ap.add_argument("--out", help="結果 JSON の保存先")
+    a = ap.parse_args(argv)
+    if a.synth:
+        c, t = (int(x) for x in a.synth.lower().split("x"))
+        print(f"wrote {synth_transcripts(a.path, c, t, seed=a.seed)} events → {a.path}"); return 0
+    sec = os.getenv(a.secret_env)
+    kw = dict(profile=a.profile, seed=a.seed, card_secret=sec.encode("utf-8") if sec else None, turn_dt_s=a.turn_dt)
+    if a.check:
+        res = check_determinism(a.path, [int(x) for x in a.check.split(",")], **kw)
+        runs = res["runs"]
+    else:
+        res = replay_conversations(a.path, workers=a.workers, **kw); runs = [res]
+    for r in runs:
+        l = r["lat_ms"]; rss = "n/a" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.1f} MB"
+        print(f"workers={r['workers']} convs={r['convs']} turns={r['turns']} {r['turns_per_s']:.1f} turns/s  "
+              f"p50 {l['p50']:.2f} p90 {l['p90']:.2f} p99 {l['p99']:.2f} max {l['max']:.2f} ms  "
+              f"peak RSS {rss}  digest {r['digest'][:16]}")
+    if a.check:
+        print("determinism:", "OK" if res["ok"] else f"MISMATCH in {len(res['mismatch'])} convs: {res['mismatch'][:10]}")
+    if a.out:
+        with open(a.out, "w", encoding="utf-8") as f: json.dump(res, f, ensure_ascii=False, indent=1)
+    return 0 if (not a.check or res["ok"]) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+# core/geomd.py — ホスト内で共有する幾何デーモン（Unix ソケット、バイナリ枠、パイプライン＋バッチ）
+"""
+目的: ワーカープロセスごとに冷えたキャッシュで同じ距離を解き直さないよう、1ホスト1つの温まったキャッシュと
+  計算プール（line/geo/strict）をデーモンに持たせる。GeometryS はクライアントとして使い、無ければ自前で計算する。
+起動:
+  PYTHONPATH=. python -m core.geomd --socket /tmp/wpgeom.sock --workers 4 [--allow-strict]
+  クライアント側: WPCORE_GEOMD=/tmp/wpgeom.sock を設定（または GeometryS.use_daemon(path)）
+枠（little endian）:
+  frame    = len(u32) | payload
+  request  = req_id(u32) | op(u8) | mode(u8) | count(u16) | count × 8×f64（q1 の4軸, q2 の4軸。GeometryS.ORDER 順）
+  response = req_id(u32) | status(u8) | count(u16) | count × 2×f64（d, d_norm）
+             status≠0 のときは本体が UTF-8 のエラーメッセージ。op=STATS は JSON を返す
+  1接続で応答を待たずに次の要求を送ってよい（req_id で対応付け。完了順に返る）。
+キャッシュ:
+  キーは (mode, q1, q2) の float そのもの（丸めない）ので、結果はプロセス内計算とビット単位で同じ。
+  同じキーが計算中なら相乗りする（重複計算しない）。
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse, json, os, socket, struct, sys, threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from core.wise_partner_core_v52_plus import GeometryS
+
+_LEN = struct.Struct("<I")
+_REQ = struct.Struct("<IBBH")
+_RESP = struct.Struct("<IBH")
+_PAIR = struct.Struct("<8d")
+_OUT = struct.Struct("<2d")
+OP_DIST, OP_STATS = 1, 2
+MODES = ("line", "geo", "strict")
+ST_OK, ST_ERR = 0, 1
+MAX_BATCH = 65535
+_CHUNK = 16  # プールへ渡す1タスクあたりのペア数
+_MAX_FRAME = _REQ.size + MAX_BATCH * _PAIR.size  # 1フレームの上限（最大バッチの要求）。超えたら接続を切る
+
+Pair = Tuple[Dict[str,float], Dict[str,float]]
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        b = sock.recv(n - len(buf))
+        if not b: raise ConnectionError("geomd connection closed")
+        buf += b
+    return bytes(buf)
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    (n,) = _LEN.unpack(_recv_exact(sock, _LEN.size))
+    if n > _MAX_FRAME: raise ConnectionError(f"geomd frame too large ({n} bytes)")
+    return _recv_exact(sock, n)
+
+def _send_frame(sock: socket.socket, payload: bytes) -> None:
+    sock.sendall(_LEN.pack(len(payload)) + payload)
+
+def _worker_init() -> None:
+    GeometryS.use_daemon(None)  # デーモン配下では自分自身に問い合わせない
+
+def _compute_many(mode: str, rows: List[Tuple[float,...]]) -> List[Tuple[float,float]]:
+    # dist_norm は失敗時に黙って geo へ落ちるので使わない（落とすかどうかはクライアントが決める）
+    o = GeometryS.ORDER; Lref = GeometryS.ref_length(mode=mode); out = []
+    for r in rows:
+        L, _ = GeometryS.dist(dict(zip(o, r[:4])), dict(zip(o, r[4:])), mode=mode)
+        out.append((L, L / Lref))
+    return out
+
+class GeometryDaemon:
+    """Unix ソケットで距離要求を受ける。workers=0 なら接続スレッド内で計算（テスト/小規模向け）。"""
+    def __init__(self, path: str, workers: int=0, cache_cap: int=65536, allow_strict: bool=False) -> None:
+        if not hasattr(socket, "AF_UNIX"): raise RuntimeError("AF_UNIX not supported on this platform")
+        self.path, self.cache_cap, self.allow_strict = path, cache_cap, allow_strict
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_worker_init) if workers > 0 else None
+        self._cache: "OrderedDict[tuple, Tuple[float,float]]" = OrderedDict()
+        self._inflight: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._th: Optional[threading.Thread] = None
+        self._conns: List[socket.socket] = []
+        self._stop = threading.Event()
+        self.stats = {"connections": 0, "requests": 0, "pairs": 0, "cache_hits": 0, "shared": 0, "computed": 0, "errors": 0}
+
+    # ---- 起動/停止 ----
+    def start(self) -> "GeometryDaemon":
+        _worker_init()
+        if os.path.exists(self.path): os.unlink(self.path)  # 前回の残骸
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.bind(self.path); s.listen(64)
+        self._sock = s
+        self._th = threading.Thread(target=self._accept_loop, name="geomd-accept", daemon=True)
+        self._th.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            while not self._stop.wait(0.5): pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sock is not None:
+            try: self._sock.close()
+            except OSError: pass
+        for c in list(self._conns):
+            try: c.shutdown(socket.SHUT_RDWR); c.close()
+            except OSError: pass
+        if self._th is not None: self._th.join(2.0)
+        if self._pool is not None: self._pool.shutdown(wait=False, cancel_futures=True)
+        try: os.unlink(self.path)
+        except OSError: pass
+
+    # ---- 受付 ----
+    def _accept_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                c, _ = self._sock.accept()
+            except OSError:
+                return
+            with self._lock: self.stats["connections"] += 1
+            self._conns.append(c)
+            threading.Thread(target=self._serve_conn, args=(c,), name="geomd-conn", daemon=True).start()
+
+    def _serve_conn(self, c: socket.socket) -> None:
+        wlock = threading.Lock()
+        def reply(payload: bytes) -> None:
+            with wlock:
+                try: _send_frame(c, payload)
+                except OSError: pass
+        try:
+            while True:
+                self._handle(_recv_frame(c), reply)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if c in self._conns: self._conns.remove(c)
+            try: c.close()
+            except OSError: pass
+
+    def _handle(self, req: bytes, reply) -> None:
+        def err(msg: str) -> None:
+            with self._lock: self.stats["errors"] += 1
+            reply(_RESP.pack(rid, ST_ERR, 0) + msg.encode("utf-8"))
+        if len(req) < _REQ.size:
+            rid = 0; return err("bad request")
+        rid, op, mi, n = _REQ.unpack_from(req, 0)
+        with self._lock: self.stats["requests"] += 1
+        if op == OP_STATS:
+            with self._lock: st = dict(self.stats, cache_size=len(self._cache), inflight=len(self._inflight))
+            reply(_RESP.pack(rid, ST_OK, 0) + json.dumps(st).encode("utf-8")); return
+        if op != OP_DIST or mi >= len(MODES): return err("bad request")
+        mode = MODES[mi]
+        if mode == "strict" and not self.allow_strict: return err("strict not allowed by this daemon")
+        if len(req) != _REQ.size + n * _PAIR.size: return err("bad length")
+        rows = [_PAIR.unpack_from(req, _REQ.size + i*_PAIR.size) for i in range(n)]
+        res: List[Any] = [None] * n
+        waits: List[Tuple[int, Future]] = []
+        todo: List[Tuple[int, tuple]] = []
+        with self._lock:
+            self.stats["pairs"] += n
+            for i, r in enumerate(rows):
+                key = (mi,) + r
+                hit = self._cache.get(key)
+                if hit is not None:
+                    self._cache.move_to_end(key); res[i] = hit; self.stats["cache_hits"] += 1
+                elif key in self._inflight:
+                    waits.append((i, self._inflight[key])); self.stats["shared"] += 1
+                else:
+                    f: Future = Future(); self._inflight[key] = f
+                    waits.append((i, f)); todo.append((i, key))
+        # 新規分は _CHUNK 件ずつプールへ（workers=0 ならここで計算）
+        for k in range(0, len(todo), _CHUNK):
+            part = todo[k:k+_CHUNK]
+            args = (mode, [key[1:] for _, key in part])
+            if self._pool is None:
+                fut: Future = Future()
+                try: fut.set_result(_compute_many(*args))
+                except Exception as e: fut.set_exception(e)
+            else:
+                fut = self._pool.submit(_compute_many, *args)
+            fut.add_done_callback(lambda fu, part=part: self._settle(part, fu))
+        if not waits:
+            reply(_RESP.pack(rid, ST_OK, n) + b"".join(_OUT.pack(*x) for x in res)); return
+        left = [len(waits)]; lk = threading.Lock(); failed: List[str] = []
+        def done(i: int, fu: Future) -> None:
+            e = fu.exception()
+            if e is not None: failed.append(str(e))
+            else: res[i] = fu.result()
+            with lk:
+                left[0] -= 1; last = left[0] == 0
+            if last:
+                if failed: err(failed[0])
+                else: reply(_RESP.pack(rid, ST_OK, n) + b"".join(_OUT.pack(*x) for x in res))
+        for i, f in waits:
+            f.add_done_callback(lambda fu, i=i: done(i, fu))
+
+    def _settle(self, part: List[Tuple[int, tuple]], fu: Future) -> None:
+        e = fu.exception()
+        out = None if e is not None else fu.result()
+        with self._lock:
+            futs = [self._inflight.pop(key) for _, key in part]
+            if out is not None:
+                self.stats["computed"] += len(part)
+                for (_, key), v in zip(part, out):
+                    self._cache[key] = v
+                while len(self._cache) > self.cache_cap: self._cache.popitem(last=False)
+        for j, f in enumerate(futs):
+            if out is None: f.set_exception(e)
+            else: f.set_result(out[j])
+
+class GeomClient:
+    """デーモンへの接続1本。submit() は応答を待たずに返る（パイプライン）。スレッド安全。"""
+    def __init__(self, path: str, timeout: float=30.0) -> None:
+        if not hasattr(socket, "AF_UNIX"): raise ConnectionError("AF_UNIX not supported on this platform")
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.connect(path)
+        self._s, self.timeout = s, timeout
+        self._wlock = threading.Lock(); self._plock = threading.Lock()
+        self._pending: Dict[int, Tuple[int, Future]] = {}
+        self._next = 0
+        self.closed = False
+        self._th = threading.Thread(target=self._read_loop, name="geomd-client", daemon=True)
+        self._th.start()
+
+    def _read_loop(self) -> None:
+        try:
+            while True:
+                b = _recv_frame(self._s)
+                rid, st, n = _RESP.unpack_from(b, 0)
+                with self._plock: op, f = self._pending.pop(rid, (0, None))
+                if f is None: continue
+                body = b[_RESP.size:]
+                if st != ST_OK: f.set_exception(RuntimeError(body.decode("utf-8", "replace")))
+                elif op == OP_STATS: f.set_result(json.loads(body.decode("utf-8")))
+                else: f.set_result([_OUT.unpack_from(body, i*_OUT.size) for i in range(n)])
+        except (ConnectionError, OSError) as e:
+            self.closed = True
+            with self._plock: pend, self._pending = self._pending, {}
+            for _, f in pend.values(): f.set_exception(ConnectionError(str(e) or "geomd connection lost"))
+
+    def _send(self, op: int, mi: int, body: bytes, n: int) -> Future:
+        if self.closed: raise ConnectionError("geomd connection closed")
+        f: Future = Future()
+        with self._plock:
+            rid = self._next = (self._next + 1) & 0xFFFFFFFF
+            self._pending[rid] = (op, f)
+        try:
+            with self._wlock: _send_frame(self._s, _REQ.pack(rid, op, mi, n) + body)
+        except OSError as e:
+            with self._plock: self._pending.pop(rid, None)
+            self.closed = True
+            raise ConnectionError(str(e)) from e
+        return f
+
+    def submit(self, mode: str, pairs: Sequence[Pair]) -> Future:
+        """[(d, d_norm), ...] を返す Future。"""
+        if len(pairs) > MAX_BATCH: raise ValueError(f"batch too large (max {MAX_BATCH})")
+        o = GeometryS.ORDER
+        body = b"".join(_PAIR.pack(*(float(q1.get(k, 0.5)) for k in o), *(float(q2.get(k, 0.5)) for k in o))
+                        for q1, q2 in pairs)
+        return self._send(OP_DIST, MODES.index(mode), body, len(pairs))
+
+    def dist_many(self, mode: str, pairs: Sequence[Pair]) -> List[Tuple[float,float]]:
+        return self.submit(mode, pairs).result(self.timeout)
+
+    def stats(self) -> Dict[str,Any]:
+        return self._send(OP_STATS, 0, b"", 0).result(self.timeout)
+
+    def close(self) -> None:
+        self.closed = True
+        try: self._s.shutdown(socket.SHUT_RDWR); self._s.close()
+        except OSError: pass
+
+def main(argv: Optional[Sequence[str]]=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m core.geomd")
+    ap.add_argument("--socket", default=os.getenv("WPCORE_GEOMD", "/tmp/wpgeom.sock"))
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--cache", type=int, default=65536)
+    ap.add_argument("--allow-strict", action="store_true")
+    a = ap.parse_args(argv)
+    d = GeometryDaemon(a.socket, workers=a.workers, cache_cap=a.cache, allow_strict=a.allow_strict)
+    print(f"geomd listening on {a.socket} (workers={a.workers}, strict={'on' if a.allow_strict else 'off'})")
+    d.serve_forever()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
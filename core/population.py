@@ -0,0 +1,314 @@
+# core/population.py — 多数個体の一括シミュレーション（struct-of-arrays, NumPy・任意）
+"""
+LAB_STRICT の集団研究向け。N 体の WisePartnerAgent の状態を連続配列に詰め、1 tick で全個体の respond 相当を進める。
+  pop = Population.replicate(agent, 10_000, seed=1, metric_mode="geo")   # 雛形を N 体に複製
+  pop = Population([a1, a2, ...])                                        # 既存の個体を詰める（装着カードは共通）
+  out = pop.step("計画を立てたい", now=T)   # 刺激は1本（全員）か N 本の列。out は配列の dict
+  a = pop.member(17)                        # 通常の WisePartnerAgent に書き戻す（以後そのまま respond できる）
+配列（N 行）:
+  personality (N,3) int / wellbeing (N,4) / link 行 "respond_helpfully|be_kind" の impact・conf (N,4) /
+  Adam の m・v・t・lr (N,4) / 報酬ベースライン (N,) / 滲み痕跡のリング (N,trace_cap)
+1 tick（respond のテキスト以外と同じ式）:
+  カード影響（話題一致×α×γ×bias を cap でクリップ→合算キャップ）と痕跡の減衰 → 結果シミュレーション 8 回 →
+  人格滲み → METRICS タグ経由の読み戻し（小数3桁）→ line/geo 距離 → conf と発話行為 → 𝒢（Adam）更新
+respond との違い:
+  - 乱数は numpy の Generator（個体ごとの random.Random 列とは一致しない。分布は同じ）
+  - 距離は line(48分割) / geo(64分割・5反復・seed 42 の探索列) をベクトル化。geo の探索列はデータに依らないので全個体で共有
+  - 痕跡は trace_cap 枠のリング（枯れた痕跡の枠も古い順に上書き。tau が1種類なら従来と同じ）
+  - link の上限/追い出し、監査、テキスト生成はしない
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from dataclasses import replace
+import random
+import numpy as np
+from core.wise_partner_core_v52_plus import (
+    WisePartnerAgent, GeometryS, Personality, UserWellbeing, AgentState, WorldModel, Coupling,
+    _Adam, _TraceBuf, _Cfg, _wm_key, _compact_row)
+
+METRICS = ("project_success_prob", "trust_level", "stress_level", "reality")
+LINK_KEY = _wm_key("respond_helpfully", "be_kind")
+ACTS = ("answer", "clarify", "refuse")   # step() の "act" はこの添字
+_SIMS = 8
+_ADAM = _Adam()   # b1/b2/eps の既定値（lr は個体ごと）
+_SCORE_W = np.array([0.5, 0.3, -0.3, 0.2])
+
+# ---- 幾何（GeometryS の line/geo と同じ式を (N,...) 配列で） ----
+def _embed(q: np.ndarray) -> np.ndarray:
+    e = q.copy(); e[..., 2] = 1.0 - q[..., 2]
+    return e
+
+def _quad(x: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """中点 x（埋め込み座標）での dᵀg d。g = AᵀA + 1e-3·I（A は GeometryS.metric の上三角）なので |A d|² + 1e-3|d|²。"""
+    ps = np.clip(x[..., 0], 0.0, 1.0); tr = np.clip(x[..., 1], 0.0, 1.0)
+    inv = 1.0 - np.clip(1.0 - x[..., 2], 0.0, 1.0); re = np.clip(x[..., 3], 0.0, 1.0)
+    d0, d1, d2, d3 = d[..., 0], d[..., 1], d[..., 2], d[..., 3]
+    r0 = (1.0 + 0.6*(1-ps))*d0 + 0.15*(tr-0.5)*d1 + 0.10*(0.5-inv)*d2 + 0.06*(re-0.5)*d3
+    r1 = (1.0 + 0.5*tr)*d1 + 0.12*(tr-0.5)*d2 + 0.05*(re-0.5)*d3
+    r2 = (1.0 + 0.7*(1-inv))*d2 + 0.04*(0.5-inv)*d3
+    r3 = (1.0 + 0.4*re)*d3
+    return r0*r0 + r1*r1 + r2*r2 + r3*r3 + 1e-3*(d0*d0 + d1*d1 + d2*d2 + d3*d3)
+
+def line_length(v1: np.ndarray, v2: np.ndarray, steps: int=48) -> np.ndarray:
+    """GeometryS.riem_line_length のベクトル版。v1, v2 は埋め込み座標 (N,4)。"""
+    dv = (v2 - v1) / steps
+    mid = v1[:, None, :] + (np.arange(steps) + 0.5)[None, :, None] * dv[:, None, :]
+    return np.sqrt(np.maximum(1e-12, _quad(mid, dv[:, None, :]))).sum(axis=1)
+
+def _bezier_length(A: np.ndarray, C: np.ndarray, B: np.ndarray, steps: int) -> np.ndarray:
+    t = np.arange(steps + 1) / steps; it = 1.0 - t
+    P = ((it*it)[None, :, None] * A[:, None, :] + (2*it*t)[None, :, None] * C[:, None, :]
+         + (t*t)[None, :, None] * B[:, None, :])
+    return np.sqrt(np.maximum(1e-12, _quad((P[:, 1:] + P[:, :-1]) * 0.5, P[:, 1:] - P[:, :-1]))).sum(axis=1)
+
+_OFFSETS: Dict[Tuple[int,int], np.ndarray] = {}
+def _geo_offsets(iters: int, seed: int) -> np.ndarray:
+    # geodesic_length の乱数探索は (iters×10 候補×4 座標) の rng.random() 列だけで決まる
+    o = _OFFSETS.get((iters, seed))
+    if o is None:
+        rng = random.Random(seed)
+        o = _OFFSETS[(iters, seed)] = np.array([[[rng.random() - 0.5 for _ in range(4)] for _k in range(10)]
+                                                for _ in range(iters)]).reshape(iters, 10, 4)
+    return o
+
+def geo_length(v1: np.ndarray, v2: np.ndarray, steps: int=64, iters: int=5, jitter: float=0.15, seed: int=42) -> np.ndarray:
+    """GeometryS.geodesic_length のベクトル版（制御点の採否を個体ごとにマスクで持つ）。"""
+    off = _geo_offsets(iters, seed)
+    C = (v1 + v2) / 2.0
+    best = _bezier_length(v1, C, v2, steps)
+    for i in range(iters):
+        scale = jitter
+        for k in range(10):
+            cand = np.clip(C + scale*off[i, k], 0.0, 1.0)
+            val = _bezier_length(v1, cand, v2, steps); win = val < best
+            C = np.where(win[:, None], cand, C); best = np.where(win, val, best)
+        grad = np.empty_like(C)
+        for k in range(4):
+            C2 = C.copy(); C2[:, k] = np.clip(C2[:, k] + 1e-3, 0.0, 1.0)
+            grad[:, k] = (_bezier_length(v1, C2, v2, 48) - best) / 1e-3
+        Cg = np.clip(C - scale*0.3*grad, 0.0, 1.0)
+        val = _bezier_length(v1, Cg, v2, steps); win = val < best
+        C = np.where(win[:, None], Cg, C); best = np.where(win, val, best)
+        jitter *= 0.6
+    return best
+
+# ---- 集団 ----
+class Population:
+    _ARRAYS = ("personality", "trait_lo", "trait_hi", "wellbeing", "impact", "conf", "has",
+               "adam_m", "adam_v", "adam_t", "adam_lr", "adam_has", "g_lr", "g_beta", "r_base",
+               "card_mag", "coupling", "bleed", "speak", "turn", "tr_m", "tr_d", "tr_ts", "tr_tau", "tr_seq", "tr_wp")
+
+    def __init__(self, agents: Sequence[WisePartnerAgent], metric_mode: str="line", seed: int=0,
+                 trace_cap: Optional[int]=None) -> None:
+        if not agents: raise ValueError("empty population")
+        if metric_mode not in ("line", "geo"): raise ValueError(f"metric_mode must be line or geo, not {metric_mode!r}")
+        proto = agents[0]
+        ids = [c.meta.id for c in proto.card_mgr.active]
+        for a in agents[1:]:
+            if [c.meta.id for c in a.card_mgr.active] != ids:
+                raise ValueError("all members must carry the same active cards")
+        self.proto, self.n, self.metric_mode, self.seed = proto, len(agents), metric_mode, seed
+        self.rng = np.random.default_rng(seed)
+        self._setup_cards(proto)
+        self._gather(agents, proto._wm_trace_cap if trace_cap is None else trace_cap)
+
+    @classmethod
+    def replicate(cls, agent: WisePartnerAgent, n: int, **kw) -> "Population":
+        """agent を n 体に複製した集団（状態は同一、以後は乱数だけが個体差を作る）。"""
+        pop = cls([agent], **kw)
+        for name in cls._ARRAYS:
+            setattr(pop, name, np.repeat(getattr(pop, name), n, axis=0))
+        pop._rest = pop._rest * n   # link の他の行は読むだけなので共有
+        pop.n = n
+        return pop
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _setup_cards(self, proto: WisePartnerAgent) -> None:
+        self.metrics: List[str] = list(METRICS)
+        self._cards = [c for c in proto.card_mgr.active if c.influence.cap > 0]
+        self._domains = [c.influence.domains for c in self._cards]
+        self._bias: List[Tuple[int,int,float,float]] = []   # (カード, metric, クリップ済み bias, tau_s)
+        for ci, c in enumerate(self._cards):
+            infl = c.influence
+            g = WisePartnerAgent._gamma(infl.evidence_level); a = max(0.0, infl.alpha)
+            for metric, base in (infl.metric_bias or {}).items():
+                v = max(-infl.cap, min(infl.cap, a * g * base))   # 話題一致 δ は 0/1 なので先にクリップしてよい
+                if abs(v) < 1e-6: continue
+                self._bias.append((ci, self._metric_idx(metric), v, max(1.0, infl.tau_days*86400.0)))
+        self._eps_bleed = max([0.0] + [getattr(c.influence, "epsilon_bleed", 0.0) for c in proto.card_mgr.active])
+
+    def _metric_idx(self, metric: str) -> int:
+        if metric not in self.metrics: self.metrics.append(metric)
+        return self.metrics.index(metric)
+
+    def _gather(self, agents: Sequence[WisePartnerAgent], cap: int) -> None:
+        n = len(agents)
+        self.personality = np.array([[a.personality.openness, a.personality.agreeableness, a.personality.conscientiousness]
+                                     for a in agents], dtype=np.int64)
+        self.trait_lo = np.array([a.dynamics.trait_min for a in agents], dtype=np.int64)
+        self.trait_hi = np.array([a.dynamics.trait_max for a in agents], dtype=np.int64)
+        self.wellbeing = np.array([[getattr(a.state.user_wellbeing, m) for m in METRICS] for a in agents], dtype=float)
+        self.impact = np.zeros((n, 4)); self.conf = np.zeros((n, 4)); self.has = np.zeros((n, 4), dtype=bool)
+        self.adam_m = np.zeros((n, 4)); self.adam_v = np.zeros((n, 4)); self.adam_t = np.zeros((n, 4), dtype=np.int64)
+        self.adam_lr = np.zeros((n, 4)); self.adam_has = np.zeros((n, 4), dtype=bool)
+        self._rest: List[Dict[str,Any]] = []
+        for i, a in enumerate(agents):
+            links = a.state.world_model.links
+            for metric, (imp, cf) in links.get(LINK_KEY, {}).items():
+                if metric not in METRICS: raise ValueError(f"unsupported metric {metric!r} in {LINK_KEY}")
+                j = METRICS.index(metric); self.impact[i, j], self.conf[i, j], self.has[i, j] = imp, cf, True
+            for j, metric in enumerate(METRICS):
+                o = a._g_opt.get(f"{LINK_KEY}::{metric}")
+                if o is None: self.adam_lr[i, j] = a._g_lr
+                else: self.adam_m[i, j], self.adam_v[i, j], self.adam_t[i, j], self.adam_lr[i, j], self.adam_has[i, j] = o.m, o.v, o.t, o.lr, True
+            self._rest.append(dict(links))   # 行は差し替え更新なので浅いコピーで足りる
+        self.g_lr = np.array([a._g_lr for a in agents]); self.g_beta = np.array([a._g_beta for a in agents])
+        self.r_base = np.array([a._g_r_baseline for a in agents], dtype=float)
+        self.card_mag = np.array([a._last_card_influence_mag for a in agents], dtype=float)
+        self.coupling = np.array([a.coupling.enabled for a in agents], dtype=bool)
+        self.bleed = np.array([a._persona_bleed_enabled for a in agents], dtype=bool)
+        self.speak = np.array([a._uncertainty_mode == "speak" for a in agents], dtype=bool)
+        self.turn = np.array([a._turn for a in agents], dtype=np.int64)
+        # 痕跡: カードの bias が無く既存の痕跡も無ければ枠を持たない
+        traces = [list(a._wm_traces)[-cap:] if cap > 0 else [] for a in agents]
+        self.trace_cap = cap if (self._bias or any(traces)) and cap > 0 else 0
+        shape = (n, self.trace_cap)
+        self.tr_m = np.full(shape, -1, dtype=np.int16); self.tr_d = np.zeros(shape); self.tr_ts = np.zeros(shape)
+        self.tr_tau = np.ones(shape); self.tr_seq = np.zeros(shape, dtype=np.int64); self.tr_wp = np.zeros(n, dtype=np.int64)
+        for i, tr in enumerate(traces):
+            for s, (metric, d0, ts, tau) in enumerate(tr):
+                self.tr_m[i, s], self.tr_d[i, s], self.tr_ts[i, s], self.tr_tau[i, s], self.tr_seq[i, s] = \
+                    self._metric_idx(metric), d0, ts, tau, s
+            self.tr_wp[i] = len(tr)
+        self._seq = max([len(t) for t in traces] + [0])
+
+    # ---- 1 tick ----
+    def _stimuli(self, stimuli: Union[str, Sequence[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """刺激 → (話題一致 (N,カード), 領域内 (N,))。文字列ごとに1回だけ判定する。"""
+        if isinstance(stimuli, str):
+            texts = [stimuli]; inv = np.zeros(self.n, dtype=np.intp)
+        else:
+            if len(stimuli) != self.n: raise ValueError(f"expected {self.n} stimuli, got {len(stimuli)}")
+            uniq: Dict[str,int] = {}
+            inv = np.fromiter((uniq.setdefault(t, len(uniq)) for t in stimuli), dtype=np.intp, count=self.n)
+            texts = list(uniq)
+        hit = np.array([[WisePartnerAgent._topic_delta(t, d) > 0 for d in self._domains] for t in texts],
+                       dtype=bool).reshape(len(texts), len(self._domains))
+        dom = np.array([self.proto._domain_hit(t) for t in texts], dtype=bool)
+        return hit[inv], dom[inv]
+
+    def _append_traces(self, rows: np.ndarray, metric: int, d0: float, ts: float, tau: float) -> None:
+        if not self.trace_cap or not rows.size: return
+        slot = self.tr_wp[rows] % self.trace_cap
+        self.tr_m[rows, slot], self.tr_d[rows, slot], self.tr_ts[rows, slot], self.tr_tau[rows, slot] = metric, d0, ts, tau
+        self.tr_seq[rows, slot] = self._seq; self._seq += 1
+        self.tr_wp[rows] += 1
+
+    def _decay(self, now: float) -> np.ndarray:
+        out = np.zeros((self.n, len(self.metrics)))
+        if not self.trace_cap: return out
+        live = self.tr_m >= 0
+        age = np.maximum(0.0, now - self.tr_ts)
+        d = self.tr_d * np.exp(-age / self.tr_tau)
+        keep = live & (np.abs(d) >= 1e-6) & (age < self.tr_tau*10)
+        self.tr_m[live & ~keep] = -1
+        for mi in range(len(self.metrics)):
+            out[:, mi] = np.where(keep & (self.tr_m == mi), d, 0.0).sum(axis=1)
+        return out
+
+    def step(self, stimuli: Union[str, Sequence[str]], now: Optional[float]=None) -> Dict[str,np.ndarray]:
+        """全個体を1ターン進める。戻り値（各 N 行）:
+        score / snapshot (N,4) / got (N,4, 読み戻し) / d / d_norm / conf / act（ACTS の添字）/ in_domain / updated（𝒢 更新の有無）"""
+        n = self.n
+        now = float(self.proto._clock() if now is None else now)
+        hit, in_dom = self._stimuli(stimuli)
+        # カード影響（_apply_card_influences_once）
+        total = np.zeros((n, len(self.metrics))); acc = np.zeros(n)
+        for ci, mi, v, tau in self._bias:
+            on = hit[:, ci]
+            total[:, mi] += np.where(on, v, 0.0); acc += np.where(on, abs(v), 0.0)
+            self._append_traces(np.nonzero(on)[0], mi, v, now, tau)
+        mag = np.abs(total).sum(axis=1); over = mag > _Cfg.TOTAL_BIAS_CAP
+        if over.any():
+            total *= np.where(over, _Cfg.TOTAL_BIAS_CAP / np.maximum(1e-9, mag), 1.0)[:, None]
+            acc = np.where(over, np.abs(total).sum(axis=1), acc)
+        self.card_mag = acc
+        bump = total[:, :4] + self._decay(now)[:, :4]
+        # 結果シミュレーション（_simulate_outcome）
+        noise = self.rng.standard_normal((n, _SIMS, 4)) * (0.15*(1.0 - self.conf))[:, None, :]
+        link = np.where(self.has, self.impact*self.conf, 0.0)[:, None, :] + np.where(self.has[:, None, :], noise, 0.0)
+        sims = np.clip(self.wellbeing[:, None, :] + link + bump[:, None, :], 0.0, 1.0)
+        score = (sims @ _SCORE_W + 0.3).mean(axis=1)
+        snap = sims[:, 0, :]
+        # 人格滲み（_persona_update_from_outcome）
+        if self._eps_bleed > 0:
+            b = np.minimum(acc * self._eps_bleed, _Cfg.PERSONA_BLEED_CAP)
+            on = self.bleed & self.coupling & (b > 0)
+            if on.any():
+                for ti, sens in enumerate((0.6, 0.3, 0.2)):
+                    dt = np.round(50 * b * sens).astype(np.int64)
+                    self.personality[:, ti] = np.where(on & (dt != 0), np.clip(self.personality[:, ti] + dt, self.trait_lo, self.trait_hi),
+                                                       self.personality[:, ti])
+        # Realizer の METRICS タグ → semanticize（reality は score から）
+        got = np.round(np.column_stack([snap[:, 0], snap[:, 1], snap[:, 2], np.clip(0.5 + 0.2*(score - 0.5), 0.0, 1.0)]), 3)
+        v1, v2 = _embed(snap), _embed(got)
+        d = line_length(v1, v2) if self.metric_mode == "line" else geo_length(v1, v2)
+        d_norm = d / GeometryS.ref_length(self.metric_mode)
+        conf = np.clip(0.5*(1.0 - d_norm) + 0.3*score + 0.2*snap[:, 3], 0.0, 1.0)
+        refuse = ~in_dom & (conf < 0.35)
+        act = np.where(refuse, 2, np.where(self.speak & (conf < 0.5), 1, 0)).astype(np.int8)
+        # 𝒢（_g_update_links）: 読み戻しの reality が 0.55 未満の個体は更新しない
+        upd = got[:, 3] >= 0.55
+        if upd.any():
+            dd = got - snap
+            r = 0.40*dd[:, 0] + 0.30*dd[:, 1] + 0.20*(-dd[:, 2]) + 0.10*dd[:, 3] - 0.35*d_norm
+            rb = np.where(upd, self.g_beta*self.r_base + (1 - self.g_beta)*r, self.r_base)
+            adv = r - rb; self.r_base = rb
+            live = self.has & upd[:, None]
+            grad = self.conf * dd * (1.0 + adv)[:, None] - 0.5*self.impact
+            t = self.adam_t + live
+            m = np.where(live, _ADAM.b1*self.adam_m + (1 - _ADAM.b1)*grad, self.adam_m)
+            v = np.where(live, _ADAM.b2*self.adam_v + (1 - _ADAM.b2)*grad*grad, self.adam_v)
+            tt = np.maximum(t, 1)
+            step = self.adam_lr * (m / (1 - _ADAM.b1**tt)) / (np.sqrt(v / (1 - _ADAM.b2**tt)) + _ADAM.eps)
+            new = np.clip(self.impact + step, -0.2, 0.2); new = np.where(np.abs(new) < 1e-4, 0.0, new)
+            self.impact = np.where(live, new, self.impact)
+            self.adam_m, self.adam_v, self.adam_t = m, v, t; self.adam_has |= live
+        self.turn += 1
+        return {"score": score, "snapshot": snap, "got": got, "d": d, "d_norm": d_norm, "conf": conf,
+                "act": act, "in_domain": in_dom, "updated": upd}
+
+    # ---- 書き戻し ----
+    def member(self, i: int, seed: Optional[int]=None) -> WisePartnerAgent:
+        """i 番目の個体を通常の WisePartnerAgent として取り出す（雛形の複製に配列の値を書き戻す）。"""
+        if not 0 <= i < self.n: raise IndexError(i)
+        a = self.proto._clone(self.seed * 1_000_003 + i if seed is None else seed)
+        a.personality = Personality(*(int(x) for x in self.personality[i]))
+        a.dynamics = replace(self.proto.dynamics, trait_min=int(self.trait_lo[i]), trait_max=int(self.trait_hi[i]))
+        links = dict(self._rest[i])
+        row = {m: (float(self.impact[i, j]), float(self.conf[i, j])) for j, m in enumerate(METRICS) if self.has[i, j]}
+        if row or LINK_KEY in links: links[LINK_KEY] = _compact_row(row)
+        a.state = AgentState(user_wellbeing=UserWellbeing(**{m: float(x) for m, x in zip(METRICS, self.wellbeing[i])}),
+                             world_model=WorldModel(links=links))
+        a._link_tick = 0; a._link_touch = {}
+        for k in links: a._links_touch(k)
+        if LINK_KEY in links: a._links_touch(LINK_KEY)
+        a._g_opt = {}
+        for j, m in enumerate(METRICS):
+            if self.adam_has[i, j]:
+                o = _Adam(lr=float(self.adam_lr[i, j]))
+                o.m, o.v, o.t = float(self.adam_m[i, j]), float(self.adam_v[i, j]), int(self.adam_t[i, j])
+                a._g_opt[f"{LINK_KEY}::{m}"] = o
+        a._g_lr, a._g_beta, a._g_r_baseline = float(self.g_lr[i]), float(self.g_beta[i]), float(self.r_base[i])
+        a._last_card_influence_mag = float(self.card_mag[i]); a._turn = int(self.turn[i])
+        a.coupling = Coupling(enabled=bool(self.coupling[i])); a._persona_bleed_enabled = bool(self.bleed[i])
+        a._uncertainty_mode = "speak" if self.speak[i] else "quiet"
+        tb = _TraceBuf()
+        if self.trace_cap:
+            slots = np.nonzero(self.tr_m[i] >= 0)[0]
+            for s in slots[np.argsort(self.tr_seq[i, slots], kind="stable")]:
+                tb.append(self.metrics[self.tr_m[i, s]], float(self.tr_d[i, s]), float(self.tr_ts[i, s]), float(self.tr_tau[i, s]))
+        a._wm_traces = tb
+        return a
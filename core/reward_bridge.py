@@ -1,13 +1,176 @@
 # 外部KPI→進化法則𝒢へのブリッジ（完全ローカル）
-from typing import Dict, List, Optional
-from core.wise_partner_core_v52_plus import WisePartnerAgent, GeometryS
+from typing import Dict, List, Optional, Iterator, Iterable, Any, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import csv, json, os, time, threading
+from core.wise_partner_core_v52_plus import WisePartnerAgent, GeometryS, _Adam
+
+_METRICS = ["project_success_prob","trust_level","stress_level","reality"]
 
 def _key(task: str) -> str:
     return f"task:{task}|external"
 
+# ---- replay 用パイプライン部品 ----
+def _iter_jsonl(path: str) -> Iterator[Dict[str,Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line: yield json.loads(line)
+
+def _iter_csv(path: str) -> Iterator[Dict[str,Any]]:
+    # 列: task, before_<metric>, after_<metric>, [metrics(";"区切り)], [d_norm]
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            rec: Dict[str,Any] = {
+                "task": row["task"],
+                "before": {m: float(row[f"before_{m}"]) for m in _METRICS if row.get(f"before_{m}") not in (None, "")},
+                "after":  {m: float(row[f"after_{m}"])  for m in _METRICS if row.get(f"after_{m}") not in (None, "")},
+            }
+            if row.get("metrics"): rec["metrics"] = [m for m in row["metrics"].split(";") if m]
+            if row.get("d_norm") not in (None, ""): rec["d_norm"] = float(row["d_norm"])
+            yield rec
+
+def iter_kpi_records(path: str) -> Iterator[Dict[str,Any]]:
+    """KPIレコードを1件ずつ返す（.csv はCSV、それ以外は JSONL）。"""
+    return _iter_csv(path) if path.lower().endswith(".csv") else _iter_jsonl(path)
+
+def _batched(it: Iterable[Dict[str,Any]], n: int) -> Iterator[List[Dict[str,Any]]]:
+    buf: List[Dict[str,Any]] = []
+    for x in it:
+        buf.append(x)
+        if len(buf) >= n:
+            yield buf; buf = []
+    if buf: yield buf
+
+def _dnorm_job(job: Tuple[Dict[str,float], Dict[str,float], str]) -> float:
+    before, after, mode = job
+    _, dn, _ = GeometryS.dist_norm(before, after, mode=mode)
+    return dn
+
+# ---- オンライン取り込み（有界キュー＋タスク単位の合流） ----
+class _Pending:
+    __slots__ = ("key","task","before","after","metrics","d_norm","first_ts","n")
+    def __init__(self, key, task, before, after, metrics, d_norm, ts):
+        self.key, self.task, self.before, self.after = key, task, before, after
+        self.metrics = list(metrics) if metrics is not None else None
+        self.d_norm, self.first_ts, self.n = d_norm, ts, 1
+
+class _IngestQueue:
+    """RewardBridge.report をバックグラウンドで処理する有界キュー。
+    同じ task キーへの報告は window_s 内なら1件に合流し（before=最初, after=最後）、
+    d_norm は合流後のペアで1回だけ計算する（最後の報告が d_norm を渡していればその値。after と組の値なので）。
+    """
+    def __init__(self, bridge: "RewardBridge", maxsize: int=1024, window_s: float=0.25,
+                 mode: str="geo", drop: str="oldest") -> None:
+        if drop not in ("oldest","new"): raise ValueError(f"unknown drop policy {drop}")
+        self.bridge, self.maxsize, self.window_s, self.mode, self.drop = bridge, max(1, maxsize), max(0.0, window_s), mode, drop
+        self._q: "deque[_Pending]" = deque()
+        self._open: Dict[str,_Pending] = {}
+        self._cv = threading.Condition()
+        self._stop = False; self._busy = False; self._flushing = 0
+        self._m = {"submitted": 0, "coalesced": 0, "processed": 0, "dropped": 0, "errors": 0,
+                   "lag_last_s": 0.0, "lag_max_s": 0.0, "lag_ewma_s": 0.0}
+        self._th = threading.Thread(target=self._run, name="reward-bridge-ingest", daemon=True)
+        self._th.start()
+
+    def submit(self, task: str, before: Dict[str,float], after: Dict[str,float],
+               metrics: Optional[List[str]]=None, d_norm: Optional[float]=None) -> bool:
+        key = _key(task); now = time.monotonic()
+        with self._cv:
+            if self._stop: raise RuntimeError("ingest queue is stopped")
+            self._m["submitted"] += 1
+            p = self._open.get(key)
+            if p is not None and (now - p.first_ts) <= self.window_s:
+                p.after = dict(after); p.n += 1; p.d_norm = d_norm  # after が変わったので d_norm も最後の報告のもの（None なら再計算）
+                if p.metrics is not None:
+                    p.metrics = None if metrics is None else p.metrics + [m for m in metrics if m not in p.metrics]
+                self._m["coalesced"] += 1
+                return True
+            if len(self._q) >= self.maxsize:
+                self._m["dropped"] += 1
+                if self.drop == "new":
+                    self.bridge.agent._audit.emit("kpi_ingest_drop", key=key, policy="new")
+                    return False
+                old = self._q.popleft()
+                if self._open.get(old.key) is old: del self._open[old.key]
+                self.bridge.agent._audit.emit("kpi_ingest_drop", key=old.key, policy="oldest")
+            p = _Pending(key, task, dict(before), dict(after), metrics, d_norm, now)
+            self._q.append(p); self._open[key] = p
+            self._cv.notify()
+            return True
+
+    def _take(self) -> Optional[_Pending]:
+        with self._cv:
+            while True:
+                if self._q:
+                    head = self._q[0]
+                    wait = head.first_ts + self.window_s - time.monotonic()
+                    if wait <= 0 or self._stop or self._flushing:
+                        self._q.popleft()
+                        if self._open.get(head.key) is head: del self._open[head.key]
+                        self._busy = True
+                        return head
+                    self._cv.wait(wait)
+                elif self._stop:
+                    return None
+                else:
+                    self._cv.wait()
+
+    def _run(self) -> None:
+        while True:
+            p = self._take()
+            if p is None: return
+            try:
+                d_norm = p.d_norm
+                if d_norm is None:
+                    _, d_norm, _ = GeometryS.dist_norm(p.before, p.after, mode=self.mode)  # ロック外で計算
+                with self.bridge.lock:
+                    self.bridge.report(p.task, p.before, p.after, metrics=p.metrics, d_norm=d_norm)
+                lag = time.monotonic() - p.first_ts
+                with self._cv:
+                    m = self._m; m["processed"] += 1
+                    m["lag_last_s"] = lag; m["lag_max_s"] = max(m["lag_max_s"], lag)
+                    m["lag_ewma_s"] = lag if m["processed"] == 1 else 0.9*m["lag_ewma_s"] + 0.1*lag
+            except Exception as e:
+                with self._cv: self._m["errors"] += 1
+                self.bridge.agent._audit.emit("kpi_ingest_error", key=p.key, err=str(e))
+            finally:
+                with self._cv:
+                    self._busy = False; self._cv.notify_all()
+
+    def metrics(self) -> Dict[str,Any]:
+        with self._cv:
+            head_age = (time.monotonic() - self._q[0].first_ts) if self._q else 0.0
+            return {**self._m, "depth": len(self._q), "maxsize": self.maxsize, "head_age_s": head_age}
+
+    def flush(self, timeout: Optional[float]=None) -> bool:
+        """合流待ちを含め、キューが空になるまで待つ。"""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cv:
+            self._flushing += 1  # 合流窓を待たずに処理させる
+            self._cv.notify_all()
+            try:
+                while self._q or self._busy:
+                    left = None if end is None else end - time.monotonic()
+                    if left is not None and left <= 0: return False
+                    self._cv.wait(left)
+            finally:
+                self._flushing -= 1
+        return True
+
+    def stop(self, drain: bool=True, timeout: Optional[float]=None) -> None:
+        if drain: self.flush(timeout)
+        with self._cv:
+            self._stop = True
+            if not drain: self._q.clear(); self._open.clear()
+            self._cv.notify_all()
+        self._th.join(timeout)
+
 class RewardBridge:
     def __init__(self, agent: WisePartnerAgent):
         self.agent = agent
+        self.lock = threading.RLock()  # 取り込みワーカーと agent を共有する側はこれで排他
+        self._ingest: Optional[_IngestQueue] = None
     def report(self, task: str,
                before: Dict[str,float],
                after: Dict[str,float],
@@ -18,12 +181,108 @@ class RewardBridge:
         d_norm: 未指定ならgeoで算出。
         """
         if metrics is None:
-            metrics=["project_success_prob","trust_level","stress_level","reality"]
+            metrics=list(_METRICS)
         if d_norm is None:
             _, d_norm, _ = GeometryS.dist_norm(before, after, mode="geo")
         key = _key(task)
-        # 初期化（無ければ空辞書）
-        self.agent.state.world_model.links.setdefault(key, {})
+        # 行が無い task は空行を作らない（空行は学習対象の metric を持たず、状態を膨らませるだけ）
         # 無信頼データは 𝒢 側で弾かれる（realityゲート）
         self.agent._g_update_links(key, before, after, d_norm, used_metrics=metrics)
 
+    # ---- オンライン取り込み ----
+    def start_ingest(self, maxsize: int=1024, window_s: float=0.25, mode: str="geo", drop: str="oldest") -> None:
+        """バックグラウンド取り込みを開始する。以後 submit() は幾何計算を待たずに返る。
+        drop: 満杯時の方針（"oldest"=最古を捨てる / "new"=新着を拒否）
+        """
+        if self._ingest is not None: raise RuntimeError("ingest already running")
+        self._ingest = _IngestQueue(self, maxsize=maxsize, window_s=window_s, mode=mode, drop=drop)
+    def submit(self, task: str, before: Dict[str,float], after: Dict[str,float],
+               metrics: Optional[List[str]] = None, d_norm: Optional[float] = None) -> bool:
+        """report の非同期版。取り込み未開始なら同期で report する。捨てられたら False。"""
+        if self._ingest is None:
+            with self.lock: self.report(task, before, after, metrics=metrics, d_norm=d_norm)
+            return True
+        return self._ingest.submit(task, before, after, metrics=metrics, d_norm=d_norm)
+    def ingest_metrics(self) -> Dict[str,Any]:
+        """depth / head_age_s / lag_* / dropped / coalesced 等。"""
+        return self._ingest.metrics() if self._ingest else {}
+    def flush_ingest(self, timeout: Optional[float]=None) -> bool:
+        return self._ingest.flush(timeout) if self._ingest else True
+    def stop_ingest(self, drain: bool=True, timeout: Optional[float]=None) -> None:
+        if self._ingest is None: return
+        self._ingest.stop(drain=drain, timeout=timeout); self._ingest = None
+
+    # ---- 一括リプレイ ----
+    def _g_snapshot(self) -> Dict[str,Any]:
+        a = self.agent
+        return {"baseline": a._g_r_baseline,
+                "opt": {k: [o.lr, o.m, o.v, o.t] for k, o in a._g_opt.items()},
+                "touch": dict(a._link_touch), "tick": a._link_tick}
+    def _g_restore(self, g: Dict[str,Any]) -> None:
+        a = self.agent
+        a._g_r_baseline = float(g.get("baseline", 0.0))
+        a._g_opt = {}
+        for k, (lr, m, v, t) in g.get("opt", {}).items():
+            o = _Adam(lr=lr); o.m, o.v, o.t = m, v, int(t)
+            a._g_opt[k] = o
+        if "touch" in g:  # LRU 順も戻す（再開後の追い出しを中断なしの実行と一致させる）
+            a._link_touch = {k: int(t) for k, t in g["touch"].items()}; a._link_tick = int(g.get("tick", 0))
+    def _save_progress(self, progress: str, path: str, done: int) -> None:
+        doc = {"source": os.path.abspath(path), "done": done,
+               "state": self.agent.export_state(), "g": self._g_snapshot()}
+        tmp = progress + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, separators=(",",":"))
+        os.replace(tmp, progress)  # 途中で落ちても旧進捗は壊れない
+    def _load_progress(self, progress: str, path: str) -> int:
+        if not os.path.exists(progress): return 0
+        with open(progress, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        if doc.get("source") != os.path.abspath(path):
+            raise ValueError(f"progress file {progress} belongs to another source: {doc.get('source')}")
+        self.agent.import_state(doc["state"])
+        self._g_restore(doc.get("g", {}))
+        return int(doc.get("done", 0))
+
+    def replay(self, path: str, mode: str = "geo", batch: int = 256, workers: int = 0,
+               progress: Optional[str] = None, checkpoint_every: int = 1024) -> Dict[str,Any]:
+        """JSONL/CSV のKPIレコードをストリームで𝒢へ流し込む。
+        - d_norm 未指定のレコードはバッチ単位で並列算出（workers<=1 で同一プロセス）
+        - 𝒢更新は常にファイル順に適用（並列数によらず結果は決定的）
+        - progress を渡すと checkpoint_every 件ごとに進捗＋状態を保存し、次回はその続きから再開
+        戻り値: 件数・所要時間・スループット等の統計
+        """
+        t0 = time.perf_counter()
+        start = self._load_progress(progress, path) if progress else 0
+        if workers <= 0: workers = os.cpu_count() or 1
+        stats = {"records": 0, "resumed_from": start, "applied": 0, "computed_d_norm": 0,
+                 "batches": 0, "geo_s": 0.0, "update_s": 0.0}
+        it = iter_kpi_records(path)
+        for _ in range(start):  # 再開: 処理済み分は読み飛ばす
+            if next(it, None) is None: break
+        done, since_ck = start, 0
+        ex = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            for recs in _batched(it, max(1, batch)):
+                tg = time.perf_counter()
+                need = [i for i, r in enumerate(recs) if r.get("d_norm") is None]
+                jobs = [(recs[i]["before"], recs[i]["after"], mode) for i in need]
+                vals = list(ex.map(_dnorm_job, jobs, chunksize=max(1, len(jobs)//(workers*4) or 1))) if ex else [_dnorm_job(j) for j in jobs]
+                for i, v in zip(need, vals): recs[i]["d_norm"] = v
+                tu = time.perf_counter()
+                for r in recs:
+                    self.report(r["task"], r["before"], r["after"], metrics=r.get("metrics"), d_norm=r["d_norm"])
+                stats["geo_s"] += tu - tg; stats["update_s"] += time.perf_counter() - tu
+                stats["records"] += len(recs); stats["applied"] += len(recs)
+                stats["computed_d_norm"] += len(need); stats["batches"] += 1
+                done += len(recs); since_ck += len(recs)
+                if progress and since_ck >= checkpoint_every:
+                    self._save_progress(progress, path, done); since_ck = 0
+        finally:
+            if ex: ex.shutdown()
+        if progress: self._save_progress(progress, path, done)
+        el = time.perf_counter() - t0
+        stats.update({"done": done, "elapsed_s": el,
+                      "records_per_s": (stats["records"] / el) if el > 0 else 0.0})
+        self.agent._audit.emit("kpi_replay", **{k: stats[k] for k in ("records","resumed_from","computed_d_norm","elapsed_s")})
+        return stats
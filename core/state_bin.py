@@ -0,0 +1,132 @@
+# core/state_bin.py — 状態のバイナリ形式（1パス書き出し＋逐次SHA-256、ストリーム/mmap 読み込み）
+"""
+レイアウト（format 1）:
+  "WPSB" | fmt(u8) | flags(u8: bit0=zlib) | 本体 | sha256(本体, 32B)
+  本体 = レコード列。レコード = tag(1B) | len(u32 BE) | canonical JSON
+    H: ヘッダ {version, personality, coupling, profile, user_wellbeing}
+    L: [link_key, {metric: [impact, conf]}]   … links の1行ごと
+    C: カード1枚（asdict 形）
+    E: 終端（len=0）
+  flags の zlib は本体だけを圧縮する（ヘッダ/トレーラは素）。digest は非圧縮本体に対して取る。
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+import hashlib, hmac, json, mmap, struct, zlib
+from core.wise_partner_core_v52_plus import canonical_json
+
+MAGIC = b"WPSB"
+BIN_FORMAT = 1
+FLAG_ZLIB = 0x01
+_REC = struct.Struct(">cI")
+_CHUNK = 1 << 16
+
+def write_state_bin(fp, head: Dict[str,Any], links: Iterable[Tuple[str, Dict[str,Any]]],
+                    cards: Iterable[Dict[str,Any]], compress: bool=False, level: int=6) -> str:
+    """状態を fp に1パスで書く。辞書全体は組み立てない。戻り値は本体の SHA-256(hex)。"""
+    h = hashlib.sha256()
+    z = zlib.compressobj(level) if compress else None
+    fp.write(MAGIC + bytes([BIN_FORMAT, FLAG_ZLIB if compress else 0]))
+    def put(tag: bytes, obj: Any) -> None:
+        body = b"" if obj is None else canonical_json(obj)
+        rec = _REC.pack(tag, len(body)) + body
+        h.update(rec)
+        fp.write(z.compress(rec) if z else rec)
+    put(b"H", head)
+    for key, row in links:
+        put(b"L", [key, dict(row)])
+    for c in cards:
+        put(b"C", c)
+    put(b"E", None)
+    if z: fp.write(z.flush())
+    digest = h.digest()
+    fp.write(digest)
+    return digest.hex()
+
+class _Body:
+    """本体バイト列を必要な分だけ供給する（圧縮時は逐次展開）。"""
+    def __init__(self, fp, zipped: bool) -> None:
+        self.fp = fp
+        self.z = zlib.decompressobj() if zipped else None
+        self.buf = bytearray()
+    def read(self, n: int) -> bytes:
+        if self.z is None:
+            b = self.fp.read(n)
+        else:
+            while len(self.buf) < n and not self.z.eof:
+                chunk = self.fp.read(_CHUNK)
+                if not chunk: break
+                self.buf += self.z.decompress(chunk)
+            b = bytes(self.buf[:n]); del self.buf[:n]
+        if len(b) != n: raise ValueError("truncated state file")
+        return b
+    def trailer(self) -> bytes:
+        if self.z is None: return self.fp.read(32)
+        while not self.z.eof:  # E 以降の残り（通常は空）を消化
+            chunk = self.fp.read(_CHUNK)
+            if not chunk: break
+            self.z.decompress(chunk)
+        rest = self.z.unused_data
+        return (rest + self.fp.read(max(0, 32 - len(rest))))[:32]
+
+class BinStateReader:
+    """バイナリ状態の読み手。src がパスなら mmap で開き、レコードは必要になった時点で解釈する。
+    iter_records() を最後まで回すと digest を検証する（不一致は ValueError）。
+    """
+    def __init__(self, src) -> None:
+        self._own = None; self._mm = None
+        if isinstance(src, (str, bytes)) or hasattr(src, "__fspath__"):
+            self._own = open(src, "rb")
+            self._mm = mmap.mmap(self._own.fileno(), 0, access=mmap.ACCESS_READ)
+            fp = self._mm
+        else:
+            fp = src
+        pre = fp.read(6)
+        if len(pre) != 6 or pre[:4] != MAGIC:
+            raise ValueError("not a WPSB state file")
+        if pre[4] != BIN_FORMAT:
+            raise ValueError(f"unsupported state binary format {pre[4]}")
+        self.compressed = bool(pre[5] & FLAG_ZLIB)
+        self._body = _Body(fp, self.compressed)
+        self._h = hashlib.sha256()
+        self.digest: Optional[str] = None
+        tag, self.head = self._next()
+        if tag != b"H": raise ValueError("state file lacks header record")
+        self._done = False
+
+    def _next(self) -> Tuple[bytes, Any]:
+        raw = self._body.read(_REC.size)
+        tag, n = _REC.unpack(raw)
+        body = self._body.read(n) if n else b""
+        self._h.update(raw); self._h.update(body)
+        return tag, (json.loads(body) if n else None)
+
+    def iter_records(self) -> Iterator[Tuple[bytes, Any]]:
+        """H 以降のレコードを (tag, obj) で逐次返す。1回だけ回せる。"""
+        if self._done: raise RuntimeError("records already consumed")
+        while True:
+            tag, obj = self._next()
+            if tag == b"E": break
+            yield tag, obj
+        want = self._body.trailer()
+        got = self._h.digest()
+        self._done = True
+        if not hmac.compare_digest(want, got):
+            raise ValueError("state digest mismatch (corrupted or tampered)")
+        self.digest = got.hex()
+
+    def to_dict(self) -> Dict[str,Any]:
+        """export_state と同じ形の dict（hash 抜き）に組み立てる。"""
+        hd = self.head
+        links: Dict[str,Any] = {}; cards = []
+        for tag, obj in self.iter_records():
+            if tag == b"L": links[obj[0]] = obj[1]
+            elif tag == b"C": cards.append(obj)
+        return {"version": hd.get("version", "v5.2"), "personality": hd["personality"],
+                "state": {"user_wellbeing": hd["user_wellbeing"], "world_model": {"links": links}},
+                "coupling": hd["coupling"], "cards": cards, "profile": hd.get("profile")}
+
+    def close(self) -> None:
+        if self._mm is not None: self._mm.close(); self._mm = None
+        if self._own is not None: self._own.close(); self._own = None
+    def __enter__(self) -> "BinStateReader": return self
+    def __exit__(self, *exc) -> None: self.close()
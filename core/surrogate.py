@@ -0,0 +1,248 @@
+# core/surrogate.py — strict 距離の代理モデル（多項式補正×粗い直線長。line 並みのコストで strict に近い値）
+"""
+モデル:
+  L ≈ riem_line_length(q1, q2, steps=line_steps) × P(x)
+  x は埋め込み座標 a, b から作る対称な特徴（a↔b を入れ替えても同じ）:
+    中点 (a+b)/2（4） / 方向の二乗成分 dv_i²/|dv|²（4） / ユークリッド長 |dv|（1）
+  P は x の degree 次までの全単項式の線形結合（degree=2 で 55 係数）。係数はリッジ付き最小二乗で
+  比 L_strict / L_line に当てる。a=b なら直線長がほぼ 0 なので L もほぼ 0。
+学習データ:
+  半分は一様乱択のペア、半分は近いペア（b=a+N(0,local_sigma)）。respond() の検証は近いペアばかりなので
+  短距離も確実に覆う。strict の真値はプロセスプールで並列計算し、--truth-cache に保存/再利用できる。
+ファイル形式（format 1, little endian）:
+  "WPSG" | fmt(u8) | degree(u8) | line_steps(u16) | n_coef(u16) | name_len(u16) | name(utf-8) |
+  report_len(u32) | report(JSON, utf-8) | 係数 n_coef×f64 | sha256(ここまで全部, 32B)
+  report には学習条件（strict の steps/iters, ペア数, seed）と検証誤差（strict 比の MAPE 等）が入る。
+使い方:
+  PYTHONPATH=. python -m core.surrogate train --pairs 400 --workers 4 --out models/strict.wpsg --truth-cache truth.json
+  PYTHONPATH=. python -m core.surrogate validate models/strict.wpsg --pairs 60 --truth-cache val.json
+  GeometryS.set_surrogate(Surrogate.load("models/strict.wpsg")); GeometryS.dist(q1, q2, mode="surrogate")
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse, hashlib, itertools, json, math, os, random, statistics, struct, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from core.wise_partner_core_v52_plus import GeometryS
+
+MAGIC = b"WPSG"
+SURROGATE_FORMAT = 1
+_HEAD = struct.Struct("<4sBBHHH")
+N_FEAT = 9
+
+Pair = Tuple[Dict[str,float], Dict[str,float]]
+
+def features(q1: Dict[str,float], q2: Dict[str,float]) -> List[float]:
+    a = GeometryS._embed(q1); b = GeometryS._embed(q2)
+    dv = [y - x for x, y in zip(a, b)]
+    s2 = sum(d*d for d in dv)
+    w = [d*d / s2 for d in dv] if s2 > 0 else [0.25]*4
+    return [(x + y)*0.5 for x, y in zip(a, b)] + w + [math.sqrt(s2)]
+
+def _monomials(degree: int) -> List[Tuple[int,...]]:
+    out: List[Tuple[int,...]] = [()]
+    for d in range(1, degree+1):
+        out += list(itertools.combinations_with_replacement(range(N_FEAT), d))
+    return out
+
+def _design(x: Sequence[float], mono: List[Tuple[int,...]]) -> List[float]:
+    row = []
+    for m in mono:
+        v = 1.0
+        for i in m: v *= x[i]
+        row.append(v)
+    return row
+
+def _solve_ridge(rows: List[List[float]], ys: List[float], lam: float) -> List[float]:
+    """(AᵀA + λI) c = Aᵀy をコレスキー分解で解く（切片にも λ を掛けるが値が小さいので実害なし）。"""
+    n = len(rows[0])
+    M = [[0.0]*n for _ in range(n)]; v = [0.0]*n
+    for r, y in zip(rows, ys):
+        for i in range(n):
+            ri = r[i]
+            if ri == 0.0: continue
+            v[i] += ri*y
+            Mi = M[i]
+            for j in range(i, n): Mi[j] += ri*r[j]
+    for i in range(n):
+        M[i][i] += lam
+        for j in range(i): M[i][j] = M[j][i]
+    L = [[0.0]*n for _ in range(n)]
+    for i in range(n):
+        for j in range(i+1):
+            s = M[i][j] - sum(L[i][k]*L[j][k] for k in range(j))
+            if i == j:
+                if s <= 0: raise ValueError("normal equations not positive definite (increase lam)")
+                L[i][i] = math.sqrt(s)
+            else:
+                L[i][j] = s / L[j][j]
+    z = [0.0]*n
+    for i in range(n): z[i] = (v[i] - sum(L[i][k]*z[k] for k in range(i))) / L[i][i]
+    c = [0.0]*n
+    for i in reversed(range(n)): c[i] = (z[i] - sum(L[k][i]*c[k] for k in range(i+1, n))) / L[i][i]
+    return c
+
+class Surrogate:
+    """学習済みの代理モデル。dist() は riem_line_length(line_steps) 1回＋多項式評価。"""
+    def __init__(self, coef: Sequence[float], degree: int=2, line_steps: int=8, name: str="",
+                 report: Optional[Dict[str,Any]]=None) -> None:
+        self.degree, self.line_steps, self.name = degree, line_steps, name
+        self._mono = _monomials(degree)
+        if len(coef) != len(self._mono): raise ValueError("coefficient count mismatch")
+        self.coef = [float(c) for c in coef]
+        self.report: Dict[str,Any] = dict(report or {})
+
+    def ratio(self, q1: Dict[str,float], q2: Dict[str,float]) -> float:
+        return sum(c*t for c, t in zip(self.coef, _design(features(q1, q2), self._mono)))
+
+    def dist(self, q1: Dict[str,float], q2: Dict[str,float]) -> float:
+        L0 = GeometryS.riem_line_length(q1, q2, steps=self.line_steps)
+        return L0 * max(0.5, self.ratio(q1, q2))  # 外挿で比が崩れても直線長の半分は下回らせない
+
+    # ---- 学習 ----
+    @classmethod
+    def fit(cls, pairs: Sequence[Pair], truth: Sequence[float], degree: int=2, line_steps: int=8,
+            lam: float=1e-6, name: str="", report: Optional[Dict[str,Any]]=None) -> "Surrogate":
+        mono = _monomials(degree)
+        rows, ys = [], []
+        for (q1, q2), Ls in zip(pairs, truth):
+            L0 = GeometryS.riem_line_length(q1, q2, steps=line_steps)
+            if L0 <= 1e-9 or Ls <= 1e-9: continue
+            # 相対誤差を揃えたいので比をそのまま当てる（長さで重み付けしない）
+            rows.append(_design(features(q1, q2), mono)); ys.append(Ls / L0)
+        if len(rows) < len(mono): raise ValueError(f"need at least {len(mono)} usable pairs, got {len(rows)}")
+        return cls(_solve_ridge(rows, ys, lam), degree=degree, line_steps=line_steps, name=name, report=report)
+
+    def errors(self, pairs: Sequence[Pair], truth: Sequence[float]) -> Dict[str,Any]:
+        """strict 真値に対する相対誤差（あわせて同じペアでの geo / line の誤差と1回あたりの時間）。"""
+        rel: Dict[str,List[float]] = {"surrogate": [], "geo": [], "line": []}
+        lat = {"surrogate": 0.0, "geo": 0.0, "line": 0.0}
+        for (q1, q2), Ls in zip(pairs, truth):
+            if Ls <= 1e-9: continue
+            for m, f in (("surrogate", lambda: self.dist(q1, q2)),
+                         ("geo", lambda: GeometryS.geodesic_length(q1, q2, steps=64, iters=5, jitter=0.15, seed=42)[0]),
+                         ("line", lambda: GeometryS.riem_line_length(q1, q2, steps=48))):
+                t0 = time.perf_counter(); L = f(); lat[m] += time.perf_counter() - t0
+                rel[m].append(abs(L - Ls) / Ls)
+        n = len(rel["surrogate"]); out: Dict[str,Any] = {"samples": n}
+        for m, r in rel.items():
+            r.sort()
+            out[f"{m}_mape"] = statistics.mean(r) if r else 0.0
+            out[f"{m}_p95"] = r[int(0.95*(n-1))] if r else 0.0
+            out[f"{m}_max"] = r[-1] if r else 0.0
+            out[f"{m}_ms"] = lat[m] / n * 1e3 if n else 0.0
+        return out
+
+    # ---- 保存/読込 ----
+    def to_bytes(self) -> bytes:
+        name = self.name.encode("utf-8")
+        rep = json.dumps(self.report, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        body = (_HEAD.pack(MAGIC, SURROGATE_FORMAT, self.degree, self.line_steps, len(self.coef), len(name)) + name
+                + struct.pack("<I", len(rep)) + rep + struct.pack(f"<{len(self.coef)}d", *self.coef))
+        return body + hashlib.sha256(body).digest()
+
+    def save(self, path: str) -> None:
+        d = os.path.dirname(path)
+        if d: os.makedirs(d, exist_ok=True)
+        with open(path, "wb") as f: f.write(self.to_bytes())
+
+    @classmethod
+    def from_bytes(cls, b: bytes) -> "Surrogate":
+        if len(b) < _HEAD.size + 4 + 32: raise ValueError("truncated surrogate file")
+        body, dg = b[:-32], b[-32:]
+        if hashlib.sha256(body).digest() != dg: raise ValueError("surrogate digest mismatch")
+        magic, fmt, degree, steps, nc, ln = _HEAD.unpack_from(body, 0)
+        if magic != MAGIC: raise ValueError("not a surrogate file")
+        if fmt != SURROGATE_FORMAT: raise ValueError(f"unsupported surrogate format {fmt}")
+        p = _HEAD.size; name = body[p:p+ln].decode("utf-8"); p += ln
+        (rl,) = struct.unpack_from("<I", body, p); p += 4
+        rep = json.loads(body[p:p+rl].decode("utf-8")); p += rl
+        coef = struct.unpack_from(f"<{nc}d", body, p)
+        return cls(coef, degree=degree, line_steps=steps, name=name, report=rep)
+
+    @classmethod
+    def load(cls, path: str) -> "Surrogate":
+        with open(path, "rb") as f: return cls.from_bytes(f.read())
+
+# ---- 学習データ ----
+def sample_pairs(n: int, seed: int=1, local_frac: float=0.5, local_sigma: float=0.1) -> List[Pair]:
+    rng = random.Random(seed); o = GeometryS.ORDER
+    out: List[Pair] = []
+    for i in range(n):
+        q1 = {k: rng.random() for k in o}
+        if i < int(n*local_frac):
+            q2 = {k: min(1.0, max(0.0, q1[k] + rng.gauss(0.0, local_sigma))) for k in o}
+        else:
+            q2 = {k: rng.random() for k in o}
+        out.append((q1, q2))
+    return out
+
+def _strict_chunk(job) -> List[float]:
+    rows, steps, iters = job
+    from GEOM.geometry_strict import dist_strict
+    return [dist_strict(q1, q2, steps=steps, iters=iters) for q1, q2 in rows]
+
+def strict_truth(pairs: Sequence[Pair], workers: int=0, steps: int=200, iters: int=12, chunk: int=4) -> List[float]:
+    jobs = [(list(pairs[i:i+chunk]), steps, iters) for i in range(0, len(pairs), chunk)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex: parts = list(ex.map(_strict_chunk, jobs))
+    else:
+        parts = [_strict_chunk(j) for j in jobs]
+    return [x for p in parts for x in p]
+
+def _truth_cached(pairs: List[Pair], key: Dict[str,Any], path: Optional[str], workers: int) -> List[float]:
+    """key（seed/ペア数/strict 条件）が一致するキャッシュがあれば使う。"""
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f: doc = json.load(f)
+        if doc.get("key") == key and len(doc.get("truth", [])) == len(pairs): return doc["truth"]
+    truth = strict_truth(pairs, workers=workers, steps=key["strict_steps"], iters=key["strict_iters"])
+    if path:
+        with open(path, "w", encoding="utf-8") as f: json.dump({"key": key, "truth": truth}, f)
+    return truth
+
+def train(n_pairs: int=400, seed: int=1, val_frac: float=0.2, degree: int=2, line_steps: int=8, workers: int=0,
+          strict_steps: int=200, strict_iters: int=12, truth_cache: Optional[str]=None, name: str="strict") -> Surrogate:
+    """乱択ペアの strict 真値を並列計算し、学習/検証に分けて当てる。検証誤差は report に入る。"""
+    pairs = sample_pairs(n_pairs, seed=seed)
+    key = {"seed": seed, "pairs": n_pairs, "strict_steps": strict_steps, "strict_iters": strict_iters}
+    t0 = time.perf_counter()
+    truth = _truth_cached(pairs, key, truth_cache, workers)
+    t_truth = time.perf_counter() - t0
+    idx = list(range(n_pairs)); random.Random(seed + 1).shuffle(idx)
+    nv = int(n_pairs * val_frac); val, tr = idx[:nv], idx[nv:]
+    s = Surrogate.fit([pairs[i] for i in tr], [truth[i] for i in tr], degree=degree, line_steps=line_steps, name=name)
+    rep = {**key, "train": len(tr), "val": len(val), "degree": degree, "line_steps": line_steps, "truth_s": round(t_truth, 3)}
+    rep["train_mape"] = s.errors([pairs[i] for i in tr], [truth[i] for i in tr])["surrogate_mape"]
+    if val: rep.update({f"val_{k}": v for k, v in s.errors([pairs[i] for i in val], [truth[i] for i in val]).items()})
+    s.report = rep
+    return s
+
+def main(argv: Optional[Sequence[str]]=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m core.surrogate")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    t = sub.add_parser("train")
+    t.add_argument("--pairs", type=int, default=400); t.add_argument("--seed", type=int, default=1)
+    t.add_argument("--val", type=float, default=0.2); t.add_argument("--degree", type=int, default=2)
+    t.add_argument("--line-steps", type=int, default=8); t.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    t.add_argument("--strict-steps", type=int, default=200); t.add_argument("--strict-iters", type=int, default=12)
+    t.add_argument("--truth-cache"); t.add_argument("--name", default="strict"); t.add_argument("--out", required=True)
+    v = sub.add_parser("validate")
+    v.add_argument("path"); v.add_argument("--pairs", type=int, default=60); v.add_argument("--seed", type=int, default=99)
+    v.add_argument("--workers", type=int, default=os.cpu_count() or 1); v.add_argument("--truth-cache")
+    a = ap.parse_args(argv)
+    if a.cmd == "train":
+        s = train(a.pairs, seed=a.seed, val_frac=a.val, degree=a.degree, line_steps=a.line_steps, workers=a.workers,
+                  strict_steps=a.strict_steps, strict_iters=a.strict_iters, truth_cache=a.truth_cache, name=a.name)
+        s.save(a.out); rep = s.report
+        print(f"trained {len(s.coef)} coefs on {rep['train']} pairs → {a.out} ({len(s.to_bytes())} bytes)")
+    else:
+        s = Surrogate.load(a.path)
+        key = {"seed": a.seed, "pairs": a.pairs, "strict_steps": s.report.get("strict_steps", 200),
+               "strict_iters": s.report.get("strict_iters", 12)}
+        pairs = sample_pairs(a.pairs, seed=a.seed)
+        rep = s.errors(pairs, _truth_cached(pairs, key, a.truth_cache, a.workers))
+    for k, x in sorted(rep.items()):
+        print(f"  {k:18s} {x*100:.2f}%" if k.endswith(("mape", "p95", "max")) else f"  {k:18s} {x}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,10 +10,13 @@ wise_partner_core_v52_plus.py — 完全版（v5.2.2 “監査ログ＆滲みダ
 """
 
 from __future__ import annotations
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Any, Optional, Literal, Set, Tuple, Callable
+from dataclasses import dataclass, field, asdict, fields
+from typing import List, Dict, Any, Optional, Literal, Set, Tuple, Callable, Iterator
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from array import array
 from datetime import datetime, timezone, timedelta
-import math, random, time, json, re, hashlib, hmac, base64, os
+import math, random, time, json, re, hashlib, hmac, base64, os, threading, heapq, atexit, copy
 
 # ====== 監査（ONにするとログが貯まる。既定OFF） ======
 class _Audit:
@@ -21,10 +24,12 @@ class _Audit:
         self.enabled = bool(enabled)
         self.cap = cap
         self.buf: List[Dict[str,Any]] = []
+        self.sink: Optional[Callable[[Dict[str,Any]], None]] = None  # 永続ストア（core.audit_store）への受け口
     def emit(self, etype: str, **data):
         if not self.enabled: return
         ev = {"ts": time.time(), "type": etype, **data}
         self.buf.append(ev)
+        if self.sink is not None: self.sink(ev)
         if len(self.buf) > self.cap:
             self.buf = self.buf[-self.cap:]
     def tail(self, n: int=50) -> List[Dict[str,Any]]:
@@ -37,12 +42,30 @@ class _Audit:
             t = datetime.utcfromtimestamp(e["ts"]).strftime("%H:%M:%S")
             print(f"[{t}] {e['type']}: { {k:v for k,v in e.items() if k not in ('type','ts')} }")
 
-# ===== strict 幾何（存在すれば使用） =====
-try:
-    from GEOM.geometry_strict import dist_strict as _strict_dist  # type: ignore
-    _STRICT_GEOM_OK = True
-except Exception:
-    _STRICT_GEOM_OK = False
+# ===== strict 幾何（存在すれば使用。初回の strict 要求時に遅延ロード） =====
+_STRICT_DIST: Any = None  # None=未ロード, False=無し
+def _strict_backend() -> Optional[Callable]:
+    global _STRICT_DIST
+    if _STRICT_DIST is None:
+        try:
+            from GEOM.geometry_strict import dist_strict  # type: ignore
+            _STRICT_DIST = dist_strict
+        except Exception:
+            _STRICT_DIST = False
+    return _STRICT_DIST or None
+
+# 正規表現は初回使用時にコンパイル（import を軽くする）
+_RX_SRC = {
+    "iso": r'^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?(Z|[+\-]\d{2}:\d{2})?$',
+    "tok": r"[A-Za-z0-9_]+|[一-龯ぁ-ゟ゠ァ-ヿー]+",
+    "metrics": r"<!--METRICS\s+success=([0-9.]+)\s+trust=([0-9.]+)\s+stress=([0-9.]+)\s+reality=([0-9.]+)-->",
+    "score": r"\(score=.*?\)",
+}
+_RX: Dict[str, Any] = {}
+def _rx(name: str):
+    r = _RX.get(name)
+    if r is None: r = _RX[name] = re.compile(_RX_SRC[name])
+    return r
 
 # ===== プロファイル/フラグ =====
 class Profile:
@@ -62,10 +85,22 @@ class _Cfg:
     PERSONA_BLEED_CAP = 0.006 if RESEARCH_MODE else 0.002
     PERSONA_BLEED_ENABLED_DEFAULT = (os.getenv("WPCORE_BLEED", "0") == "1")
     AUDIT_ENABLED = (os.getenv("WPCORE_AUDIT","0") == "1")
+    REVOKED_PATH = os.getenv("WPCORE_REVOKED", os.path.join("cards", "REVOKED.txt"))
+    CARD_VERIFY_CACHE_CAP = 4096
+    LINKS_CAP = int(os.getenv("WPCORE_LINKS_CAP", "0"))             # world_model.links の上限（0 で無制限＝既定）
+    LINKS_EVICT = os.getenv("WPCORE_LINKS_EVICT", "lru")              # "lru" / "impact"（|impact|×conf の小さい順）
+    AUDIT_DB = os.getenv("WPCORE_AUDIT_DB", "")                        # 監査の SQLite ストア（空なら使わない）
+    GEOMD = os.getenv("WPCORE_GEOMD", "")                              # 幾何デーモンの Unix ソケット（空なら使わない）
+    STRICT_BG = (os.getenv("WPCORE_STRICT_BG", "0") == "1")            # strict を裏で検証（set_strict_verify の既定）
+    STRICT_BG_WORKERS = int(os.getenv("WPCORE_STRICT_BG_WORKERS", "1"))  # 裏検証のプロセス数（プロセス内で共有）
 
 # ===== ユーティリティ =====
+def _json_default(o: Any) -> Any:
+    if isinstance(o, LinkRow): return dict(o.items())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
 def canonical_json(obj: Any) -> bytes:
-    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=True, default=_json_default).encode('utf-8')
 
 def sha256_bytes(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
@@ -106,10 +141,8 @@ def hmac_sign(secret: Optional[bytes], msg: bytes) -> str:
 def hmac_verify(secret: Optional[bytes], msg: bytes, sig_b64: str) -> bool:
     return sig_verify("HMAC-SHA256", secret, msg, sig_b64)
 
-_ISO_RX = re.compile(r'^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?(Z|[+\-]\d{2}:\d{2})?$')
-
 def parse_iso8601(s: str) -> datetime:
-    m = _ISO_RX.match(s.strip())
+    m = _rx("iso").match(s.strip())
     if not m: raise ValueError(f"Bad ISO-8601: {s}")
     y,mo,d,hh,mm,ss,sub,off = m.groups()
     dt = datetime(int(y), int(mo), int(d), int(hh), int(mm), int(ss), int((sub or '0').ljust(6,'0')))
@@ -146,7 +179,7 @@ _MIGRATIONS = {
 }
 
 # ===== スキーマ =====
-@dataclass
+@dataclass(slots=True)
 class RoleInfluence:
     alpha: float = 0.18
     cap: float = 0.12
@@ -156,26 +189,26 @@ class RoleInfluence:
     domains: List[str] = field(default_factory=list)
     metric_bias: Dict[str,float] = field(default_factory=dict)
 
-@dataclass
+@dataclass(slots=True)
 class RoleCardMeta:
     id: str; issuer: str; alg: str; sig: str
     valid_from: str; valid_to: str; revoked: bool; version: str
     parent_hash: Optional[str] = None
     device_lock: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class RoleCapabilities:
     apis: List[str]; files: List[str]
     max_tokens: int; max_ms: int
     net_allowed: bool; self_update_allowed: bool
 
-@dataclass
+@dataclass(slots=True)
 class RolePolicy:
     priority: int; namespace: str
     forbidden: List[str]; research_only: bool
     disclaimer: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class PersonCard:
     meta: RoleCardMeta
     caps: RoleCapabilities
@@ -185,37 +218,122 @@ class PersonCard:
     influence: RoleInfluence = field(default_factory=RoleInfluence)
     nonce: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Personality:
     openness: int = 50
     agreeableness: int = 50
     conscientiousness: int = 50
 
-@dataclass
+@dataclass(slots=True)
 class Dynamics:
     trait_min: int = -50
     trait_max: int = 100
 
-@dataclass
+@dataclass(slots=True)
 class UserWellbeing:
     project_success_prob: float = 0.5
     trust_level: float = 0.5
     stress_level: float = 0.5  # 低いほど良い
     reality: float = 0.5
 
-@dataclass
+_ROW_KEYS: Dict[Tuple[str,...], Tuple[str,...]] = {}
+
+class LinkRow(Mapping):
+    """world_model の link 1行 {metric: (impact, conf)} の読み取り専用版。links へ入る行は全てこれになる。
+    全値が (float, float) なら値は array('d') に impact/conf を交互に詰める（キー列はプロセス内で共有）。
+    int 混じり等はJSON表現を変えないよう値をそのまま tuple で持つ（list は tuple に凍結）。
+    更新は行ごと差し替え。asdict/deepcopy では素の dict（値は tuple）になる。"""
+    __slots__ = ("_keys", "_vals")
+    def __init__(self, items: Any = ()) -> None:
+        d = items if isinstance(items, Mapping) else dict(items)
+        keys = tuple(d)
+        self._keys = _ROW_KEYS.setdefault(keys, keys)
+        vals = [d[k] for k in keys]
+        if all(isinstance(v, (tuple, list)) and len(v) == 2 and type(v[0]) is float and type(v[1]) is float for v in vals):
+            self._vals: Any = array("d", [x for v in vals for x in v])
+        else:
+            self._vals = tuple(tuple(v) if isinstance(v, list) else v for v in vals)
+    def __getitem__(self, k: str) -> Any:
+        try: i = self._keys.index(k)
+        except ValueError: raise KeyError(k) from None
+        v = self._vals
+        return (v[2*i], v[2*i+1]) if type(v) is array else v[i]
+    def __iter__(self) -> Iterator[str]: return iter(self._keys)
+    def __len__(self) -> int: return len(self._keys)
+    def items(self):
+        v = self._vals
+        if type(v) is not array: return list(zip(self._keys, v))
+        return [(k, (v[2*i], v[2*i+1])) for i, k in enumerate(self._keys)]
+    def __eq__(self, other: Any) -> bool:
+        if other is self: return True
+        if isinstance(other, LinkRow) and type(other._vals) is type(self._vals):
+            return other._keys == self._keys and other._vals == self._vals
+        return Mapping.__eq__(self, other)
+    __hash__ = None  # type: ignore[assignment]
+    def __deepcopy__(self, memo) -> Dict[str, Tuple[float,float]]:
+        return dict(self.items())
+    def __reduce__(self):
+        return (LinkRow, (dict(self.items()),))
+    def __repr__(self) -> str:
+        return f"LinkRow({dict(self.items())!r})"
+
+def _compact_row(row: Any) -> Any:
+    """Mapping の行を LinkRow にする（既に LinkRow ならそのまま）。"""
+    return row if isinstance(row, LinkRow) or not isinstance(row, Mapping) else LinkRow(row)
+
+class _LinkStore(dict):
+    """world_model.links の実体。代入（[]= / update / setdefault / |=）された行を LinkRow に揃えるので、
+    行を in-place で書き換える経路が無い（行の同一性＝内容の同一性）。
+    コンストラクタは素通し（asdict が type(obj)(...) で素の dict 行の写しを作るため）。揃えるのは _link_store。"""
+    __slots__ = ()
+    def __setitem__(self, k: str, row: Any) -> None:
+        dict.__setitem__(self, k, _compact_row(row))
+    def update(self, *a: Any, **kw: Any) -> None:
+        for k, row in dict(*a, **kw).items(): self[k] = row
+    def setdefault(self, k: str, row: Any=None) -> Any:
+        if k not in self: self[k] = row
+        return dict.__getitem__(self, k)
+    def __ior__(self, other: Any) -> "_LinkStore":
+        self.update(other); return self
+
+def _link_store(links: Any) -> _LinkStore:
+    st = _LinkStore()
+    for k, row in links.items(): dict.__setitem__(st, k, _compact_row(row))
+    return st
+
+@dataclass(slots=True)
 class WorldModel:
     links: Dict[str, Dict[str, Tuple[float,float]]] = field(default_factory=dict)
+    def __post_init__(self) -> None:
+        self.links = _link_store(self.links)
 
-@dataclass
+@dataclass(slots=True)
 class Coupling:
     enabled: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class AgentState:
     user_wellbeing: UserWellbeing = field(default_factory=UserWellbeing)
     world_model: WorldModel = field(default_factory=WorldModel)
 
+class _TraceBuf:
+    """滲み痕跡の列（1件 = metric, delta, created_ts, tau_s）。dict を並べる代わりに
+    metric のリスト＋数値3つを交互に詰めた array('d') で持つ。"""
+    __slots__ = ("metric", "vals")
+    def __init__(self) -> None:
+        self.metric: List[str] = []
+        self.vals = array("d")
+    def __len__(self) -> int: return len(self.metric)
+    def __iter__(self) -> Iterator[Tuple[str,float,float,float]]:
+        v = self.vals
+        return zip(self.metric, v[0::3], v[1::3], v[2::3])
+    def append(self, metric: str, delta: float, ts: float, tau: float) -> None:
+        self.metric.append(metric); self.vals.extend((delta, ts, tau))
+    def keep_last(self, n: int) -> None:
+        drop = len(self.metric) - n
+        if drop > 0:
+            del self.metric[:drop], self.vals[:3*drop]
+
 # ===== 短期メモリ（LTM禁止） =====
 class EphemeralMemory:
     def __init__(self, max_items=64, ttl_s=900):
@@ -232,7 +350,7 @@ class EphemeralMemory:
         if len(self.buf)>self.max_items: self.buf=self.buf[-self.max_items:]
 
 # ===== チェックポイント =====
-@dataclass
+@dataclass(slots=True)
 class Checkpoint:
     turn: int
     hash: str
@@ -240,36 +358,185 @@ class Checkpoint:
     sig: Optional[str]
     created_at: str
     snapshot_meta: Dict[str, Any]
+    merkle_root: Optional[str] = None
+
+def _ck_hash(root: str, parent: Optional[str]) -> str:
+    return sha256_bytes(canonical_json({"merkle_root": root, "parent_hash": parent}))
+
+class _MerkleCache:
+    """状態セクション/linkキーを葉にした Merkle 木。変わっていない葉・部分木はキャッシュを再利用。
+    link行は読み取り専用の LinkRow なら同一性で葉を引く。素の dict 行は in-place で書き換えられうるので、
+    ハッシュ時の写しと内容で比べる。
+    """
+    def __init__(self) -> None:
+        self._leaf: Dict[str, Tuple[Any, str]] = {}
+        self._node: Dict[Tuple[str,str], str] = {}
+    def leaf(self, name: str, value: Any, by_identity: bool=False) -> str:
+        hit = self._leaf.get(name)
+        frozen = by_identity and isinstance(value, LinkRow)
+        if hit is not None and (hit[0] is value if frozen else hit[0] == value):
+            return hit[1]
+        h = sha256_bytes(b"\x00" + canonical_json([name, value]))
+        self._leaf[name] = (copy.deepcopy(value) if by_identity and not frozen else value, h)
+        return h
+    def root(self, hashes: List[str]) -> str:
+        if not hashes: return sha256_bytes(b"\x02")
+        level = hashes
+        while len(level) > 1:
+            nxt = []
+            for i in range(0, len(level), 2):
+                pair = (level[i], level[i+1] if i+1 < len(level) else level[i])
+                h = self._node.get(pair)
+                if h is None:
+                    h = sha256_bytes(b"\x01" + pair[0].encode("ascii") + pair[1].encode("ascii"))
+                    self._node[pair] = h
+                nxt.append(h)
+            level = nxt
+        if len(self._node) > 4*max(64, len(self._leaf)): self._node.clear()
+        return level[0]
+    def payload_root(self, payload: Dict[str,Any]) -> str:
+        tops = []
+        for k in sorted(payload):
+            v = payload[k]
+            if k == "state" and isinstance(v, dict):
+                links = v.get("world_model", {}).get("links", {})
+                lroot = self.root([self.leaf("link:" + lk, links[lk], by_identity=True) for lk in sorted(links)])
+                subs = [self.leaf("state." + sk, v[sk]) for sk in sorted(v) if sk != "world_model"]
+                tops.append(self.root(subs + [lroot]))
+            else:
+                tops.append(self.leaf(k, v))
+        if len(self._leaf) > 4096 + 2*len(payload.get("state", {}).get("world_model", {}).get("links", {})):
+            self._leaf.clear()
+        return self.root(tops)
+
+class CheckpointLog:
+    """追記専用のチェックポイントログ（JSONL。1行=1チェックポイント、parent_hash で連鎖）。"""
+    def __init__(self, path: str, fsync: bool=False) -> None:
+        self.path = path; self.fsync = fsync
+    def append(self, ck: Checkpoint) -> None:
+        line = json.dumps(asdict(ck), ensure_ascii=False, separators=(",",":"), sort_keys=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n"); f.flush()
+            if self.fsync: os.fsync(f.fileno())
+    def read(self) -> List[Checkpoint]:
+        if not os.path.exists(self.path): return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            return [Checkpoint(**json.loads(l)) for l in f if l.strip()]
+    def last(self) -> Optional[Checkpoint]:
+        arr = self.read()
+        return arr[-1] if arr else None
+    def verify_chain(self, secret: Optional[bytes]) -> Tuple[bool, int, Optional[int]]:
+        """連鎖と署名を先頭から検証。payload は再ハッシュしない（root→hash→HMAC のみ）。
+        戻り値: (ok, 検証件数, 最初に壊れていた行 or None)"""
+        prev: Optional[str] = None; n = 0
+        if not os.path.exists(self.path): return True, 0, None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for i, l in enumerate(f):
+                if not l.strip(): continue
+                d = json.loads(l)
+                ok = (d.get("parent_hash") == prev and d.get("merkle_root") is not None
+                      and _ck_hash(d["merkle_root"], prev) == d.get("hash"))
+                if ok and secret is not None:
+                    ok = bool(d.get("sig")) and hmac_verify(secret, d["hash"].encode("ascii"), d["sig"])
+                if not ok: return False, n, i
+                prev = d["hash"]; n += 1
+        return True, n, None
 
 class CheckpointManager:
-    def __init__(self, secret: Optional[bytes]=None, cap: int=10, emit: Optional[Callable]=None) -> None:
+    def __init__(self, secret: Optional[bytes]=None, cap: int=10, emit: Optional[Callable]=None,
+                 log: Optional[CheckpointLog]=None) -> None:
         self._secret = secret
         self._cap = cap
         self._chain: List[Checkpoint] = []
         self._emit = emit or (lambda *a, **k: None)
+        self._merkle = _MerkleCache()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._log: Optional[CheckpointLog] = None
+        self._log_head: Optional[str] = None
+        if log is not None: self.set_log(log)
+    def set_log(self, log: Optional[CheckpointLog]) -> None:
+        """ログを付け替える。既存ログがあれば末尾の hash から連鎖を続ける。"""
+        with self._lock:
+            self._log = log
+            last = log.last() if log else None
+            self._log_head = last.hash if last else None
     def make(self, payload: Dict[str,Any], turn: int, meta: Dict[str,Any]) -> Checkpoint:
-        parent = self._chain[-1].hash if self._chain else None
-        doc = {"payload": payload, "parent_hash": parent}
-        h = sha256_bytes(canonical_json(doc))
-        sig = hmac_sign(self._secret, h.encode('ascii')) if self._secret else None
-        ck = Checkpoint(turn=turn, hash=h, parent_hash=parent, sig=sig, created_at=now_iso(), snapshot_meta=meta)
-        self._chain.append(ck)
-        if len(self._chain) > self._cap: self._chain = self._chain[-self._cap:]
+        with self._lock:
+            if self._chain: parent = self._chain[-1].hash
+            else: parent = self._log_head
+            root = self._merkle.payload_root(payload)
+            h = _ck_hash(root, parent)
+            sig = hmac_sign(self._secret, h.encode('ascii')) if self._secret else None
+            ck = Checkpoint(turn=turn, hash=h, parent_hash=parent, sig=sig, created_at=now_iso(),
+                            snapshot_meta=meta, merkle_root=root)
+            self._chain.append(ck)
+            if len(self._chain) > self._cap: self._chain = self._chain[-self._cap:]
+            if self._log is not None:
+                self._log.append(ck); self._log_head = h
         self._emit("checkpoint_made", turn=turn, hash=h, signed=bool(sig))
         return ck
+    def make_async(self, payload: Dict[str,Any], turn: int, meta: Dict[str,Any]):
+        """make を専用ワーカー1本で実行（順序は投入順）。Future を返す。"""
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ckpt")
+        return self._pool.submit(self.make, payload, turn, meta)
     def verify(self, idx: int) -> bool:
         if not (0 <= idx < len(self._chain)): return False
         ck = self._chain[idx]
         ok = hmac_verify(self._secret, ck.hash.encode('ascii'), ck.sig or '')
         self._emit("checkpoint_verify", idx=idx, ok=ok)
         return ok
+    def verify_log(self) -> bool:
+        if self._log is None: return False
+        ok, n, bad = self._log.verify_chain(self._secret)
+        self._emit("checkpoint_log_verify", ok=ok, n=n, bad=bad)
+        return ok
     def last(self) -> Optional[Checkpoint]:
         return self._chain[-1] if self._chain else None
 
+# respond の締め切り: 距離モードの所要見積り（ms, 初期値。以後は実測の EWMA）と降格の順
+_MODE_COST_MS: Dict[str,float] = {"line": 0.5, "surrogate": 1.0, "geo": 40.0, "strict": 2500.0}
+_MODE_STEPDOWN = ("strict", "geo", "line")
+_DEADLINE_UNSET: Any = object()  # respond(deadline_ms) 省略の目印（None は「無制限」の明示）
+
+# 差分同期（export_delta）: 差分の起点として覚えておく状態の数
+_DELTA_BASES_MAX = 8
+
+# strict の裏検証: 距離と参照長を別プロセスで解く（応答スレッドと GIL を取り合わない）
+_STRICT_POOL: Any = None
+_STRICT_REF: Dict[Tuple[int,int], float] = {}
+def _strict_job(q1: Dict[str,float], q2: Dict[str,float], steps: int, iters: int) -> Tuple[float, float, float]:
+    f = _strict_backend()
+    if f is None: raise RuntimeError("strict geometry backend not available")
+    t0 = time.perf_counter()
+    L = f(q1, q2, steps=steps, iters=iters)
+    ref = _STRICT_REF.get((steps, iters))
+    if ref is None:
+        ref = _STRICT_REF[(steps, iters)] = max(1e-6, f(*GeometryS._ref_pair(), steps=steps, iters=iters))
+    return L, ref, (time.perf_counter() - t0)*1e3
+
+def _strict_pool() -> Any:
+    global _STRICT_POOL
+    if _STRICT_POOL is None:
+        from concurrent.futures import ProcessPoolExecutor
+        _STRICT_POOL = ProcessPoolExecutor(max_workers=max(1, _Cfg.STRICT_BG_WORKERS))
+        atexit.register(_strict_pool_close)
+    return _STRICT_POOL
+
+def _strict_pool_close() -> None:
+    global _STRICT_POOL
+    pool, _STRICT_POOL = _STRICT_POOL, None
+    if pool is not None: pool.shutdown(wait=False, cancel_futures=True)
+
 # ===== 幾何 S =====
 class GeometryS:
     ORDER = ("project_success_prob","trust_level","stress_level","reality")
     _L_REF_CACHE: Dict[str, float] = {}
+    _FIELDS: List[Any] = []  # core.anchor_field.AnchorField（mode="field" 用）
+    _CLIENT: Any = None      # core.geomd.GeomClient。None=未接続（_Cfg.GEOMD があれば初回に繋ぐ）、False=使わない
+    _SURROGATE: Any = None   # core.surrogate.Surrogate（mode="surrogate" 用）
     @staticmethod
     def _clip01(x: float) -> float: return max(0.0, min(1.0, x))
     @staticmethod
@@ -289,21 +556,29 @@ class GeometryS:
         }
     @classmethod
     def metric(cls, q: Dict[str,float]) -> List[List[float]]:
+        # g = AᵀA（A は上三角）。0 になる積を省いて展開しただけで、足し合わせの順序は元の総和と同じ
         ps, tr, inv_st, re = cls._embed(q)
-        A = [
-            [1.0 + 0.6*(1-ps),   0.15*(tr-0.5),        0.10*(0.5-inv_st),  0.06*(re-0.5)],
-            [0.0,                 1.0 + 0.5*tr,        0.12*(tr-0.5),      0.05*(re-0.5)],
-            [0.0,                 0.0,                 1.0 + 0.7*(1-inv_st), 0.04*(0.5-inv_st)],
-            [0.0,                 0.0,                 0.0,                 1.0 + 0.4*(re)]
+        a00 = 1.0 + 0.6*(1-ps); a01 = 0.15*(tr-0.5); a02 = 0.10*(0.5-inv_st); a03 = 0.06*(re-0.5)
+        a11 = 1.0 + 0.5*tr; a12 = 0.12*(tr-0.5); a13 = 0.05*(re-0.5)
+        a22 = 1.0 + 0.7*(1-inv_st); a23 = 0.04*(0.5-inv_st)
+        a33 = 1.0 + 0.4*(re)
+        g01 = a00*a01; g02 = a00*a02; g03 = a00*a03
+        g12 = a01*a02 + a11*a12; g13 = a01*a03 + a11*a13
+        g23 = a02*a03 + a12*a13 + a22*a23
+        return [
+            [a00*a00 + 1e-3, g01, g02, g03],
+            [g01, a01*a01 + a11*a11 + 1e-3, g12, g13],
+            [g02, g12, a02*a02 + a12*a12 + a22*a22 + 1e-3, g23],
+            [g03, g13, g23, a03*a03 + a13*a13 + a23*a23 + a33*a33 + 1e-3],
         ]
-        n = 4; g = [[0.0]*n for _ in range(n)]
-        for i in range(n):
-            for j in range(i, n):
-                g[i][j] = sum(A[k][i]*A[k][j] for k in range(n)); g[j][i] = g[i][j]
-        for i in range(n): g[i][i] += 1e-3
-        return g
     @classmethod
     def quad_form(cls, g: List[List[float]], dv: List[float]) -> float:
+        if len(dv) == 4:
+            d0, d1, d2, d3 = dv; r0, r1, r2, r3 = g
+            return (d0*r0[0]*d0 + d0*r0[1]*d1 + d0*r0[2]*d2 + d0*r0[3]*d3
+                    + d1*r1[0]*d0 + d1*r1[1]*d1 + d1*r1[2]*d2 + d1*r1[3]*d3
+                    + d2*r2[0]*d0 + d2*r2[1]*d1 + d2*r2[2]*d2 + d2*r2[3]*d3
+                    + d3*r3[0]*d0 + d3*r3[1]*d1 + d3*r3[2]*d2 + d3*r3[3]*d3)
         n = len(dv); s = 0.0
         for i in range(n):
             for j in range(n):
@@ -369,14 +644,66 @@ class GeometryS:
         stats = {"improved": improved, "moves": moves, "C": C[:] }
         return best, C, stats
     @classmethod
-    def dist(cls, q1: Dict[str,float], q2: Dict[str,float], mode: Literal["line","geo","strict"]="geo") -> Tuple[float, Dict[str,Any]]:
+    def register_field(cls, f: Any) -> None:
+        """アンカー距離場を登録する。同じアンカーの既存の場は置き換える。"""
+        cls._FIELDS = [x for x in cls._FIELDS if not x.is_anchor(f.anchor)] + [f]
+        cls._L_REF_CACHE.pop("field", None)
+    @classmethod
+    def clear_fields(cls) -> None:
+        cls._FIELDS = []; cls._L_REF_CACHE.pop("field", None)
+    @classmethod
+    def set_surrogate(cls, model: Any) -> None:
+        """strict の代理モデルを差し替える（None で外す）。"""
+        cls._SURROGATE = model; cls._L_REF_CACHE.pop("surrogate", None)
+    @classmethod
+    def use_daemon(cls, path: Optional[str]) -> bool:
+        """幾何デーモン（core.geomd）を使う/やめる。繋がらなければ False を返し、プロセス内計算のまま。"""
+        c, cls._CLIENT = cls._CLIENT, False
+        if c: c.close()
+        if not path: return False
+        try:
+            from core.geomd import GeomClient
+            cls._CLIENT = GeomClient(path)
+            return True
+        except (ImportError, OSError):
+            return False
+    @classmethod
+    def _daemon(cls) -> Any:
+        c = cls._CLIENT
+        if c is None:
+            cls.use_daemon(_Cfg.GEOMD or None); c = cls._CLIENT
+        if c and c.closed: cls._CLIENT = c = False  # 切断されたらこのプロセスでは以後ローカル計算
+        return c or None
+    @classmethod
+    def dist(cls, q1: Dict[str,float], q2: Dict[str,float], mode: Literal["line","geo","strict","field","surrogate"]="geo") -> Tuple[float, Dict[str,Any]]:
+        if mode in ("line", "geo", "strict"):
+            c = cls._daemon()
+            if c is not None:
+                try:
+                    return c.dist_many(mode, [(q1, q2)])[0][0], {"mode": mode, "via": "daemon"}
+                except (OSError, RuntimeError, TimeoutError):
+                    pass  # デーモン側の拒否/障害/切断はローカルで計算し直す
+        if mode == "field":
+            # 片端が登録アンカーなら表引き（距離は対称）。無ければ geo に落とす
+            for f in cls._FIELDS:
+                if f.is_anchor(q1): return f.lookup(q2), {"mode": "field", "anchor": f.name}
+                if f.is_anchor(q2): return f.lookup(q1), {"mode": "field", "anchor": f.name}
+            L, st = cls.dist(q1, q2, mode="geo"); st["mode"] = "geo(no-field)"
+            return L, st
+        if mode == "surrogate":
+            m = cls._SURROGATE
+            if m is None:
+                L, st = cls.dist(q1, q2, mode="geo"); st["mode"] = "geo(no-surrogate)"
+                return L, st
+            return m.dist(q1, q2), {"mode": "surrogate", "model": m.name}
         if mode == "line":
             L = cls.riem_line_length(q1,q2,steps=48)
             return L, {"mode":"line"}
         if mode == "strict":
-            if not _STRICT_GEOM_OK:
+            strict_dist = _strict_backend()
+            if strict_dist is None:
                 raise RuntimeError("strict geometry backend not available")
-            L = _strict_dist(q1, q2, steps=200, iters=12)
+            L = strict_dist(q1, q2, steps=200, iters=12)
             return L, {"mode":"strict"}
         L, C, st = cls.geodesic_length(q1,q2,steps=64,iters=5,jitter=0.15,seed=42)
         st.update({"mode":"geo"})
@@ -419,78 +746,297 @@ class GeometryS:
 def _wm_key(action: str, norm: str) -> str:
     return f"{action}|{norm}"
 
+def card_body_bytes(card: PersonCard) -> bytes:
+    """署名対象の canonical body（sig 以外の meta + caps + policy）。"""
+    body = {"meta": {f.name:getattr(card.meta,f.name) for f in fields(card.meta) if f.name != "sig"},
+            "caps": asdict(card.caps), "policy": asdict(card.policy)}
+    return canonical_json(body)
+
+class _BloomFilter:
+    def __init__(self, n: int, fp_rate: float=1e-4) -> None:
+        n = max(1, n)
+        self.m = max(64, int(-n * math.log(fp_rate) / (math.log(2)**2)))
+        self.k = max(1, int(round(self.m / n * math.log(2))))
+        self.bits = bytearray((self.m + 7) // 8)
+    def _idx(self, s: str):
+        d = hashlib.sha256(s.encode("utf-8")).digest()
+        h1 = int.from_bytes(d[:8], "big"); h2 = int.from_bytes(d[8:16], "big") | 1
+        return ((h1 + i*h2) % self.m for i in range(self.k))
+    def add(self, s: str) -> None:
+        for i in self._idx(s): self.bits[i >> 3] |= (1 << (i & 7))
+    def __contains__(self, s: str) -> bool:
+        return all(self.bits[i >> 3] & (1 << (i & 7)) for i in self._idx(s))
+
+class RevocationIndex:
+    """失効リスト（cards/REVOKED.txt）をコンパイルした O(1) 照会表。
+    1行1件: カードID または "sha256:<body hash>"。# 以降はコメント。
+    bloom_threshold 件以上は Bloom フィルタ（偽陽性は“失効扱い”＝安全側）。
+    """
+    _shared: Dict[str, Tuple[Tuple[int,int], "RevocationIndex"]] = {}
+    def __init__(self, entries: List[str] = (), bloom_threshold: int=200_000) -> None:
+        entries = [e for e in entries if e]
+        self.size = len(entries)
+        self._set: Any = _BloomFilter(len(entries)) if len(entries) >= bloom_threshold else set()
+        for e in entries: self._set.add(e)
+    @classmethod
+    def from_file(cls, path: str, **kw) -> "RevocationIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls([l.split("#",1)[0].strip() for l in f], **kw)
+    @classmethod
+    def shared(cls, path: str) -> "RevocationIndex":
+        """プロセス内で1回だけ読み込む（ファイルの mtime/size が変われば読み直す）。無ければ空。"""
+        try:
+            st = os.stat(path); sig = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return cls()
+        hit = cls._shared.get(path)
+        if hit and hit[0] == sig: return hit[1]
+        idx = cls.from_file(path); cls._shared[path] = (sig, idx)
+        return idx
+    def is_revoked(self, card_id: str, body_hash: str) -> bool:
+        return (card_id in self._set) or (("sha256:" + body_hash) in self._set)
+
+class _CardVerifyCache:
+    """検証結果キャッシュ（プロセス共有）。キー = (body hash, sig, mode, secret指紋, DEVICE_ID)。
+    値 = (verdict, reason, valid_from_ts, valid_to_ts)。期限切れは参照時に破棄。
+    secret を替えると指紋が変わるので旧エントリには当たらない（set_secret で明示破棄も行う）。
+    """
+    def __init__(self, cap: int) -> None:
+        from collections import OrderedDict
+        self.cap = cap
+        self._d: "OrderedDict[Tuple, Tuple[bool,str,float,float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0; self.misses = 0
+    def get(self, key: Tuple) -> Optional[Tuple[bool,str,float,float]]:
+        with self._lock:
+            v = self._d.get(key)
+            if v is None: self.misses += 1; return None
+            self._d.move_to_end(key); self.hits += 1
+            return v
+    def put(self, key: Tuple, val: Tuple[bool,str,float,float]) -> None:
+        with self._lock:
+            self._d[key] = val; self._d.move_to_end(key)
+            while len(self._d) > self.cap: self._d.popitem(last=False)
+    def drop(self, key: Tuple) -> None:
+        with self._lock: self._d.pop(key, None)
+    def drop_secret(self, fp: str) -> None:
+        with self._lock:
+            for k in [k for k in self._d if k[3] == fp]: del self._d[k]
+    def clear(self) -> None:
+        with self._lock: self._d.clear(); self.hits = 0; self.misses = 0
+
+_CARD_VERIFY_CACHE = _CardVerifyCache(_Cfg.CARD_VERIFY_CACHE_CAP)
+
+def _secret_fp(secret: Optional[bytes]) -> str:
+    return sha256_bytes(b"wp-card-secret:" + secret)[:16] if secret else "-"
+
+class _CardRegistry:
+    """装着中カードの索引。namespace別件数と優先度ヒープ、forbiddenトークン索引を持つ。
+    activate/deactivate/最低優先度の置換は O(log n)（ヒープは遅延削除）。
+    snapshot() は装着順の tuple（変更が無い限り同じオブジェクトを返すのでコピー不要）。
+    """
+    def __init__(self, cards: List[PersonCard] = ()) -> None:
+        self._cards: Dict[int, PersonCard] = {}            # seq -> card（装着順）
+        self._ids: Dict[str, List[int]] = {}
+        self._ns_count: Dict[str, int] = {}
+        self._ns_heap: Dict[str, List[Tuple[int,int]]] = {}  # ns -> [(priority, seq)]
+        self._forbid: Dict[str, Set[int]] = {}
+        self._seq = 0
+        self._snap: Optional[Tuple[PersonCard, ...]] = ()
+        for c in cards: self.add(c)
+    def __len__(self) -> int: return len(self._cards)
+    def copy(self) -> "_CardRegistry":
+        r = _CardRegistry.__new__(_CardRegistry)
+        r._cards = dict(self._cards); r._ids = {k: list(v) for k, v in self._ids.items()}
+        r._ns_count = dict(self._ns_count); r._ns_heap = {k: list(v) for k, v in self._ns_heap.items()}
+        r._forbid = {k: set(v) for k, v in self._forbid.items()}
+        r._seq = self._seq; r._snap = self._snap
+        return r
+    def snapshot(self) -> Tuple[PersonCard, ...]:
+        if self._snap is None: self._snap = tuple(self._cards.values())
+        return self._snap
+    def ns_count(self, ns: str) -> int:
+        return self._ns_count.get(ns, 0)
+    def add(self, card: PersonCard) -> int:
+        self._seq += 1; sq = self._seq
+        ns = card.policy.namespace
+        self._cards[sq] = card
+        self._ids.setdefault(card.meta.id, []).append(sq)
+        self._ns_count[ns] = self._ns_count.get(ns, 0) + 1
+        heapq.heappush(self._ns_heap.setdefault(ns, []), (card.policy.priority, sq))
+        for t in set(card.policy.forbidden or []): self._forbid.setdefault(t, set()).add(sq)
+        self._snap = None
+        return sq
+    def _remove_seq(self, sq: int) -> PersonCard:
+        card = self._cards.pop(sq)
+        ns = card.policy.namespace
+        ids = self._ids[card.meta.id]; ids.remove(sq)
+        if not ids: del self._ids[card.meta.id]
+        self._ns_count[ns] -= 1
+        if not self._ns_count[ns]: del self._ns_count[ns]; self._ns_heap.pop(ns, None)
+        for t in set(card.policy.forbidden or []):
+            bucket = self._forbid.get(t)
+            if bucket is not None:
+                bucket.discard(sq)
+                if not bucket: del self._forbid[t]
+        self._snap = None
+        return card
+    def remove_id(self, card_id: str) -> List[PersonCard]:
+        return [self._remove_seq(sq) for sq in list(self._ids.get(card_id, []))]
+    def worst_in(self, ns: str) -> Optional[Tuple[int, PersonCard]]:
+        h = self._ns_heap.get(ns)
+        while h:
+            prio, sq = h[0]
+            if sq in self._cards: return sq, self._cards[sq]
+            heapq.heappop(h)  # 取り外し済み（遅延削除）
+        return None
+    def conflict(self, forbidden: List[str], ignore: Optional[int]=None) -> Optional[PersonCard]:
+        for t in set(forbidden or []):
+            for sq in self._forbid.get(t, ()):
+                if sq != ignore: return self._cards[sq]
+        return None
+
 class CardManager:
-    def __init__(self, secret: Optional[bytes]=None, emit: Optional[Callable]=None) -> None:
-        self.active: List[PersonCard] = []
+    def __init__(self, secret: Optional[bytes]=None, emit: Optional[Callable]=None,
+                 revocations: Optional[RevocationIndex]=None) -> None:
+        self._reg = _CardRegistry()
+        self._reg_shared = False  # True: プロトタイプと共有中（書く前に複製する）
         self._secret = secret
+        self._secret_fp = _secret_fp(secret)
         self._ns_limits: Dict[str,int] = {
             "role.medicine": _Cfg.NS_LIMIT_DEFAULT,
             "role.legal": _Cfg.NS_LIMIT_DEFAULT,
         }
         self._emit = emit or (lambda *a, **k: None)
+        self._revocations = revocations
+
+    @property
+    def active(self) -> Tuple[PersonCard, ...]:
+        """装着中カード（装着順のスナップショット。変更は activate/deactivate 経由で）。"""
+        return self._reg.snapshot()
+    @active.setter
+    def active(self, cards: List[PersonCard]) -> None:
+        self._reg = _CardRegistry(cards); self._reg_shared = False
+
+    def _own_reg(self) -> _CardRegistry:
+        if self._reg_shared:
+            self._reg = self._reg.copy(); self._reg_shared = False
+        return self._reg
+
+    def _fork(self, emit: Optional[Callable]) -> "CardManager":
+        """索引をコピーオンライトで共有する複製（AgentFactory 用）。"""
+        m = CardManager.__new__(CardManager)
+        m.__dict__.update(self.__dict__)
+        m._ns_limits = dict(self._ns_limits)
+        m._emit = emit or (lambda *a, **k: None)
+        m._reg_shared = True; self._reg_shared = True
+        return m
+
+    def set_secret(self, secret: Optional[bytes]) -> None:
+        """カード鍵のローテーション。旧鍵での検証結果はキャッシュから捨てる。"""
+        _CARD_VERIFY_CACHE.drop_secret(self._secret_fp)
+        self._secret = secret; self._secret_fp = _secret_fp(secret)
+
+    @property
+    def revocations(self) -> RevocationIndex:
+        return self._revocations if self._revocations is not None else RevocationIndex.shared(_Cfg.REVOKED_PATH)
 
     def _verify_meta(self, card: PersonCard, mode: str, now_iso_s: str) -> bool:
+        msg = card_body_bytes(card)
+        bh = sha256_bytes(msg)
+        if self.revocations.is_revoked(card.meta.id, bh):
+            self._emit("card_verify_fail", reason="revoked_list", card=card.meta.id)
+            return False
         try:
-            vf = parse_iso8601(card.meta.valid_from)
-            vt = parse_iso8601(card.meta.valid_to)
-            now = parse_iso8601(now_iso_s)
+            now = parse_iso8601(now_iso_s).timestamp()
         except Exception:
             self._emit("card_verify_fail", reason="date_parse", card=card.meta.id)
             return False
-        if card.meta.revoked or not (vf <= now <= vt):
-            self._emit("card_verify_fail", reason="revoked_or_expired", card=card.meta.id)
-            return False
+        dev = os.getenv("DEVICE_ID","") if (mode == "strict" and card.meta.device_lock) else ""
+        key = (bh, card.meta.sig or "", mode, self._secret_fp, dev)
+        hit = _CARD_VERIFY_CACHE.get(key)
+        if hit is None:
+            hit = self._verify_meta_full(card, mode, msg, dev)
+            if hit[1] != "date_parse": _CARD_VERIFY_CACHE.put(key, hit)
+        ok, reason, vf, vt = hit
+        if reason != "date_parse" and not (vf <= now <= vt):
+            if now > vt: _CARD_VERIFY_CACHE.drop(key)  # 期限切れは以後も通らないので捨てる
+            ok, reason = False, "revoked_or_expired"
+        if not ok:
+            extra = {"alg": card.meta.alg} if reason == "alg_unsupported" else {}
+            self._emit("card_verify_fail", reason=reason, card=card.meta.id, **extra)
+        return ok
+
+    def _verify_meta_full(self, card: PersonCard, mode: str, msg: bytes, dev: str) -> Tuple[bool,str,float,float]:
+        """時刻に依らない部分の判定（日付パース・失効フラグ・署名・device_lock）。期限窓は呼び出し側で毎回見る。"""
+        try:
+            vf = parse_iso8601(card.meta.valid_from).timestamp()
+            vt = parse_iso8601(card.meta.valid_to).timestamp()
+        except Exception:
+            return False, "date_parse", 0.0, 0.0
+        if card.meta.revoked:
+            return False, "revoked_or_expired", vf, vt
         if mode == "strict":
             if (card.meta.alg or "").upper() not in SIG_ALGS:
-                self._emit("card_verify_fail", reason="alg_unsupported", card=card.meta.id, alg=card.meta.alg)
-                return False
+                return False, "alg_unsupported", vf, vt
             if self._secret is None or not card.meta.sig:
-                self._emit("card_verify_fail", reason="secret_or_sig_missing", card=card.meta.id)
-                return False
-            body = {"meta": {k:getattr(card.meta,k) for k in vars(card.meta) if k not in ("sig",)},
-                    "caps": asdict(card.caps), "policy": asdict(card.policy)}
-            if not sig_verify(card.meta.alg, self._secret, canonical_json(body), card.meta.sig):
-                self._emit("card_verify_fail", reason="sig_bad", card=card.meta.id)
-                return False
+                return False, "secret_or_sig_missing", vf, vt
+            if not sig_verify(card.meta.alg, self._secret, msg, card.meta.sig):
+                return False, "sig_bad", vf, vt
             if card.meta.device_lock:
-                dev = os.getenv("DEVICE_ID","")
                 if not dev or dev != card.meta.device_lock:
-                    self._emit("card_verify_fail", reason="device_lock_mismatch", card=card.meta.id)
-                    return False
-        return True
+                    return False, "device_lock_mismatch", vf, vt
+        return True, "ok", vf, vt
 
-    def _can_coexist(self, new_card: PersonCard) -> bool:
+    def _can_coexist(self, new_card: PersonCard, reg: Optional[_CardRegistry]=None) -> bool:
+        reg = self._reg if reg is None else reg
         ns = new_card.policy.namespace
         limit = self._ns_limits.get(ns, _Cfg.NS_LIMIT_DEFAULT)
-        alive = [c for c in self.active if c.policy.namespace == ns]
-        if len(alive) >= limit:
-            if _Cfg.RESEARCH_MODE:
-                worst = min(alive, key=lambda c: c.policy.priority)
-                if new_card.policy.priority > worst.policy.priority:
-                    self.active.remove(worst)
-                    self._emit("card_auto_dequeue", removed=worst.meta.id, by=new_card.meta.id, ns=ns)
-                else:
-                    self._emit("card_coexist_refuse", reason="priority_low", card=new_card.meta.id, ns=ns)
-                    return False
-            else:
+        evict: Optional[Tuple[int, PersonCard]] = None
+        if reg.ns_count(ns) >= limit:
+            worst = reg.worst_in(ns) if _Cfg.RESEARCH_MODE else None
+            if worst is None:
                 self._emit("card_coexist_refuse", reason="ns_limit", card=new_card.meta.id, ns=ns)
                 return False
-        new_forb = set(getattr(new_card.policy, "forbidden", []))
-        for c in self.active:
-            if new_forb.intersection(set(getattr(c.policy,"forbidden",[]))):
-                self._emit("card_coexist_refuse", reason="mutex_forbidden", card=new_card.meta.id, exists=c.meta.id)
+            if new_card.policy.priority <= worst[1].policy.priority:
+                self._emit("card_coexist_refuse", reason="priority_low", card=new_card.meta.id, ns=ns)
                 return False
+            evict = worst
+        c = reg.conflict(getattr(new_card.policy, "forbidden", []), ignore=evict[0] if evict else None)
+        if c is not None:
+            self._emit("card_coexist_refuse", reason="mutex_forbidden", card=new_card.meta.id, exists=c.meta.id)
+            return False
+        if evict is not None:
+            reg._remove_seq(evict[0])
+            self._emit("card_auto_dequeue", removed=evict[1].meta.id, by=new_card.meta.id, ns=ns)
         return True
 
     def activate(self, card: PersonCard, now_iso_s: str, mode: str="strict") -> bool:
         if not self._verify_meta(card, mode, now_iso_s): 
             return False
+        self._own_reg()
         if not self._can_coexist(card): 
             return False
-        self.active.append(card)
+        self._reg.add(card)
         self._emit("card_activated", card=card.meta.id, ns=card.policy.namespace, mode=mode)
         return True
 
+    def replace_active(self, cards: List[PersonCard], now_iso_s: str, mode: str="strict") -> List[str]:
+        """装着集合を丸ごと差し替える。新しい索引を組んでから1回の代入で入れ替えるので、
+        読み手は旧/新どちらかの完全な集合しか見ない。検証は共有キャッシュに当たる。拒否したIDを返す。"""
+        reg = _CardRegistry(); rejected: List[str] = []
+        for c in cards:
+            if self._verify_meta(c, mode, now_iso_s) and self._can_coexist(c, reg): reg.add(c)
+            else: rejected.append(c.meta.id)
+        self._reg = reg; self._reg_shared = False
+        self._emit("card_set_replaced", n=len(reg), rejected=rejected, mode=mode)
+        return rejected
+
+    def deactivate(self, card_id: str) -> bool:
+        removed = self._own_reg().remove_id(card_id) if card_id in self._reg._ids else []
+        if removed: self._emit("card_deactivated", card=card_id, n=len(removed))
+        return bool(removed)
+
 # ===== Intent / Realizer / Validator =====
 @dataclass
 class IntentFrame:
@@ -521,6 +1067,29 @@ class _Adam:
         vhat = self.v/(1-self.b2**self.t)
         return self.lr * mhat / (math.sqrt(vhat)+self.eps)
 
+# ===== プロセス内不変量（1回だけ計算） =====
+_SELF_SHA256: Optional[str] = None
+def _self_sha256() -> str:
+    global _SELF_SHA256
+    if _SELF_SHA256 is None:
+        try:
+            with open(__file__, "rb") as _f:
+                _SELF_SHA256 = hashlib.sha256(_f.read()).hexdigest()
+        except Exception:
+            _SELF_SHA256 = "(unknown)"
+    return _SELF_SHA256
+
+_ADAPTER_REGISTRY_CLS: Any = False  # False=未解決, None=無し
+def _adapter_registry_cls():
+    global _ADAPTER_REGISTRY_CLS
+    if _ADAPTER_REGISTRY_CLS is False:
+        try:
+            from adapters.io_if import AdapterRegistry  # type: ignore
+            _ADAPTER_REGISTRY_CLS = AdapterRegistry
+        except Exception:
+            _ADAPTER_REGISTRY_CLS = None
+    return _ADAPTER_REGISTRY_CLS
+
 # ===== エージェント本体 =====
 class WisePartnerAgent:
     def __init__(self, seed: int = 7, card_secret: Optional[bytes]=None, ck_secret: Optional[bytes]=None,
@@ -534,22 +1103,19 @@ class WisePartnerAgent:
         self.coupling = Coupling(enabled=False)
         self.card_mgr = CardManager(secret=card_secret, emit=self._audit.emit)
         self._rng = random.Random(seed)
-        self._wm_traces: List[Dict[str,Any]] = []
+        self._wm_traces = _TraceBuf()
         self._last_card_influence_mag: float = 0.0
         self._used_nonces: Set[str] = set()
         self._wm_trace_cap: int = 500
         self._trace_seed_salt: int = seed ^ 0xA5A5
         self._ckmgr = CheckpointManager(secret=ck_secret, cap=10, emit=self._audit.emit)
         self._turn: int = 0
+        self._clock: Callable[[], float] = time.time  # 滲み痕跡の時刻源（リプレイ時は仮想時計に差し替え）
         self.profile = profile
 
         self._persona_bleed_enabled = _Cfg.PERSONA_BLEED_ENABLED_DEFAULT if persona_bleed_enabled is None else bool(persona_bleed_enabled)
 
-        try:
-            with open(__file__, "rb") as _f:
-                self._self_sha256 = hashlib.sha256(_f.read()).hexdigest()
-        except Exception:
-            self._self_sha256 = "(unknown)"
+        self._self_sha256 = _self_sha256()
 
         self._strict_allowed = (profile == Profile.LAB_STRICT)
         self._geo_steps = 64 if profile != Profile.MOBILE else 48
@@ -558,12 +1124,18 @@ class WisePartnerAgent:
         self._strict_iters = 12
 
         akey = _wm_key("respond_helpfully","be_kind")
-        self.state.world_model.links[akey] = {
+        # link ストアの上限と追い出し（既定行は保護）。_link_touch は key→最終アクセス tick（LRU 用）
+        self._links_cap: int = _Cfg.LINKS_CAP
+        self._links_policy: str = _Cfg.LINKS_EVICT if _Cfg.LINKS_EVICT in ("lru","impact") else "lru"
+        self._links_protected: Set[str] = {akey}
+        self._link_tick: int = 0
+        self._link_touch: Dict[str,int] = {}
+        self.state.world_model.links[akey] = LinkRow({
             "project_success_prob": (0.06, 0.9),
             "trust_level": (0.10, 0.85),
             "stress_level": (-0.04, 0.8),
             "reality": (0.03, 0.8)
-        }
+        })
         self._last_action_context: Dict[str,Any] = {}
         self.mem = EphemeralMemory()
         assert Flags.LTM_ALLOWED is False, "LTMは禁止仕様（完全ローカル本流）"
@@ -577,12 +1149,72 @@ class WisePartnerAgent:
         # 不確実性モード（既定：言う = "speak"）
         self._uncertainty_mode = "speak"
 
+        # 締め切り（respond(deadline_ms)）: モード別の所要見積りと直近ターンの内訳
+        self._mode_cost_ms: Dict[str,float] = dict(_MODE_COST_MS)
+        self._last_budget: Dict[str,Any] = {}
+
+        # 差分同期（set_delta_sync / export_delta で有効化）: state_root → その時点の状態（export_delta の起点）
+        self._delta_on: bool = False
+        self._delta_bases: "OrderedDict[str, Tuple[Any, ...]]" = OrderedDict()
+        self._delta_merkle = _MerkleCache()
+
+        # strict の裏検証（set_strict_verify）: 未完了数と、応答スレッドで出す監査＋𝒢補正（判定が覆ったターン）の待ち行列
+        self._strict_bg: bool = _Cfg.STRICT_BG
+        self._strict_bg_max: int = 32
+        self._sv_cv = threading.Condition()
+        self._sv_pending: int = 0
+        self._sv_ready: "deque[Tuple[str, Dict[str,Any], Optional[Tuple[Dict[str,Any], float]]]]" = deque()
+        # 別スレッド（CardDirWatcher の裏ループ等）から届いた装着集合。次の respond の冒頭で応答スレッドが差し替える
+        self._cards_next: "deque[Tuple[List[PersonCard], str]]" = deque(maxlen=1)
+
         # optional: adapters registry（存在しなくても動く）
-        try:
-            from adapters.io_if import AdapterRegistry  # type: ignore
-            self.adapters = AdapterRegistry()
-        except Exception:
-            self.adapters = None  # 無くてもOK
+        _reg_cls = _adapter_registry_cls()
+        self.adapters = _reg_cls() if _reg_cls is not None else None  # 無くてもOK
+
+        self._audit_store: Any = None
+        if _Cfg.AUDIT_DB: self.set_audit_store(_Cfg.AUDIT_DB)
+
+    def _clone(self, seed: int) -> "WisePartnerAgent":
+        """このエージェントを雛形に新しい個体を作る（AgentFactory 用）。
+        カード索引と world_model の link 行は共有（行は差し替え更新・索引はコピーオンライト）、
+        それ以外の可変状態（dynamics・保護キー・nonce 等のコンテナを含む）は個体ごとにコピーか新規で持つ。"""
+        a = WisePartnerAgent.__new__(WisePartnerAgent)
+        a.__dict__.update(self.__dict__)
+        a._audit = _Audit(enabled=self._audit.enabled, cap=self._audit.cap)
+        a._audit.sink = self._audit.sink
+        a.personality = Personality(**asdict(self.personality))
+        a.state = AgentState(user_wellbeing=UserWellbeing(**asdict(self.state.user_wellbeing)),
+                             world_model=WorldModel(links=dict(self.state.world_model.links)))
+        a.coupling = Coupling(**asdict(self.coupling))
+        a.dynamics = Dynamics(**asdict(self.dynamics))
+        a.card_mgr = self.card_mgr._fork(a._audit.emit)
+        a._rng = random.Random(seed)
+        a._wm_traces = _TraceBuf()
+        a._last_card_influence_mag = 0.0
+        a._used_nonces = set(self._used_nonces)
+        a._link_touch = dict(self._link_touch)
+        a._links_protected = set(self._links_protected)
+        a._trace_seed_salt = seed ^ 0xA5A5
+        a._ckmgr = CheckpointManager(secret=self._ckmgr._secret, cap=self._ckmgr._cap, emit=a._audit.emit)
+        a._turn = 0
+        a._last_action_context = {}
+        a.mem = EphemeralMemory(self.mem.max_items, self.mem.ttl)
+        a._g_opt = {}
+        a._g_r_baseline = 0.0
+        a._mode_cost_ms = dict(self._mode_cost_ms)
+        a._last_budget = {}
+        a._delta_bases = OrderedDict(); a._delta_merkle = _MerkleCache()
+        a._sv_cv = threading.Condition(); a._sv_pending = 0; a._sv_ready = deque()
+        a._cards_next = deque(maxlen=1)
+        _reg_cls = _adapter_registry_cls()
+        a.adapters = _reg_cls() if _reg_cls is not None else None
+        return a
+
+    # ---- 時計 ----
+    def set_clock(self, clock: Optional[Callable[[], float]] = None) -> None:
+        """滲み痕跡の作成/減衰と trace_id が使う時刻源を差し替える（None で time.time に戻す）。
+        リプレイで export_state を再現させたいときに仮想時計を渡す。"""
+        self._clock = clock or time.time
 
     # ---- 監査API ----
     def set_audit(self, enabled: bool):
@@ -591,21 +1223,35 @@ class WisePartnerAgent:
         return self._audit.tail(n)
     def audit_print(self, n: int=20):
         self._audit.print_tail(n)
+    def set_audit_store(self, store: Any, src: str="", **kw) -> None:
+        """監査イベントを SQLite ストア（core.audit_store.AuditStore かそのパス）にも流す。監査は ON になる。
+        パスなら AuditStore.shared(path, **kw)（同じパスの agent 間で書き込みスレッドを共有）。None で外す。"""
+        if isinstance(store, str):
+            from core.audit_store import AuditStore
+            store = AuditStore.shared(store, **kw)
+        self._audit_store = store
+        if store is None:
+            self._audit.sink = None; return
+        self._audit.sink = (lambda ev, _p=store.put, _s=src: _p(ev, _s)) if src else store.put
+        self._audit.enabled = True
+    def audit_query(self, **filters) -> List[Dict[str,Any]]:
+        """監査ストアの絞り込み検索（AuditStore.query と同じ引数）。ストア未設定なら RuntimeError。"""
+        if self._audit_store is None: raise RuntimeError("no audit store attached (set_audit_store)")
+        return self._audit_store.query(**filters)
 
     # ---- 滲み(bleed)ダッシュボード ----
     def bleed_summary(self, window_s: int=24*3600) -> Dict[str,Any]:
         """直近window_s秒に残る影響の要約（指数減衰考慮）。"""
-        now = time.time()
+        now = self._clock()
         agg: Dict[str,float] = {}
         total = 0.0
         count = 0
-        for tr in self._wm_traces:
-            age = now - tr["created_ts"]
+        for k, delta, ts, tau in self._wm_traces:
+            age = now - ts
             if age < 0 or age > window_s: 
                 continue
-            w = math.exp(-age / tr["tau_s"])
-            v = tr["delta"] * w
-            k = tr["metric"]
+            w = math.exp(-age / tau)
+            v = delta * w
             agg[k] = agg.get(k,0.0) + v
             total += abs(v); count += 1
         top = sorted(agg.items(), key=lambda kv: -abs(kv[1]))[:4]
@@ -632,13 +1278,78 @@ class WisePartnerAgent:
     def set_uncertainty_mode(self, mode: str = "speak"):
         self._uncertainty_mode = "speak" if str(mode).lower().strip() == "speak" else "quiet"
 
+    # ---- strict の裏検証 ----
+    def set_strict_verify(self, mode: str="inline", max_pending: int=32) -> None:
+        """"background": strict 要求（LAB_STRICT の auto を含む）でも Validator は geo で済ませて即返し、
+        同じ対の strict 距離は裏のプロセスで測って監査 "strict_verify"（turn 付き）に残す。
+        theta 判定が geo と食い違ったターンは、次の respond（か strict_flush）で𝒢を補正する。
+        未完了が max_pending を超えたターンは測らない（"strict_verify_skipped"）。"""
+        self._strict_bg = str(mode).lower().strip() == "background"
+        self._strict_bg_max = max(1, int(max_pending))
+
+    def strict_flush(self, timeout: Optional[float]=None) -> int:
+        """裏の strict 検証が全部終わるまで待ち、溜まった𝒢補正を当てる。戻り値は当てた補正の数。"""
+        with self._sv_cv:
+            self._sv_cv.wait_for(lambda: self._sv_pending == 0, timeout)
+        return self._strict_drain()
+
+    def _strict_submit(self, ctx: Dict[str,Any]) -> None:
+        with self._sv_cv:
+            if self._sv_pending >= self._strict_bg_max:
+                self._audit.emit("strict_verify_skipped", turn=ctx["turn"], pending=self._sv_pending)
+                return
+            self._sv_pending += 1
+        try:
+            fut = _strict_pool().submit(_strict_job, ctx["q1"], ctx["q2"], self._strict_steps, self._strict_iters)
+        except Exception as e:
+            self._strict_done(ctx, None, err=e); return
+        fut.add_done_callback(lambda f: self._strict_done(ctx, f))
+
+    def _strict_done(self, ctx: Dict[str,Any], fut: Any, err: Optional[BaseException]=None) -> None:
+        # プールの管理スレッドから呼ばれる。監査バッファも含めて agent の状態は触らず、_sv_ready へ積むだけ
+        try:
+            if err is None:
+                try: L, ref, ms = fut.result()
+                except Exception as e: err = e
+            if err is not None:
+                self._sv_ready.append(("strict_verify_error", {"turn": ctx["turn"], "err": f"{type(err).__name__}: {err}"}, None))
+                return
+            dn = L / ref; ok = dn <= ctx["theta"]
+            ev = {"turn": ctx["turn"], "d_geo": ctx["d"], "d_norm_geo": ctx["d_norm"], "ok_geo": ctx["ok"],
+                  "d_strict": L, "d_norm_strict": dn, "ok_strict": ok, "agree": (ok == ctx["ok"]), "ms": round(ms, 1)}
+            fix = (ctx, dn) if ok != ctx["ok"] and ctx["g"] is not None else None
+            self._sv_ready.append(("strict_verify", ev, fix))
+        finally:
+            with self._sv_cv:
+                self._sv_pending -= 1; self._sv_cv.notify_all()
+
+    def cards_post(self, cards: List[PersonCard], mode: str="strict") -> None:
+        """装着集合の差し替えを予約する（どのスレッドからでも可）。実際の差し替えと監査は
+        次の respond の冒頭か cards_apply_pending() で、呼んだスレッドが行う。未適用の予約は最新の1件だけ残る。"""
+        self._cards_next.append((list(cards), mode))
+
+    def cards_apply_pending(self) -> bool:
+        """予約済みの装着集合があれば差し替える（応答スレッドから呼ぶ）。差し替えたら True。"""
+        try: cards, mode = self._cards_next.popleft()
+        except IndexError: return False
+        self.card_mgr.replace_active(cards, now_iso(), mode=mode)
+        return True
+
+    def _strict_drain(self) -> int:
+        n = 0
+        while self._sv_ready:
+            typ, ev, fix = self._sv_ready.popleft()
+            self._audit.emit(typ, **ev)
+            if fix is not None: self._g_correct(*fix); n += 1
+        return n
+
     def _confidence(self, snapshot: Dict[str,float], score: float, d_norm: float) -> float:
         reality = float(snapshot.get("reality", 0.5))
         conf = max(0.0, min(1.0, 0.5*(1.0 - d_norm) + 0.3*score + 0.2*reality))
         return conf
 
     def _domain_hit(self, user_text: str) -> bool:
-        toks = set(re.findall(r"[A-Za-z0-9_]+|[一-龯ぁ-ゟ゠ァ-ヿー]+", user_text.lower()))
+        toks = set(_rx("tok").findall(user_text.lower()))
         domains = []
         for c in self.card_mgr.active:
             domains.extend([d.strip().lower() for d in (c.influence.domains or []) if d.strip()])
@@ -652,6 +1363,9 @@ class WisePartnerAgent:
         return max(0.0, min(1.0, x))
 
     # ---- カード ----
+    def cards_deactivate(self, card_id: str) -> bool:
+        return self.card_mgr.deactivate(card_id)
+
     def cards_activate(self, card: PersonCard, mode: str="strict") -> bool:
         now_iso_s = now_iso()
         if card.nonce:
@@ -669,7 +1383,7 @@ class WisePartnerAgent:
     def _topic_delta(user_text: str, domains: List[str]) -> float:
         if not domains: return 0.0
         t = user_text.strip().lower()
-        tokens = re.findall(r"[A-Za-z0-9_]+|[一-龯ぁ-ゟ゠ァ-ヿー]+", t)
+        tokens = _rx("tok").findall(t)
         if not tokens: return 0.0
         toks = set(tokens)
         for d in domains:
@@ -696,10 +1410,7 @@ class WisePartnerAgent:
                 if abs(clamped) < 1e-6: continue
                 total[metric] = total.get(metric,0.0) + clamped
                 mag_acc += abs(clamped)
-                self._wm_traces.append({
-                    "metric": metric, "delta": clamped,
-                    "created_ts": time.time(), "tau_s": max(1.0, infl.tau_days*86400.0)
-                })
+                self._wm_traces.append(metric, clamped, self._clock(), max(1.0, infl.tau_days*86400.0))
         if total:
             mag = sum(abs(v) for v in total.values())
             if mag > _Cfg.TOTAL_BIAS_CAP:
@@ -708,24 +1419,26 @@ class WisePartnerAgent:
                     total[k] *= scale
                 mag_acc = sum(abs(v) for v in total.values())
         self._last_card_influence_mag = mag_acc
-        if len(self._wm_traces) > self._wm_trace_cap:
-            self._wm_traces = self._wm_traces[-self._wm_trace_cap:]
+        self._wm_traces.keep_last(self._wm_trace_cap)
         return total
 
     def _decay_wm_traces(self) -> Dict[str,float]:
-        now = time.time()
-        agg: Dict[str,float] = {}; keep: List[Dict[str,Any]] = []
-        for tr in self._wm_traces:
-            age = max(0.0, now - tr["created_ts"]); tau = tr["tau_s"]
-            delta = tr["delta"] * math.exp(-age / tau)
+        now = self._clock()
+        agg: Dict[str,float] = {}; keep = _TraceBuf()
+        for metric, delta0, ts, tau in self._wm_traces:
+            age = max(0.0, now - ts)
+            delta = delta0 * math.exp(-age / tau)
             if abs(delta) >= 1e-6 and age < tau*10:
-                agg[tr["metric"]] = agg.get(tr["metric"],0.0) + delta
-                keep.append(tr)
-        self._wm_traces = keep[-self._wm_trace_cap:]
+                agg[metric] = agg.get(metric,0.0) + delta
+                keep.append(metric, delta0, ts, tau)
+        keep.keep_last(self._wm_trace_cap)
+        self._wm_traces = keep
         return agg
 
     def _simulate_outcome(self, option: Dict[str,Any], user_text: str) -> Tuple[float, Dict[str,float]]:
         base = asdict(self.state.user_wellbeing)
+        for n in option.get("influential_norms", []):
+            self._links_touch(_wm_key(option.get("action","respond_helpfully"), n))
         instant = self._apply_card_influences_once(user_text)
         decayed = self._decay_wm_traces()
         rnd = self._rng
@@ -794,7 +1507,7 @@ class WisePartnerAgent:
             meta = f"(score={score:.3f}; success={s['project_success_prob']:.2f}; trust={s['trust_level']:.2f}; stress={s['stress_level']:.2f}; reality={reality:.2f})"
             return f"{base} {prop_txt} {meta} {base_tag}"
         def semanticize(self, text: str) -> Dict[str,float]:
-            m = re.search(r"<!--METRICS\s+success=([0-9.]+)\s+trust=([0-9.]+)\s+stress=([0-9.]+)\s+reality=([0-9.]+)-->", text)
+            m = _rx("metrics").search(text)
             if m:
                 return {"project_success_prob": float(m.group(1)),
                         "trust_level": float(m.group(2)),
@@ -833,7 +1546,7 @@ class WisePartnerAgent:
         r = self._g_reward(before, after, d_norm)
         self._g_r_baseline = self._g_beta*self._g_r_baseline + (1-self._g_beta)*r
         adv = r - self._g_r_baseline
-        links = self.state.world_model.links.get(key, {})
+        links = dict(self.state.world_model.links.get(key, {}))  # 行は差し替え（スナップショット共有のため）
         for metric, (impact, conf) in list(links.items()):
             if metric not in used_metrics: continue
             delta_m = (after.get(metric,0.5) - before.get(metric,0.5))
@@ -847,12 +1560,111 @@ class WisePartnerAgent:
             new = max(-0.2, min(0.2, new))
             if abs(new) < 1e-4: new = 0.0
             links[metric] = (new, conf)
-        self.state.world_model.links[key] = links
+        if links or key in self.state.world_model.links:  # 空行は保存しない
+            self.state.world_model.links[key] = _compact_row(links)
+            self._links_touch(key)
+            self._links_enforce()
         self._audit.emit("g_update", key=key, reward=r, adv=adv, used=used_metrics)
 
+    def _g_correct(self, ctx: Dict[str,Any], d_norm_strict: float) -> None:
+        """裏の strict で theta 判定が覆ったターンの𝒢を後から補正する（1次近似）。
+        報酬は -0.35·d_norm を含むので geo→strict の差 dr をベースラインへ足し、advantage の差 β·dr に比例した勾配を
+        素の SGD（学習率 _g_lr）で link 行へ当てる。Adam の状態は変えない。"""
+        key, before, after, used = ctx["g"]
+        dr = -0.35*(d_norm_strict - ctx["d_norm"])
+        self._g_r_baseline += (1 - self._g_beta)*dr
+        dadv = self._g_beta*dr
+        row = self.state.world_model.links.get(key)
+        if row is not None:
+            links = dict(row)
+            for metric, (impact, conf) in list(links.items()):
+                if metric not in used: continue
+                new = impact + self._g_lr*conf*(after.get(metric,0.5) - before.get(metric,0.5))*dadv
+                new = max(-0.2, min(0.2, new))
+                if abs(new) < 1e-4: new = 0.0
+                links[metric] = (new, conf)
+            self.state.world_model.links[key] = _compact_row(links)
+        self._audit.emit("g_correction", turn=ctx["turn"], key=key, dr=dr, d_norm_geo=ctx["d_norm"], d_norm_strict=d_norm_strict)
+
+    # ---- link ストア（上限・追い出し・圧縮） ----
+    def set_link_capacity(self, cap: int, policy: Optional[str]=None) -> None:
+        """links の上限（0 で無制限）と追い出し方針（"lru" / "impact"）を設定し、即座に適用する。"""
+        if policy is not None:
+            if policy not in ("lru", "impact"): raise ValueError(f"unknown eviction policy: {policy}")
+            self._links_policy = policy
+        self._links_cap = max(0, int(cap))
+        self._links_enforce()
+
+    def _links_touch(self, key: str) -> None:
+        self._link_tick += 1
+        self._link_touch[key] = self._link_tick
+
+    def _links_drop(self, keys: List[str]) -> None:
+        links = self.state.world_model.links
+        for k in keys:
+            for metric in links.pop(k, {}):
+                self._g_opt.pop(f"{k}::{metric}", None)
+            self._link_touch.pop(k, None)
+
+    def compact_links(self) -> int:
+        """impact が全て 0 の行（空行を含む）を取り除く。保護行は残す。戻り値は削除数。
+        取り除いた key は以後の𝒢更新で学習し直さない（行が無いので）点に注意。"""
+        dead = [k for k, row in self.state.world_model.links.items()
+                if k not in self._links_protected and all(v[0] == 0 for v in row.values())]
+        if dead:
+            self._links_drop(dead)
+            self._audit.emit("links_compacted", n=len(dead), keys=dead[:16])
+        return len(dead)
+
+    def _links_enforce(self) -> None:
+        """上限超過時: まず圧縮、それでも超えていれば方針に従って上限の 9 割まで一括で追い出す。"""
+        links = self.state.world_model.links
+        cap = self._links_cap
+        if cap <= 0 or len(links) <= cap: return
+        self.compact_links()
+        if len(links) <= cap: return
+        target = max(len(self._links_protected), cap - cap // 10)
+        touch = self._link_touch
+        for k in links:   # 呼び出し側が直接入れた行など tick の無い行は、行の並び順で今 tick を振る（0 扱いで先に消さない）
+            if k not in touch: self._links_touch(k)
+        cand = [k for k in links if k not in self._links_protected]
+        if self._links_policy == "impact":
+            score = lambda k: (sum(abs(v[0])*v[1] for v in links[k].values()), touch.get(k, 0), k)
+        else:
+            score = lambda k: (touch.get(k, 0), k)
+        victims = [k for k in heapq.nsmallest(len(links) - target, cand, key=score)]
+        self._links_drop(victims)
+        self._audit.emit("links_evicted", policy=self._links_policy, n=len(victims), cap=cap, keys=victims[:16])
+
+    # ---- 締め切り ----
+    def _card_limit(self, attr: str) -> Optional[int]:
+        """装着中カードの caps.<attr>（max_ms 等）の最小値。正の値が無ければ None。"""
+        xs = [int(getattr(c.caps, attr)) for c in self.card_mgr.active if getattr(c.caps, attr, 0) and int(getattr(c.caps, attr)) > 0]
+        return min(xs) if xs else None
+
+    def _pick_metric_mode(self, want: str, remaining_ms: float) -> Tuple[str, float]:
+        """want から strict→geo→line の順に、見積りが残り予算に収まる最初のモードを選ぶ（どれも無理なら line）。
+        参照長（正規化の分母）が未計算のモードは2回分で見積もる。"""
+        est = 0.0
+        chain = _MODE_STEPDOWN[_MODE_STEPDOWN.index(want):] if want in _MODE_STEPDOWN else (want, "line")
+        for m in chain:
+            est = self._mode_cost_ms[m] * (1.0 if m in GeometryS._L_REF_CACHE else 2.0)
+            if est <= remaining_ms: return m, est
+        return "line", est
+
     # ---- レスポンス ----
     def respond(self, user_text: str, explain: bool=True, metric_mode: str="auto",
-                slm_mode: str="consistent", use_slm: bool=False) -> str:
+                slm_mode: str="consistent", use_slm: bool=False, deadline_ms: Any=_DEADLINE_UNSET) -> str:
+        """deadline_ms: このターンの予算（壁時計 ms）。数値か "card"（装着中カードの caps.max_ms の最小値）を渡したときだけ、
+        残り予算で距離計算が収まらないと見積もったら strict→geo→line と降格する。
+        省略時は caps.max_ms を予算として計測・記録するだけで降格しない（実時間で状態が変わらないように）。None は予算なし。
+        内訳は _last_budget と監査へ。"""
+        t_start = time.perf_counter()
+        if self._sv_ready: self._strict_drain()
+        if self._cards_next: self.cards_apply_pending()
+        stepdown = deadline_ms is not _DEADLINE_UNSET and deadline_ms is not None
+        if deadline_ms is _DEADLINE_UNSET or deadline_ms == "card": deadline_ms = self._card_limit("max_ms")
+        stepdown = stepdown and deadline_ms is not None
         self._turn += 1
         self._last_action_context = {"_raw_user_text": user_text}
         if metric_mode == "auto":
@@ -866,18 +1678,30 @@ class WisePartnerAgent:
                          "safety":{"forbidden":[],"disclaimer":None},
                          "citations":{"required":False}},
             cards_in_effect=[c.meta.id for c in self.card_mgr.active],
-            trace_id=f"tr-{int(time.time()*1000)}"
+            trace_id=f"tr-{int(self._clock()*1000)}"
         )
         option = {"action":"respond_helpfully","influential_norms":["be_kind"]}
         score, snapshot = self._simulate_outcome(option, user_text)
         self._persona_update_from_outcome()
 
         m_mode = (metric_mode or "").lower().strip()
-        if m_mode not in ("line","geo","strict"): m_mode = "geo"
+        if m_mode not in ("line","geo","strict","surrogate"): m_mode = "geo"
+        m_req, est_ms = m_mode, None
+        bg = m_mode == "strict" and self._strict_bg
+        if bg: m_mode = "geo"   # strict は裏で測る（締め切りにも数えない）
+        m_want = m_mode
+        if stepdown:
+            left = deadline_ms - (time.perf_counter() - t_start)*1e3
+            m_mode, est_ms = self._pick_metric_mode(m_mode, left)
+            if m_mode != m_want:
+                self._audit.emit("metric_degraded", turn=self._turn, frm=m_want, to=m_mode,
+                                 left_ms=round(left, 3), est_ms=round(est_ms, 3))
         R = WisePartnerAgent.Realizer(lang=spec.constraints["style"]["lang"])
         V = WisePartnerAgent.Validator(theta_norm=0.25, mode=m_mode)
 
         draft0 = R.realize(spec, snapshot, score)
+        ref_cached = m_mode in GeometryS._L_REF_CACHE
+        t_v = time.perf_counter()
         if use_slm:
             draft1 = self._refine_with_slm(draft0)
             ok1, d_raw, d_norm, got, st = V.check(snapshot, draft1, R.semanticize)
@@ -885,6 +1709,10 @@ class WisePartnerAgent:
         else:
             ok1, d_raw, d_norm, got, st = V.check(snapshot, draft0, R.semanticize)
             draft = draft0
+        if st.get("mode") == m_mode:  # 見積りの更新（参照長の初回計算を含むなら半分を1回分とみなす）
+            dt = (time.perf_counter() - t_v)*1e3 / (1.0 if ref_cached else 2.0)
+            self._mode_cost_ms[m_mode] = 0.7*self._mode_cost_ms[m_mode] + 0.3*dt
+        if bg: st = {**st, "mode": f"{st.get('mode')}(strict-bg)"}
 
         conf = self._confidence(snapshot, score, d_norm)
         in_domain = self._domain_hit(user_text)
@@ -901,25 +1729,36 @@ class WisePartnerAgent:
             s = snapshot
             reality = max(0.0, min(1.0, got.get("reality", 0.5)))
             fixed = f"(score={score:.3f}; success={s['project_success_prob']:.2f}; trust={s['trust_level']:.2f}; stress={s['stress_level']:.2f}; reality={reality:.2f})"
-            draft = re.sub(r"\(score=.*?\)", fixed, draft)
+            draft = _rx("score").sub(fixed, draft)
 
         # 進化法則𝒢：ローカル更新
+        g_ctx = None
         try:
             key = _wm_key("respond_helpfully", "be_kind")
             used = ["project_success_prob","trust_level","stress_level","reality"]
             got_final = R.semanticize(draft)
             before = snapshot; after = got_final
             self._g_update_links(key, before, after, d_norm, used_metrics=used)
+            if after.get("reality", 0.5) >= 0.55: g_ctx = (key, dict(before), dict(after), used)
         except Exception as e:
             self._audit.emit("g_update_error", err=str(e))
+        if bg:
+            self._strict_submit({"turn": self._turn, "q1": dict(snapshot), "q2": dict(got), "d": d_raw, "d_norm": d_norm,
+                                 "ok": ok1, "theta": V.theta_norm, "g": g_ctx})
 
+        used_ms = (time.perf_counter() - t_start)*1e3
+        self._last_budget = {"deadline_ms": deadline_ms, "used_ms": used_ms, "mode_req": m_req, "mode": st.get("mode"),
+                             "est_ms": est_ms, "over": deadline_ms is not None and used_ms > deadline_ms}
         if explain:
             kappa = GeometryS.curvature_scalar_like(snapshot)
             draft += f" | d={round(d_raw,3)} d_norm={round(d_norm,3)} conf={round(conf,3)} act={speech} mode={st.get('mode')} κ~={round(kappa,3)}"
+            if deadline_ms is not None:
+                draft += f" budget={used_ms:.1f}/{deadline_ms:g}ms" + (f" (from {m_want})" if m_mode != m_want else "")
 
         self._audit.emit("respond",
                          turn=self._turn, conf=conf, d_norm=d_norm, act=speech,
-                         mode=st.get("mode"), len=len(draft), in_domain=in_domain)
+                         mode=st.get("mode"), len=len(draft), in_domain=in_domain,
+                         mode_req=m_req, deadline_ms=deadline_ms, used_ms=round(used_ms, 3))
         return draft
 
     def _refine_with_slm(self, text: str) -> str:
@@ -933,16 +1772,32 @@ class WisePartnerAgent:
         L, Ln, st = GeometryS.dist_norm({"project_success_prob":0.5,"trust_level":0.5,"stress_level":0.5,"reality":0.5}, q2, mode=metric_mode)
         return {"meta_input": meta_i, "q2": q2, "score2": round(score2,3), "d":round(L,3),"d_norm":round(Ln,3),"mode":st.get("mode")}
 
-    def checkpoint(self, reason:str="periodic") -> Checkpoint:
-        payload = {
+    def _checkpoint_payload(self) -> Dict[str,Any]:
+        # link行は差し替え更新なので外側 dict の浅いコピーで十分なスナップショットになる
+        return {
             "personality": asdict(self.personality),
-            "state": asdict(self.state),
+            "state": {"user_wellbeing": asdict(self.state.user_wellbeing),
+                      "world_model": {"links": dict(self.state.world_model.links)}},
             "coupling": asdict(self.coupling),
             "active_cards": [c.meta.id for c in self.card_mgr.active],
             "self_sha256": getattr(self, "_self_sha256", "(unknown)")
         }
+
+    def checkpoint(self, reason:str="periodic") -> Checkpoint:
+        meta = {"reason": reason, "turn": self._turn}
+        return self._ckmgr.make(self._checkpoint_payload(), turn=self._turn, meta=meta)
+
+    def checkpoint_async(self, reason:str="periodic"):
+        """スナップショットだけ呼び出し側で取り、ハッシュ/署名/ログ追記は裏で行う。Future を返す。"""
         meta = {"reason": reason, "turn": self._turn}
-        return self._ckmgr.make(payload, turn=self._turn, meta=meta)
+        return self._ckmgr.make_async(self._checkpoint_payload(), turn=self._turn, meta=meta)
+
+    def set_checkpoint_log(self, path: Optional[str], fsync: bool=False) -> None:
+        """チェックポイントを追記専用ログ（JSONL）にも永続化する。None で解除。"""
+        self._ckmgr.set_log(CheckpointLog(path, fsync=fsync) if path else None)
+
+    def verify_checkpoint_log(self) -> bool:
+        return self._ckmgr.verify_log()
 
     def last_checkpoint_ok(self) -> bool:
         last = self._ckmgr.last()
@@ -952,8 +1807,8 @@ class WisePartnerAgent:
         return self._ckmgr.verify(len(self._ckmgr._chain)-1)
 
     # ---- 状態IO（スキーマ移行あり） ----
-    def export_state(self) -> str:
-        payload = {
+    def _state_payload(self) -> Dict[str,Any]:
+        return {
             "version": SCHEMA_VERSION,
             "personality": asdict(self.personality),
             "state": asdict(self.state),
@@ -961,29 +1816,176 @@ class WisePartnerAgent:
             "cards": [asdict(c) for c in self.card_mgr.active],
             "profile": self.profile
         }
+
+    def export_state(self) -> str:
+        payload = self._state_payload()
         payload["hash"] = sha256_bytes(canonical_json(payload))
+        if self._delta_on: self._delta_remember(self.state_root())
         return json.dumps(payload, ensure_ascii=False, separators=(",",":"))
 
-    def import_state(self, s: str) -> None:
-        d = json.loads(s)
+    @staticmethod
+    def _migrate_state(d: dict) -> dict:
         v = d.get("version", "v5.2")
         while v != SCHEMA_VERSION:
             mig = _MIGRATIONS.get(v)
             if not mig:
                 raise RuntimeError(f"unknown schema version {v}, no migration to {SCHEMA_VERSION}")
             d = mig(d); v = d.get("version", v)
+        return d
+
+    def _load_state_dict(self, d: dict) -> None:
+        d = self._migrate_state(d)
         self.personality = Personality(**d["personality"])
         self.state = AgentState(
             user_wellbeing=UserWellbeing(**d["state"]["user_wellbeing"]),
             world_model=WorldModel(**d["state"]["world_model"])
         )
         self.coupling = Coupling(**d["coupling"])
-        self.card_mgr.active = [load_card_from_json_str(json.dumps(x)) for x in d.get("cards",[])]
+        self.card_mgr.active = [load_card_from_dict(x) for x in d.get("cards",[])]
         self.profile = d.get("profile", self.profile)
+        self._link_tick = 0; self._link_touch = {}
+        for k in self.state.world_model.links: self._links_touch(k)   # 取り込み順を LRU 順とみなす
+        n = len(self.state.world_model.links)       # 復元は忠実に（hash を保つ）。上限は次の𝒢更新から効く
+        if 0 < self._links_cap < n: self._audit.emit("links_over_cap", n=n, cap=self._links_cap)
+        if self._delta_on: self._delta_remember(self.state_root())
+
+    def import_state(self, s: str) -> None:
+        self._load_state_dict(json.loads(s))
+
+    def export_state_bin(self, fp, compress: bool=False) -> str:
+        """バイナリ形式で fp へ1パス書き出し（SHA-256 は逐次計算）。戻り値は本体の hex digest。"""
+        from core.state_bin import write_state_bin
+        head = {"version": SCHEMA_VERSION, "personality": asdict(self.personality), "coupling": asdict(self.coupling),
+                "profile": self.profile, "user_wellbeing": asdict(self.state.user_wellbeing)}
+        cards = (asdict(c) for c in self.card_mgr.active)
+        return write_state_bin(fp, head, self.state.world_model.links.items(), cards, compress=compress)
+
+    def import_state_bin(self, src) -> str:
+        """export_state_bin の出力を読み戻す（src: パスなら mmap、ファイルオブジェクトならストリーム）。
+        旧 version はJSON版と同じ移行チェーンを通す。戻り値は検証済み digest。"""
+        from core.state_bin import BinStateReader
+        with BinStateReader(src) as r:
+            d = r.to_dict()
+            self._load_state_dict(d)
+            return r.digest
+
+    # ---- 差分同期（レプリカ間） ----
+    def state_hash(self) -> str:
+        """export_state の "hash" と同じ値（全状態の canonical JSON の SHA-256）。"""
+        return sha256_bytes(canonical_json(self._state_payload()))
+
+    def state_root(self) -> str:
+        """差分同期の状態 ID。export_state と同じ内容の Merkle 根（link 行を葉に、変わっていない葉は再ハッシュしない）。
+        export_state の "hash"（全体の canonical JSON）とは別の値。同じ状態なら agent を問わず同じ値になる。"""
+        return self._delta_merkle.payload_root({
+            "version": SCHEMA_VERSION, "personality": asdict(self.personality),
+            "state": {"user_wellbeing": asdict(self.state.user_wellbeing), "world_model": {"links": self.state.world_model.links}},
+            "coupling": asdict(self.coupling), "cards": [asdict(c) for c in self.card_mgr.active], "profile": self.profile})
+
+    def set_delta_sync(self, enabled: bool=True) -> Optional[str]:
+        """差分同期の起点記録を有効/無効にする。有効にすると今の状態を起点として覚え、その state_root を返す。
+        無効（既定）の間は export_state / import_state で起点を記録しない（使わない呼び出し側に費用をかけない）。"""
+        self._delta_on = bool(enabled)
+        if not self._delta_on:
+            self._delta_bases.clear(); self._delta_merkle = _MerkleCache(); return None
+        h = self.state_root(); self._delta_remember(h)
+        return h
+
+    def _delta_base(self) -> Tuple[Dict[str,Any], ...]:
+        # link 行は読み取り専用の LinkRow なので外側 dict の浅いコピーで足りる
+        return ({"personality": asdict(self.personality), "user_wellbeing": asdict(self.state.user_wellbeing),
+                 "coupling": asdict(self.coupling)},
+                dict(self.state.world_model.links),
+                [(c.meta.id, asdict(c)) for c in self.card_mgr.active],
+                {"profile": self.profile})
+
+    def _delta_remember(self, h: str) -> None:
+        bases = self._delta_bases
+        bases[h] = self._delta_base(); bases.move_to_end(h)
+        while len(bases) > _DELTA_BASES_MAX: bases.popitem(last=False)
+
+    def export_delta(self, since_hash: str) -> str:
+        """since_hash（以前の set_delta_sync / state_root / export_delta の hash）からの差分を JSON で返す。
+        変わった personality/wellbeing/coupling の項目、追加・変更・削除された link 行、カードの並びと変わったカードだけを載せる。
+        since_hash を覚えていなければ（保持は直近 _DELTA_BASES_MAX 個）全状態を "full" に入れて返す。
+        呼ぶと差分同期が有効になる（set_delta_sync）。"""
+        self._delta_on = True
+        h = self.state_root()
+        out: Dict[str,Any] = {"delta": 1, "version": SCHEMA_VERSION, "base": since_hash, "hash": h}
+        base = self._delta_bases.get(since_hash)
+        if base is None:
+            out["full"] = self._state_payload()
+        else:
+            b_fields, b_links, b_cards, b_misc = base
+            cur_fields, _, cur_cards, cur_misc = self._delta_base()
+            for sec, cur in cur_fields.items():
+                ch = {k: v for k, v in cur.items() if b_fields[sec].get(k) != v}
+                if ch: out[sec] = ch
+            if cur_misc["profile"] != b_misc["profile"]: out["profile"] = cur_misc["profile"]
+            links = self.state.world_model.links
+            put = {k: dict(r.items()) for k, r in links.items() if b_links.get(k) != r}   # 内容で比べる
+            gone = [k for k in b_links if k not in links]
+            if put or gone: out["links"] = {"set": put, "del": gone}
+            ids = [i for i, _ in cur_cards]
+            if len(set(ids)) != len(ids):
+                if cur_cards != b_cards: out["cards"] = {"all": [c for _, c in cur_cards]}
+            elif [i for i, _ in b_cards] != ids or cur_cards != b_cards:
+                old = dict(b_cards)
+                out["cards"] = {"order": ids, "set": {i: c for i, c in cur_cards if old.get(i) != c}}
+        self._delta_remember(h)
+        return json.dumps(out, ensure_ascii=False, separators=(",",":"), default=_json_default)
+
+    def apply_delta(self, s: str) -> str:
+        """export_delta の出力を当てる。現在の state_root が delta の base と一致しなければ ValueError。
+        当てた後の state_root が delta の hash と一致しなければ元に戻して ValueError。戻り値は新しい state_root。
+        照合は Merkle 根なので、変わった葉だけを再ハッシュする（"full" は全葉）。
+        送り手の複製として当てるので link の上限による追い出しはしない。"""
+        d = json.loads(s)
+        if d.get("delta") != 1: raise ValueError("not a state delta")
+        if "full" in d:
+            prev = self._state_payload()
+            self._load_state_dict(d["full"])
+        else:
+            if d.get("version") != SCHEMA_VERSION: raise ValueError(f"delta version {d.get('version')} != {SCHEMA_VERSION}")
+            if self.state_root() != d["base"]: raise ValueError("state does not match delta base")
+            prev = None
+            keep = (self.personality, self.state.user_wellbeing, self.coupling, self.profile,
+                    dict(self.state.world_model.links), list(self.card_mgr.active), dict(self._link_touch), self._link_tick)
+            if "personality" in d: self.personality = Personality(**{**asdict(self.personality), **d["personality"]})
+            if "user_wellbeing" in d:
+                self.state.user_wellbeing = UserWellbeing(**{**asdict(self.state.user_wellbeing), **d["user_wellbeing"]})
+            if "coupling" in d: self.coupling = Coupling(**{**asdict(self.coupling), **d["coupling"]})
+            if "profile" in d: self.profile = d["profile"]
+            if "links" in d:
+                links = self.state.world_model.links
+                for k in d["links"].get("del", ()): links.pop(k, None); self._link_touch.pop(k, None)
+                for k, row in d["links"].get("set", {}).items():
+                    links[k] = row   # LinkRow に揃う（list の値は tuple に凍結）
+                    self._links_touch(k)
+            if "cards" in d:
+                c = d["cards"]
+                if "all" in c:
+                    self.card_mgr.active = [load_card_from_dict(x) for x in c["all"]]
+                else:
+                    have = {x.meta.id: x for x in self.card_mgr.active}
+                    self.card_mgr.active = [load_card_from_dict(c["set"][i]) if i in c["set"] else have[i] for i in c["order"]]
+        h = self.state_root()
+        if h != d["hash"]:
+            if prev is not None:
+                self._load_state_dict(prev)
+            else:
+                (self.personality, self.state.user_wellbeing, self.coupling, self.profile,
+                 links, active, self._link_touch, self._link_tick) = keep
+                self.state.world_model.links = _link_store(links); self.card_mgr.active = active
+            raise ValueError("state hash mismatch after delta")
+        if self._delta_on: self._delta_remember(h)
+        return h
 
 # ===== JSON→Card & デモカード =====
 def load_card_from_json_str(s: str) -> PersonCard:
-    d = json.loads(s)
+    return load_card_from_dict(json.loads(s))
+
+def load_card_from_dict(d: Dict[str,Any]) -> PersonCard:
     return PersonCard(
         meta=RoleCardMeta(**d["meta"]),
         caps=RoleCapabilities(**d["caps"]),
@@ -1,5 +1,6 @@
-import json, hmac, hashlib, base64, argparse, sys, os
-def canonical(obj): return json.dumps(obj, ensure_ascii=False, separators=(",",":"), sort_keys=True).encode()
+import json, argparse, sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo 直下から python scripts/sign_card.py で動くように
+from core.card_bulk import sign_card_dict
 def read_hex(path): return bytes.fromhex(open(path,"r",encoding="utf-8").read().strip())
 def main():
     ap=argparse.ArgumentParser()
@@ -7,12 +8,8 @@ def main():
     ap.add_argument("--out",dest="out",required=True); ap.add_argument("--device-lock",dest="dev",default=os.getenv("DEVICE_ID",""))
     a=ap.parse_args()
     card=json.load(open(a.inp,"r",encoding="utf-8")); card.setdefault("meta",{}); card.setdefault("caps",{}); card.setdefault("policy",{})
-    card["meta"]["alg"]="HMAC-SHA256"; 
-    if a.dev: card["meta"]["device_lock"]=a.dev
-    body={"meta":{k:card["meta"][k] for k in card["meta"] if k!="sig"},"caps":card["caps"],"policy":card["policy"]}
-    msg=canonical(body); secret=read_hex(a.secret)
-    sig=base64.b64encode(hmac.new(secret, hashlib.sha256(msg).digest(), hashlib.sha256).digest()).decode()
-    card["meta"]["sig"]=sig
+    # 実行時の検証と同じ本文（card_body_bytes）と HMAC で署名する（一括版は core/card_bulk.py）
+    card,_,_=sign_card_dict(card, read_hex(a.secret), device_lock=(a.dev or None))
     json.dump(card, open(a.out,"w",encoding="utf-8"), ensure_ascii=False, separators=(",",":"))
     print(f"wrote {a.out} (alg={card['meta']['alg']}, device_lock={card['meta'].get('device_lock','-')})")
 if __name__=="__main__": main()
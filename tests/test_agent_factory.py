@@ -0,0 +1,33 @@
+import json
+from dataclasses import asdict, is_dataclass
+from core.agent_factory import AgentFactory
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile
+from tests.test_cards import make_card, SECRET
+
+def test_clone_matches_fresh_agent_and_is_isolated():
+    f = AgentFactory(profile=Profile.DESKTOP, card_secret=SECRET, cards=[make_card("m1")])
+    a, b = f.create(seed=7), f.create(seed=7)
+    fresh = WisePartnerAgent(seed=7, card_secret=SECRET, profile=Profile.DESKTOP)
+    fresh.cards_activate(make_card("m1"), mode="strict")
+    assert a.respond("咳が出る", explain=False) == fresh.respond("咳が出る", explain=False)
+    assert json.loads(a.export_state())["hash"] == json.loads(fresh.export_state())["hash"]
+    # a の学習/カード操作は雛形と b に漏れない
+    assert a.cards_deactivate("m1")
+    assert [c.meta.id for c in b.card_mgr.active] == ["m1"]
+    assert [c.meta.id for c in f.prototype.card_mgr.active] == ["m1"]
+    key = "respond_helpfully|be_kind"
+    before = asdict(a.state.user_wellbeing)
+    a._g_update_links(key, before, {**before, "trust_level": 0.8, "reality": 0.9}, 0.1, ["trust_level"])
+    assert a.state.world_model.links[key] != b.state.world_model.links[key]
+    assert b.state.world_model.links == f.prototype.state.world_model.links
+
+def test_clone_does_not_share_mutable_containers():
+    f = AgentFactory(profile=Profile.DESKTOP)
+    a, b = f.create(), f.create()
+    a.dynamics.trait_max = 80; a._links_protected.add("task:x|external")
+    a._used_nonces.add("n1"); a._mode_cost_ms["geo"] = 1.0
+    for o in (b, f.prototype):
+        assert o.dynamics.trait_max == 100 and "task:x|external" not in o._links_protected
+        assert "n1" not in o._used_nonces and o._mode_cost_ms["geo"] != 1.0
+    proto = f.prototype.__dict__                                         # 可変コンテナ/状態 dataclass は1つも共有しない
+    assert not [k for k, v in a.__dict__.items() if v is proto.get(k) and (isinstance(v, (list, dict, set)) or is_dataclass(v))]
@@ -0,0 +1,26 @@
+import pytest
+from core.anchor_field import AnchorField, ANCHORS
+from core.wise_partner_core_v52_plus import GeometryS, WisePartnerAgent, Profile
+
+def test_anchor_field_roundtrip_lookup_and_field_mode(tmp_path):
+    f = AnchorField.build(ANCHORS["neutral"], n=5, name="neutral")
+    p = tmp_path / "neutral.wpaf"; f.save(str(p))
+    g = AnchorField.load(str(p))
+    assert g.name == "neutral" and g.n == 5 and list(g.values) == list(f.values)
+    corner = GeometryS._unembed([0.25, 0.5, 0.75, 1.0])           # 格子点上は保存値そのもの
+    i = ((1*5 + 2)*5 + 3)*5 + 4
+    assert abs(g.lookup(corner) - g.values[i]) < 1e-9
+    q = {"project_success_prob": .9, "trust_level": .2, "stress_level": .3, "reality": .8}
+    Lg, _ = GeometryS.dist(ANCHORS["neutral"], q, mode="geo")
+    assert abs(g.lookup(q) - Lg) / Lg < 0.1
+    b = bytearray(p.read_bytes()); b[40] ^= 1; p.write_bytes(bytes(b))
+    with pytest.raises(ValueError): AnchorField.load(str(p))
+
+    GeometryS.register_field(g)
+    try:
+        L, st = GeometryS.dist(q, ANCHORS["neutral"], mode="field")
+        assert st["mode"] == "field" and L == g.lookup(q)
+        assert GeometryS.dist(q, q, mode="field")[1]["mode"] == "geo(no-field)"
+        assert WisePartnerAgent(profile=Profile.DESKTOP).introspect(metric_mode="field")["mode"] == "field"
+    finally:
+        GeometryS.clear_fields()
@@ -0,0 +1,42 @@
+import os, subprocess, sys, time
+import pytest
+from core.audit_store import AuditStore
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile
+
+def test_audit_store_ingest_query_and_prune(tmp_path):
+    st = AuditStore(str(tmp_path / "a.db"), batch=4, flush_s=0.05)
+    a = WisePartnerAgent(profile=Profile.DESKTOP)
+    a.set_audit_store(st, src="agent-1")
+    for _ in range(3): a.respond("計画を立てたい", explain=False)
+    a._audit.emit("card_verify_fail", reason="sig_bad", card="med.v1")
+    a._audit.emit("card_verify_fail", reason="expired", card="med.v1")
+    old = {"ts": time.time() - 10*86400, "type": "card_verify_fail", "reason": "sig_bad", "card": "old.v1"}
+    st.put(old)
+
+    week = time.time() - 7*86400
+    hits = a.audit_query(type="card_verify_fail", match={"reason": "sig_bad"}, since=week)
+    assert [e["card"] for e in hits] == ["med.v1"]
+    resp = a.audit_query(type="respond", src="agent-1")
+    assert [e["turn"] for e in resp] == [1, 2, 3]
+    assert a.audit_query(type="respond", turn=2, limit=None)[0]["turn"] == 2
+    conf = max(e["conf"] for e in resp)
+    assert len(a.audit_query(type="respond", where=[("conf", "<=", conf)])) == 3
+    assert a.audit_query(type="respond", where=[("conf", ">", conf)]) == []
+    assert a.audit_query(card="med.v1", newest_first=True)[0]["reason"] == "expired"
+    with pytest.raises(ValueError): a.audit_query(where=[("conf') OR 1=1 --", "<", 1)])
+    with pytest.raises(ValueError): a.audit_query(where=[("conf", "LIKE", 1)])
+
+    assert st.count_by_type()["card_verify_fail"] == 3
+    assert st.prune(older_than_days=7) == 1
+    assert st.query(card="old.v1") == []
+    s = st.stats(); assert s["inserted"] == s["queued"] and s["errors"] == 0 and s["batches"] >= 2
+    st.close()
+
+def test_shared_store_flushes_at_exit(tmp_path):
+    db = str(tmp_path / "x.db")
+    code = ("from core.audit_store import AuditStore\n"
+            f"s = AuditStore.shared({db!r}, flush_s=60)\n"
+            "for i in range(5): s.put({'type': 'ping', 'i': i})\n")       # flush_s 前に終了
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    subprocess.run([sys.executable, "-c", code], check=True, env=env, timeout=60)
+    assert AuditStore(db).count_by_type() == {"ping": 5}
@@ -0,0 +1,50 @@
+import json
+from core.card_bulk import sign_tree, verify_tree, main
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile, load_card_from_dict, DEMO_CARD_JSON
+
+SECRET = bytes.fromhex("33"*32)
+
+def _src(i):
+    d = json.loads(DEMO_CARD_JSON)
+    d["meta"].update(id=f"card-{i}", valid_from="2020-01-01T00:00:00Z", valid_to="2099-01-01T00:00:00Z")
+    d["meta"].pop("sig", None)
+    return d
+
+def test_bulk_sign_dir_incremental_and_verify(tmp_path):
+    src, out = tmp_path / "src", tmp_path / "signed"; src.mkdir()
+    for i in range(6): (src / f"c{i}.json").write_text(json.dumps(_src(i)), encoding="utf-8")
+    man = str(out / "MANIFEST.json")
+    r = sign_tree(str(src), str(out), SECRET, manifest=man, workers=2, incremental=True)
+    assert r["signed"] == 6 and r["skipped"] == 0
+    signed = json.loads((out / "c3.signed.json").read_text(encoding="utf-8"))
+    a = WisePartnerAgent(card_secret=SECRET, profile=Profile.DESKTOP)
+    assert a.cards_activate(load_card_from_dict(signed), mode="strict")      # 実行時の検証を通る
+    m = json.loads(open(man, encoding="utf-8").read())["cards"]
+    assert m["c3.json"]["id"] == "card-3" and m["c3.json"]["sig"] == signed["meta"]["sig"]
+
+    r = sign_tree(str(src), str(out), SECRET, manifest=man, incremental=True)
+    assert r["signed"] == 0 and r["skipped"] == 6
+    d = _src(1); d["caps"]["max_tokens"] = 123; (src / "c1.json").write_text(json.dumps(d), encoding="utf-8")
+    r = sign_tree(str(src), str(out), SECRET, manifest=man, incremental=True)
+    assert r["signed"] == 1 and r["skipped"] == 5
+    assert sign_tree(str(src), str(out), bytes(32), manifest=man, incremental=True)["signed"] == 6  # 鍵が変われば全部
+    sign_tree(str(src), str(out), SECRET, manifest=man, incremental=True)
+
+    assert verify_tree(str(out), SECRET, manifest=man, workers=2)["ok"]
+    signed["policy"]["disclaimer"] = "tampered"; (out / "c3.signed.json").write_text(json.dumps(signed), encoding="utf-8")
+    (out / "c5.signed.json").unlink()
+    bad = {b["src"]: b["reason"] for b in verify_tree(str(out), SECRET, manifest=man)["bad"]}
+    assert bad == {"c3.json": "sig_bad", "c5.json": "missing"}
+
+def test_bulk_sign_catalog_cli(tmp_path):
+    key = tmp_path / "k.hex"; key.write_text(SECRET.hex(), encoding="utf-8")
+    cat, out = tmp_path / "cards.jsonl", tmp_path / "signed.jsonl"
+    cat.write_text("".join(json.dumps(_src(i)) + "\n" for i in range(5)), encoding="utf-8")
+    args = ["--secret", str(key), "--workers", "1"]
+    assert main(["sign", "--in", str(cat), "--out", str(out), "--manifest", str(tmp_path / "m.json"),
+                 "--incremental", "--device-lock", "dev-1"] + args) == 0
+    lines = [json.loads(x) for x in out.read_text(encoding="utf-8").splitlines()]
+    assert [d["meta"]["id"] for d in lines] == [f"card-{i}" for i in range(5)]
+    assert all(d["meta"]["device_lock"] == "dev-1" for d in lines)
+    assert main(["verify", "--in", str(out), "--device", "dev-1"] + args) == 0
+    assert main(["verify", "--in", str(out), "--device", "other"] + args) == 1
@@ -0,0 +1,96 @@
+import json, time
+from core.wise_partner_core_v52_plus import (
+    WisePartnerAgent, Profile, load_card_from_json_str, card_body_bytes,
+    sig_sign, sha256_bytes, RevocationIndex, DEMO_CARD_JSON, _CARD_VERIFY_CACHE)
+
+SECRET = bytes.fromhex("22"*32)
+
+def make_card(cid="med.v1", ns="role.medicine", prio=80, forbidden=(), secret=SECRET, nonce=None):
+    d = json.loads(DEMO_CARD_JSON)
+    d["meta"].update(id=cid, valid_from="2020-01-01T00:00:00Z", valid_to="2099-01-01T00:00:00Z")
+    d["policy"].update(namespace=ns, priority=prio, forbidden=list(forbidden))
+    d["nonce"] = nonce
+    c = load_card_from_json_str(json.dumps(d))
+    c.meta.sig = sig_sign("HMAC-SHA256", secret, card_body_bytes(c))
+    return c
+
+def test_verify_cache_and_secret_rotation():
+    _CARD_VERIFY_CACHE.clear()
+    c = make_card()
+    for _ in range(3):
+        a = WisePartnerAgent(card_secret=SECRET, profile=Profile.DESKTOP)
+        assert a.cards_activate(c, mode="strict")
+    assert _CARD_VERIFY_CACHE.hits == 2 and _CARD_VERIFY_CACHE.misses == 1
+    a = WisePartnerAgent(card_secret=SECRET, profile=Profile.DESKTOP)
+    a.card_mgr.set_secret(bytes.fromhex("33"*32))   # 鍵ローテーション後は再検証され、旧署名は通らない
+    assert not a.cards_activate(c, mode="strict")
+
+def test_revocation_index_by_id_and_hash(tmp_path):
+    c = make_card()
+    bh = sha256_bytes(card_body_bytes(c))
+    for entries, kw in ((["med.v1"], {}), ([f"sha256:{bh}"], {}), (["x", "med.v1"], {"bloom_threshold": 1})):
+        a = WisePartnerAgent(card_secret=SECRET, profile=Profile.DESKTOP)
+        a.card_mgr._revocations = RevocationIndex(entries, **kw)
+        assert not a.cards_activate(c, mode="strict")
+    p = tmp_path / "REVOKED.txt"; p.write_text("# list\nother.v1\n", encoding="utf-8")
+    a = WisePartnerAgent(card_secret=SECRET, profile=Profile.DESKTOP)
+    a.card_mgr._revocations = RevocationIndex.shared(str(p))
+    assert a.cards_activate(c, mode="strict")
+
+def test_registry_priority_replace_mutex_and_deactivate(monkeypatch):
+    from core.wise_partner_core_v52_plus import _Cfg
+    monkeypatch.setattr(_Cfg, "RESEARCH_MODE", True)
+    a = WisePartnerAgent(card_secret=SECRET, profile=Profile.DESKTOP)
+    a.card_mgr._ns_limits["role.medicine"] = 2
+    assert a.cards_activate(make_card("m1", prio=10), mode="strict")
+    assert a.cards_activate(make_card("m2", prio=30, forbidden=["dose"]), mode="strict")
+    assert not a.cards_activate(make_card("m3", prio=5), mode="strict")        # 優先度が低い
+    assert a.cards_activate(make_card("m4", prio=20), mode="strict")           # m1 を置換
+    assert [c.meta.id for c in a.card_mgr.active] == ["m2", "m4"]
+    assert not a.cards_activate(make_card("l1", ns="role.legal", forbidden=["dose"]), mode="strict")
+    snap = a.card_mgr.active
+    assert a.card_mgr.active is snap                                             # 変更が無ければ同一
+    assert a.cards_deactivate("m2") and not a.cards_deactivate("m2")
+    assert a.cards_activate(make_card("l1", ns="role.legal", forbidden=["dose"]), mode="strict")
+    assert [c.meta.id for c in a.card_mgr.active] == ["m4", "l1"]
+
+def test_card_dir_watcher_swaps_only_changed(tmp_path):
+    from dataclasses import asdict
+    from core.card_watch import CardDirWatcher
+    def write(name, card):
+        (tmp_path / name).write_text(json.dumps(asdict(card)), encoding="utf-8")
+    write("a.signed.json", make_card("a1", ns="behavior", prio=10))
+    write("b.signed.json", make_card("b1", ns="tutor", prio=50))
+    agents = [WisePartnerAgent(card_secret=SECRET, profile=Profile.DESKTOP) for _ in range(3)]
+    w = CardDirWatcher(str(tmp_path), agents, secret=SECRET)
+    d = w.poll()
+    assert len(d["added"]) == 2 and not d["rejected"]
+    assert all([c.meta.id for c in a.card_mgr.active] == ["b1", "a1"] for a in agents)
+    assert w.poll() == {"added": [], "changed": [], "removed": [], "rejected": []}
+    write("a.signed.json", make_card("a2", ns="behavior", prio=10))
+    (tmp_path / "b.signed.json").unlink()
+    d = w.poll()
+    assert len(d["changed"]) == 1 and len(d["removed"]) == 1 and w.stats["verifies"] == 3
+    assert all([c.meta.id for c in a.card_mgr.active] == ["a2"] for a in agents)
+    (tmp_path / "bad.signed.json").write_text("{not json", encoding="utf-8")
+    assert len(w.poll()["rejected"]) == 1 and w.stats["rejected"] == 1 and w.last_error.startswith("bad.signed.json: ")
+
+    (tmp_path / "dir.signed.json").mkdir()                                   # 読めないファイルはその1件だけ飛ばす
+    write("c.signed.json", make_card("c1", ns="tutor", prio=50))
+    assert w.poll()["added"] == [str(tmp_path / "c.signed.json")] and w.last_error.startswith("dir.signed.json: ")
+    assert w.stats["errors"] == 1
+
+    write("c.signed.json", make_card("c2", ns="tutor", prio=50))
+    a = agents[0]; a.set_audit(True)
+    assert w.poll(defer=True)["changed"]                                     # 裏ループ相当: 予約だけ
+    assert [c.meta.id for c in a.card_mgr.active] == ["c1", "a2"]
+    a.respond("こんにちは", explain=False)                                   # 応答スレッドで差し替え
+    assert [c.meta.id for c in a.card_mgr.active] == ["c2", "a2"]
+    assert any(e["type"] == "card_set_replaced" for e in a.audit_tail(20))
+
+    def boom(defer=False): raise OSError("disk gone")
+    w.poll = boom; w.start(interval_s=0.01)                                # 裏の走査の失敗は数えて続ける
+    t0 = time.time()
+    while w.stats["errors"] < 3 and time.time() - t0 < 10: time.sleep(0.01)
+    w.stop()
+    assert w.stats["errors"] >= 3 and w.last_error == "poll: OSError: disk gone"
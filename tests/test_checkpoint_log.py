@@ -0,0 +1,45 @@
+import json
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile
+
+SECRET = bytes.fromhex("11"*32)
+
+def test_log_chains_across_restarts_and_detects_tamper(tmp_path):
+    log = str(tmp_path / "ck.jsonl")
+    a = WisePartnerAgent(profile=Profile.DESKTOP, ck_secret=SECRET)
+    a.set_checkpoint_log(log)
+    c1 = a.checkpoint("t1")
+    a.state.world_model.links["task:x|external"] = {"trust_level": (0.05, 0.8)}
+    c2 = a.checkpoint_async("t2").result(timeout=10)
+    assert c2.parent_hash == c1.hash and c1.merkle_root != c2.merkle_root
+
+    b = WisePartnerAgent(profile=Profile.DESKTOP, ck_secret=SECRET)  # 再起動相当
+    b.set_checkpoint_log(log)
+    c3 = b.checkpoint("t3")
+    assert c3.parent_hash == c2.hash
+    assert b.verify_checkpoint_log() and b.last_checkpoint_ok()
+
+    lines = open(log, encoding="utf-8").read().splitlines()
+    d = json.loads(lines[1]); d["merkle_root"] = "0"*64
+    lines[1] = json.dumps(d)
+    open(log, "w", encoding="utf-8").write("\n".join(lines) + "\n")
+    assert not b.verify_checkpoint_log()
+
+def test_merkle_root_matches_fresh_computation():
+    a = WisePartnerAgent(profile=Profile.DESKTOP)
+    a.checkpoint()
+    a.state.world_model.links["task:y|external"] = {"reality": (0.01, 0.7)}
+    inc = a.checkpoint().merkle_root
+    b = WisePartnerAgent(profile=Profile.DESKTOP)   # キャッシュ無しで同じ状態を計算
+    b.state.world_model.links["task:y|external"] = {"reality": (0.01, 0.7)}
+    assert b.checkpoint().merkle_root == inc
+
+def test_merkle_leaf_sees_in_place_row_change():
+    from core.wise_partner_core_v52_plus import _MerkleCache, LinkRow
+    m = _MerkleCache()
+    row = {"reality": (0.01, 0.7)}
+    pay = lambda: {"state": {"world_model": {"links": {"task:y|external": row}}}}
+    r1 = m.payload_root(pay())
+    row["reality"] = (0.02, 0.7)                                   # 素の dict 行を in-place で書き換え
+    r2 = m.payload_root(pay())
+    assert r2 != r1 and r2 == _MerkleCache().payload_root(pay())
+    row = LinkRow(row); assert m.payload_root(pay()) == r2          # 同じ内容の LinkRow なら同じ葉
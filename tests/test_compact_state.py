@@ -0,0 +1,33 @@
+import copy, json, pickle
+import pytest
+from dataclasses import asdict
+from core.wise_partner_core_v52_plus import (
+    WisePartnerAgent, Profile, LinkRow, WorldModel, UserWellbeing, Personality)
+
+def test_linkrow_and_slots_roundtrip():
+    row = {"trust_level": (0.1, 0.85), "reality": (-0.03, 0.8)}
+    r = LinkRow(row)
+    assert r == row and r["reality"] == (-0.03, 0.8) and list(r) == ["trust_level", "reality"]
+    assert copy.deepcopy(r) == row and type(copy.deepcopy(r)) is dict
+    assert pickle.loads(pickle.dumps(r)) == row
+    wm = WorldModel(links={"k": row, "i": {"reality": (0, 0.8)}})      # int 混じりも LinkRow（値はそのまま、JSON 表現を保つ）
+    assert isinstance(wm.links["k"], LinkRow) and isinstance(wm.links["i"], LinkRow) and wm.links["i"]["reality"] == (0, 0.8)
+    assert asdict(wm) == {"links": {"k": row, "i": {"reality": (0, 0.8)}}}
+    for o in (UserWellbeing(), Personality(), wm):
+        assert not hasattr(o, "__dict__")
+    a = WisePartnerAgent(profile=Profile.DESKTOP)
+    a.state.world_model.links["task:x|external"] = LinkRow(row)
+    s = a.export_state(); b = WisePartnerAgent(profile=Profile.DESKTOP); b.import_state(s)
+    assert b.export_state() == s and json.loads(s)["state"]["world_model"]["links"]["task:x|external"]["reality"] == [-0.03, 0.8]
+
+def test_every_link_row_is_read_only():
+    a = WisePartnerAgent(profile=Profile.DESKTOP)
+    links = a.state.world_model.links
+    links["task:a|external"] = {"reality": (0.01, 0.7)}
+    links.update({"task:b|external": {"reality": [0, 0.8]}}); links.setdefault("task:c|external", {"trust_level": (0.0, 0.5)})
+    links |= {"task:d|external": {"reality": (0.02, 0.6)}}
+    assert all(isinstance(r, LinkRow) for r in links.values())
+    with pytest.raises(TypeError): links["task:a|external"]["reality"] = (0.5, 0.5)    # in-place 書き換えはできない
+    s = a.export_state(); assert '"task:b|external":{"reality":[0,0.8]}' in s
+    b = WisePartnerAgent(profile=Profile.DESKTOP); b.import_state(s)
+    assert all(isinstance(r, LinkRow) for r in b.state.world_model.links.values()) and b.export_state() == s
@@ -1,3 +1,4 @@
+from dataclasses import asdict
 from core.wise_partner_core_v52_plus import GeometryS, WisePartnerAgent, Profile
 
 def test_spd():
@@ -15,7 +16,7 @@ def test_spd():
 def test_g_reality_gate():
     a = WisePartnerAgent(profile=Profile.DESKTOP)
     key = "respond_helpfully|be_kind"
-    before = dict(a.state.user_wellbeing.__dict__)
+    before = asdict(a.state.user_wellbeing)
     after = {**before, "reality": 0.40}  # 低 reality→学習スキップ想定
     a._g_update_links(key, before, after, 0.1, ["project_success_prob","trust_level","stress_level","reality"])
     # 影響が暴走していない（ゲートで抑止）ことだけ確認
@@ -0,0 +1,26 @@
+import json
+from dataclasses import asdict
+from core.conv_replay import replay_conversations, check_determinism
+from core.wise_partner_core_v52_plus import Profile
+from tests.test_cards import make_card, SECRET
+
+def _write(p):
+    card = asdict(make_card(nonce=None))
+    evs = []
+    for c in ("a", "b", "c"):
+        evs.append({"conv": c, "type": "card_on", "card": card})
+        for i in range(3):
+            evs.append({"conv": c, "text": "咳 と 発熱 が ある", "dt_s": 3600 * (i + 1)})
+        evs.append({"conv": c, "type": "kpi", "task": "plan",
+                    "before": {"project_success_prob": .4, "trust_level": .5, "stress_level": .6, "reality": .7},
+                    "after": {"project_success_prob": .5, "trust_level": .6, "stress_level": .5, "reality": .8}})
+    with open(p, "w", encoding="utf-8") as f:
+        for e in evs: f.write(json.dumps(e, ensure_ascii=False) + "\n")
+
+def test_replay_hashes_reproducible_across_workers(tmp_path):
+    p = str(tmp_path / "conv.jsonl"); _write(p)
+    kw = dict(profile=Profile.DESKTOP, card_secret=SECRET)
+    st = replay_conversations(p, **kw)
+    assert st["convs"] == 3 and st["turns"] == 9 and st["card_rejected"] == 0
+    res = check_determinism(p, (1, 2), **kw)
+    assert res["ok"] and res["digests"][0] == st["digest"]
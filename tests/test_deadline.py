@@ -0,0 +1,39 @@
+import json
+from core.wise_partner_core_v52_plus import (
+    WisePartnerAgent, Profile, load_card_from_json_str, card_body_bytes, sig_sign, DEMO_CARD_JSON)
+
+SECRET = bytes.fromhex("22"*32)
+
+def _card(max_ms, max_tokens=4000):
+    d = json.loads(DEMO_CARD_JSON)
+    d["meta"].update(valid_from="2020-01-01T00:00:00Z", valid_to="2099-01-01T00:00:00Z")
+    d["caps"].update(max_ms=max_ms, max_tokens=max_tokens)
+    c = load_card_from_json_str(json.dumps(d))
+    c.meta.sig = sig_sign("HMAC-SHA256", SECRET, card_body_bytes(c))
+    return c
+
+def test_deadline_steps_metric_mode_down():
+    a = WisePartnerAgent(profile=Profile.LAB_STRICT); a.set_audit(True)
+    out = a.respond("計画を立てたい", explain=True, metric_mode="strict", deadline_ms=5)
+    b = a._last_budget
+    assert b["mode_req"] == "strict" and b["mode"] == "line" and b["deadline_ms"] == 5
+    assert "mode=line" in out and "(from strict)" in out and "budget=" in out
+    ev = [e for e in a.audit_tail(10) if e["type"] in ("metric_degraded", "respond")]
+    assert ev[0]["type"] == "metric_degraded" and ev[0]["to"] == "line"
+    assert ev[-1]["mode_req"] == "strict" and ev[-1]["deadline_ms"] == 5
+
+    a = WisePartnerAgent(profile=Profile.DESKTOP)
+    out = a.respond("計画を立てたい", explain=True, deadline_ms=60_000)
+    assert a._last_budget["mode"] == "geo" and "(from" not in out and not a._last_budget["over"]
+    assert "budget=" not in a.respond("計画を立てたい", explain=True)        # 締め切り無しは従来どおり
+
+def test_card_deadline_is_recorded_and_steps_down_only_when_asked():
+    a = WisePartnerAgent(card_secret=SECRET, profile=Profile.DESKTOP)
+    assert a.cards_activate(_card(max_ms=1, max_tokens=50), mode="strict")
+    a._mode_cost_ms["geo"] = 1e6                                             # 見積り上は必ず間に合わない
+    a.respond("計画を立てたい", explain=False)                                # 省略: 記録だけで降格しない
+    assert a._last_budget["deadline_ms"] == 1 and a._last_budget["mode"] == "geo"
+    a.respond("計画を立てたい", explain=False, deadline_ms="card")
+    assert a._last_budget["deadline_ms"] == 1 and a._last_budget["mode"] == "line"
+    a.respond("計画を立てたい", explain=False, deadline_ms=None)              # None は予算なし
+    assert a._last_budget["deadline_ms"] is None and a._last_budget["mode"] == "geo" and not a._last_budget["over"]
@@ -0,0 +1,56 @@
+import threading, time
+import pytest
+from adapters.io_if import AdapterRegistry
+from adapters.event_bus import EventBus, agent_sink
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile
+
+class _Counter:
+    def __init__(self): self.n = 0
+    def pull(self):
+        self.n += 1; return {"type": "tick", "n": self.n}
+
+class _Slow:
+    def act(self, delay=0.0, **kw):
+        time.sleep(delay); return {"ok": True, **kw}
+
+def test_bus_queues_batches_and_actuators():
+    reg = AdapterRegistry(); reg.register_sensor("clock", _Counter()); reg.register_actuator("slow", _Slow())
+    got = []; gate = threading.Event()
+    def deliver(batch):
+        gate.wait(5); got.append(batch)
+    bus = EventBus(reg, deliver, batch_max=8, batch_window_s=0.01)
+    bus.configure("btn", maxsize=3, policy="new")
+    bus.configure("temp", maxsize=4, policy="coalesce")
+    for i in range(5): bus.push("btn", {"type": "press", "i": i})
+    for v in (20.0, 21.0, 22.5): bus.push("temp", {"type": "temp", "key": "room", "v": v})
+    bus.push("temp", {"type": "temp", "key": "hall", "v": 18.0})
+    bus.schedule("clock", interval_s=0.01)
+    bus.start()
+    try:
+        time.sleep(0.1); gate.set()
+        assert bus.flush(5)
+        m = bus.metrics()
+        evs = [e for b in got for e in b]
+        assert all(len(b) <= 8 for b in got) and m["bus"]["events"] == len(evs)
+        assert [e["i"] for e in evs if e["src"] == "btn"] == [0, 1, 2]       # "new": 満杯後の新着を捨てる
+        assert [(e["key"], e["v"]) for e in evs if e["src"] == "temp"] == [("room", 22.5), ("hall", 18.0)]
+        assert m["sources"]["btn"]["dropped"] == 2 and m["sources"]["temp"]["coalesced"] == 2
+        assert m["sources"]["clock"]["pulls"] >= 2 and any(e["src"] == "clock" for e in evs)
+
+        assert bus.act_sync("slow", timeout=2.0, x=1) == {"ok": True, "x": 1}
+        r = bus.act_sync("slow", timeout=0.05, delay=0.5)
+        assert r["ok"] is False and r["error"] == "timeout"
+        a = bus.metrics()["actuators"]["slow"]
+        assert a["calls"] == 2 and a["timeouts"] == 1
+    finally:
+        bus.stop()
+
+def test_agent_sink_routes_user_and_kpi():
+    a = WisePartnerAgent(profile=Profile.DESKTOP); a.set_audit(True)
+    deliver = agent_sink(a)
+    q = {"project_success_prob": .5, "trust_level": .5, "stress_level": .5, "reality": .8}
+    deliver([{"src": "mic", "type": "user", "text": "計画を立てたい"},
+             {"src": "kpi", "type": "kpi", "task": "plan", "before": q, "after": dict(q, trust_level=.6)},
+             {"src": "gps", "type": "loc"}])
+    assert a._turn == 1
+    assert any(e["type"] == "adapter_events" and e.get("counts") == {"gps": 1} for e in a.audit_tail(20))
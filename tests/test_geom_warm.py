@@ -0,0 +1,28 @@
+import GEOM.geometry_strict as G
+
+def _q(p, t, s, r):
+    return {"project_success_prob": p, "trust_level": t, "stress_level": s, "reality": r}
+
+def test_warm_start_hits_converge_to_same_length():
+    G.warm_clear()
+    pairs = [(_q(.30+.01*i, .60, .40, .70), _q(.70, .45-.01*i, .55, .60)) for i in range(4)]
+    cold = []
+    for a, b in pairs:
+        G.warm_clear(); cold.append(G.dist_strict(a, b, steps=20, iters=12, warm=True))
+    G.warm_clear()
+    warm = [G.dist_strict(a, b, steps=20, iters=12, warm=True) for a, b in pairs]
+    st = G.warm_stats()
+    assert st["hits"] == 3 and st["unconverged"] == 0
+    assert st["mean_iters_hit"] < st["mean_iters_miss"]
+    assert all(abs(w - c) / c < 1e-3 for w, c in zip(warm, cold))
+
+def test_warm_stats_consistent_under_threads():
+    import threading
+    G.warm_clear()
+    def run(k):
+        for i in range(6): G.dist_strict(_q(.2+.05*k, .5, .4, .6), _q(.6, .4+.02*i, .5, .7), steps=10, iters=8, warm=True)
+    ths = [threading.Thread(target=run, args=(k,)) for k in range(4)]
+    for t in ths: t.start()
+    for t in ths: t.join()
+    st = G.warm_stats()
+    assert st["shots"] == 24 and st["hits"] + st["misses"] == 24
@@ -0,0 +1,55 @@
+import os, socket, tempfile
+import pytest
+from core.wise_partner_core_v52_plus import GeometryS
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs AF_UNIX")
+
+def _q(a, b, c, d):
+    return {"project_success_prob": a, "trust_level": b, "stress_level": c, "reality": d}
+
+def test_geomd_batch_pipeline_and_fallback():
+    from core.geomd import GeometryDaemon, GeomClient
+    path = os.path.join(tempfile.mkdtemp(prefix="wpg"), "g.sock")  # tmp_path は AF_UNIX の長さ制限を超えがち
+    d = GeometryDaemon(path, workers=0).start()
+    pairs = [(_q(.1, .2, .3, .4), _q(.9, .8, .7, .6)), (_q(.5, .5, .5, .5), _q(.2, .7, .1, .9))]
+    try:
+        c = GeomClient(path)
+        futs = [c.submit("line", pairs), c.submit("line", pairs[::-1])]  # 応答を待たずに2本
+        a, b = [f.result(10) for f in futs]
+        assert a == b[::-1]
+        for (q1, q2), (L, Ln) in zip(pairs, a):
+            assert L == GeometryS.riem_line_length(q1, q2, steps=48)
+            assert Ln == L / GeometryS.ref_length("line")
+        with pytest.raises(RuntimeError): c.dist_many("strict", pairs)  # allow_strict=False
+        assert c.stats()["cache_hits"] == 2
+        c.close()
+
+        assert GeometryS.use_daemon(path)
+        L, st = GeometryS.dist(*pairs[0], mode="line")
+        assert st == {"mode": "line", "via": "daemon"} and L == a[0][0]
+    finally:
+        d.stop()
+    try:
+        L2, st = GeometryS.dist(*pairs[0], mode="line")  # デーモン停止後はローカルで同じ値
+        assert st == {"mode": "line"} and L2 == L
+    finally:
+        GeometryS.use_daemon(None); GeometryS._CLIENT = None
+    assert not GeometryS.use_daemon(path)
+    GeometryS._CLIENT = None
+
+def test_geomd_rejects_short_and_oversized_frames():
+    from core.geomd import GeometryDaemon, GeomClient, _send_frame, _recv_frame, _LEN, _RESP, _MAX_FRAME, ST_ERR
+    path = os.path.join(tempfile.mkdtemp(prefix="wpg"), "g.sock")
+    d = GeometryDaemon(path, workers=0).start()
+    try:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM); s.connect(path); s.settimeout(10)
+        _send_frame(s, b"\x01\x02")                                   # ヘッダより短い要求
+        r = _recv_frame(s)
+        assert _RESP.unpack_from(r, 0)[1] == ST_ERR and r[_RESP.size:] == b"bad request"
+        s.sendall(_LEN.pack(_MAX_FRAME + 1))                          # 上限超えは確保せずに切る
+        assert s.recv(1) == b""
+        s.close()
+        c = GeomClient(path); st = c.stats(); c.close()
+        assert st["errors"] == 1 and st["connections"] == 2
+    finally:
+        d.stop()
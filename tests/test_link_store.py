@@ -0,0 +1,54 @@
+import json
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile
+from core.reward_bridge import RewardBridge
+
+B = {"project_success_prob": .4, "trust_level": .5, "stress_level": .6, "reality": .7}
+A = {"project_success_prob": .5, "trust_level": .6, "stress_level": .5, "reality": .8}
+
+def _agent(cap, policy):
+    a = WisePartnerAgent(profile=Profile.DESKTOP); a.set_audit(True)
+    a.set_link_capacity(cap, policy)
+    return a
+
+def test_lru_and_impact_eviction_keep_protected_row():
+    a = _agent(10, "lru"); rb = RewardBridge(a)
+    rb.report("never_seeded", B, A)                     # 行の無い task は空行を作らない
+    assert "task:never_seeded|external" not in a.state.world_model.links
+    for i in range(12):
+        a.state.world_model.links[f"task:t{i}|external"] = {"trust_level": (0.01*(12-i), 0.8)}
+        rb.report(f"t{i}", B, A)
+    links = a.state.world_model.links
+    assert len(links) <= 10 and "respond_helpfully|be_kind" in links
+    assert "task:t0|external" not in links and "task:t11|external" in links        # 古い順に追い出し
+    assert not any(k.startswith("task:t0|") for k in a._g_opt)
+    assert any(e["type"] == "links_evicted" for e in a.audit_tail(50))
+
+    b = _agent(0, "impact")
+    for i in range(12):
+        b.state.world_model.links[f"task:t{i}|external"] = {"trust_level": (0.01*(i+1), 0.8)}
+    b.state.world_model.links["task:z|external"] = {"trust_level": (0.0, 0.8)}
+    b.set_link_capacity(10)
+    links = b.state.world_model.links
+    assert "task:z|external" not in links                                           # 先に圧縮
+    assert "task:t0|external" not in links and "task:t11|external" in links         # |impact|×conf の小さい順
+    assert [e["type"] for e in b.audit_tail(5)][-2:] == ["links_compacted", "links_evicted"]
+
+def test_import_over_cap_roundtrips_without_eviction():
+    a = _agent(0, "lru")
+    for i in range(60): a.state.world_model.links[f"task:t{i}|external"] = {"trust_level": (0.01*i, 0.8)}
+    s = a.export_state(); h = json.loads(s)["hash"]
+    b = _agent(10, "lru"); b.import_state(s)
+    assert len(b.state.world_model.links) == 61 and b.state_hash() == h                # 復元では追い出さない
+    assert any(e["type"] == "links_over_cap" for e in b.audit_tail(5))
+    RewardBridge(b).report("t5", B, A)
+    assert len(b.state.world_model.links) <= 10                                     # 上限は次の𝒢更新から
+
+def test_cap_off_by_default_and_untouched_rows_not_evicted_first():
+    assert WisePartnerAgent(profile=Profile.DESKTOP)._links_cap == 0
+    a = _agent(0, "lru"); rb = RewardBridge(a); links = a.state.world_model.links
+    for i in range(5):
+        links[f"task:t{i}|external"] = {"trust_level": (0.01, 0.8)}; rb.report(f"t{i}", B, A)
+    for i in range(3): links[f"task:x{i}|external"] = {"trust_level": (0.01, 0.8)}   # tick 無しで直接追加
+    a.set_link_capacity(6)
+    assert all(f"task:x{i}|external" in links for i in range(3))                     # 直接入れた行は後から来た扱い
+    assert "task:t0|external" not in links and "task:t4|external" in links
@@ -0,0 +1,62 @@
+import json, random
+import pytest
+np = pytest.importorskip("numpy")
+from core.population import Population, line_length, geo_length, METRICS, LINK_KEY, ACTS
+from core.wise_partner_core_v52_plus import (
+    WisePartnerAgent, Profile, GeometryS, LinkRow, UserWellbeing, load_card_from_json_str, card_body_bytes, sig_sign, DEMO_CARD_JSON)
+
+SECRET = bytes.fromhex("66"*32)
+T0 = 1_700_000_000.0
+
+def _agent():
+    d = json.loads(DEMO_CARD_JSON)
+    d["meta"].update(valid_from="2020-01-01T00:00:00Z", valid_to="2099-01-01T00:00:00Z")
+    c = load_card_from_json_str(json.dumps(d)); c.meta.sig = sig_sign("HMAC-SHA256", SECRET, card_body_bytes(c))
+    a = WisePartnerAgent(seed=1, card_secret=SECRET, profile=Profile.LAB_STRICT)
+    assert a.cards_activate(c, mode="strict")
+    # conf=1 なら結果シミュレーションの雑音が 0 になり、respond と1ターンずつ突き合わせられる
+    a.state.user_wellbeing = UserWellbeing(0.8, 0.8, 0.2, 0.8)
+    a.state.world_model.links[LINK_KEY] = LinkRow({m: (0.02, 1.0) for m in METRICS})
+    a.coupling.enabled = True; a.set_persona_bleed(True); a.set_audit(True)
+    return a
+
+def test_vectorized_distances_match_geometry():
+    rng = random.Random(3)
+    P = [({m: rng.random() for m in METRICS}, {m: rng.random() for m in METRICS}) for _ in range(12)]
+    emb = lambda qs: np.array([[q["project_success_prob"], q["trust_level"], 1 - q["stress_level"], q["reality"]] for q in qs])
+    v1, v2 = emb([p[0] for p in P]), emb([p[1] for p in P])
+    for mode, f in (("line", line_length), ("geo", geo_length)):
+        want = np.array([GeometryS.dist(q1, q2, mode=mode)[0] for q1, q2 in P])
+        assert np.allclose(f(v1, v2), want, rtol=1e-12, atol=0)
+
+@pytest.mark.parametrize("mode", ["line", "geo"])
+def test_step_matches_respond_and_member_roundtrip(mode):
+    ref = _agent(); ref.set_clock(lambda: T0)
+    pop = Population.replicate(ref, 4, metric_mode=mode, seed=5)
+    for t, text in enumerate(["咳 と 発熱 が つらい", "計画を立てたい", "咳 が 続く"]):
+        now = T0 + 3600*t
+        ref.set_clock(lambda now=now: now)
+        ref.respond(text, explain=False, metric_mode=mode)
+        out = pop.step(text, now=now)
+        ev = [e for e in ref.audit_tail(20) if e["type"] == "respond"][-1]
+        assert np.allclose(out["d_norm"], ev["d_norm"], rtol=1e-9) and np.allclose(out["conf"], ev["conf"], rtol=1e-9)
+        assert (out["act"] == ACTS.index(ev["act"])).all() and out["updated"].all()
+    b = pop.member(2)
+    assert b._turn == ref._turn == 3 and (b.personality.openness, b.personality.agreeableness) == \
+        (ref.personality.openness, ref.personality.agreeableness)
+    rb, rr = b.state.world_model.links[LINK_KEY], ref.state.world_model.links[LINK_KEY]
+    assert all(np.isclose(rb[m][0], rr[m][0], rtol=1e-9) for m in METRICS)
+    assert [(x[0], round(x[1], 12), x[2]) for x in b._wm_traces] == [(x[0], round(x[1], 12), x[2]) for x in ref._wm_traces]
+    assert {k: o.t for k, o in b._g_opt.items()} == {k: o.t for k, o in ref._g_opt.items()}
+    assert np.isclose(b._g_r_baseline, ref._g_r_baseline, rtol=1e-9)
+    assert "mode=" in b.respond("咳 が 出る", explain=True, metric_mode=mode)   # 書き戻した個体はそのまま使える
+
+def test_population_per_member_stimuli_and_noise():
+    a = WisePartnerAgent(seed=2, profile=Profile.LAB_STRICT)
+    pop = Population([a, a._clone(3), a._clone(4)], seed=1)
+    out = pop.step(["計画", "計画", "休みたい"], now=T0)
+    assert out["snapshot"].shape == (3, 4) and out["score"].shape == (3,)
+    assert len(set(np.round(out["score"], 9))) == 3                   # 雑音は個体ごと
+    with pytest.raises(ValueError): pop.step(["計画"], now=T0)
+    with pytest.raises(ValueError): Population([a], metric_mode="strict")
+    assert pop.trace_cap == 0 and pop.member(1)._turn == 1 and a._turn == 0     # カード無しなら痕跡の枠も持たない
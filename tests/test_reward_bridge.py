@@ -0,0 +1,71 @@
+import json
+import pytest
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile, GeometryS
+from core.reward_bridge import RewardBridge
+
+def _agent():
+    a = WisePartnerAgent(profile=Profile.DESKTOP)
+    a.state.world_model.links["task:plan|external"] = {
+        "project_success_prob": (0.02, 0.9), "trust_level": (0.01, 0.8),
+        "stress_level": (-0.01, 0.8), "reality": (0.0, 0.7)}
+    return a
+
+def _write_kpis(p, n=6):
+    with open(p, "w", encoding="utf-8") as f:
+        for i in range(n):
+            b = {"project_success_prob":0.40,"trust_level":0.45,"stress_level":0.60,"reality":0.65}
+            a = {"project_success_prob":0.45+0.02*i,"trust_level":0.55,"stress_level":0.50,"reality":0.70}
+            rec = {"task":"plan","before":b,"after":a}
+            if i % 2: rec["d_norm"] = 0.1
+            f.write(json.dumps(rec) + "\n")
+
+def test_replay_resume_is_deterministic(tmp_path, monkeypatch):
+    src = str(tmp_path / "kpi.jsonl"); _write_kpis(src)
+    ref = _agent(); st = RewardBridge(ref).replay(src, batch=2, workers=1)
+    assert st["records"] == 6 and st["computed_d_norm"] == 3
+
+    prog = str(tmp_path / "kpi.progress")
+    a = _agent(); rb = RewardBridge(a); calls = {"n": 0}
+    orig = RewardBridge.report
+    def boom(self, *args, **kw):
+        calls["n"] += 1
+        if calls["n"] > 4: raise KeyboardInterrupt
+        return orig(self, *args, **kw)
+    monkeypatch.setattr(RewardBridge, "report", boom)
+    with pytest.raises(KeyboardInterrupt):
+        rb.replay(src, batch=2, workers=1, progress=prog, checkpoint_every=2)
+    monkeypatch.setattr(RewardBridge, "report", orig)
+
+    b = _agent(); st2 = RewardBridge(b).replay(src, batch=2, workers=1, progress=prog)
+    assert st2["resumed_from"] == 4 and st2["done"] == 6
+    assert json.loads(b.export_state())["hash"] == json.loads(ref.export_state())["hash"]
+    assert b._g_r_baseline == ref._g_r_baseline
+
+def test_ingest_coalesces_same_task():
+    a = _agent(); rb = RewardBridge(a)
+    rb.start_ingest(maxsize=4, window_s=5.0, drop="new")
+    b = {"project_success_prob":0.40,"trust_level":0.45,"stress_level":0.60,"reality":0.65}
+    for i in range(5):
+        assert rb.submit("plan", b, {**b, "project_success_prob": 0.5+0.01*i, "reality": 0.7}, d_norm=0.1)
+    for i in range(6):
+        rb.submit(f"other{i}", b, b, d_norm=0.0)
+    m = rb.ingest_metrics()
+    assert m["coalesced"] == 4 and m["depth"] == 4 and m["dropped"] == 3
+    assert rb.flush_ingest(timeout=30)
+    m = rb.ingest_metrics()
+    assert m["processed"] == 4 and m["depth"] == 0 and m["errors"] == 0
+    rb.stop_ingest()
+
+def test_ingest_coalesce_keeps_explicit_d_norm():
+    a = _agent(); rb = RewardBridge(a); got = {}
+    def report(task, before, after, metrics=None, d_norm=None): got[task] = d_norm
+    rb.report = report                                                         # 取り込みスレッドが渡す d_norm を記録
+    rb.start_ingest(window_s=5.0)
+    b = {"project_success_prob":0.40,"trust_level":0.45,"stress_level":0.60,"reality":0.65}
+    c = {**b, "project_success_prob": 0.6, "reality": 0.7}
+    rb.submit("p", b, c, d_norm=0.1); rb.submit("p", b, c, d_norm=0.2)        # 最後の明示値
+    rb.submit("q", b, c, d_norm=0.3); rb.submit("q", b, c)                     # 最後が未指定なら合流後のペアで計算
+    rb.submit("r", b, c); rb.submit("r", b, c, d_norm=0.4)
+    assert rb.flush_ingest(timeout=30); rb.stop_ingest()
+    _, want, _ = GeometryS.dist_norm(b, c, mode="geo")
+    assert got["p"] == 0.2 and got["q"] == want and got["r"] == 0.4
@@ -0,0 +1,71 @@
+import json
+import pytest
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile, load_card_from_json_str, card_body_bytes, sig_sign, DEMO_CARD_JSON, LinkRow
+
+SECRET = bytes.fromhex("55"*32)
+
+def _card():
+    d = json.loads(DEMO_CARD_JSON)
+    d["meta"].update(valid_from="2020-01-01T00:00:00Z", valid_to="2099-01-01T00:00:00Z")
+    c = load_card_from_json_str(json.dumps(d))
+    c.meta.sig = sig_sign("HMAC-SHA256", SECRET, card_body_bytes(c))
+    return c
+
+def test_delta_roundtrip_matches_full_export():
+    a = WisePartnerAgent(seed=1, card_secret=SECRET, profile=Profile.DESKTOP)
+    for t in ("計画を立てたい", "少し疲れた"): a.respond(t, explain=False)
+    links = a.state.world_model.links
+    for i in range(50): links[f"act{i}|norm"] = LinkRow({"trust_level": (0.01*i, 0.5), "reality": (0.0, 0.5)})
+    h0 = a.set_delta_sync(); full = a.export_state()
+    b = WisePartnerAgent(seed=2, profile=Profile.DESKTOP); b.import_state(full)
+    assert b.state_root() == h0 and b.state_hash() == json.loads(full)["hash"]
+
+    a.respond("ありがとう、助かった", explain=False)
+    a.personality.openness += 3
+    del links["act3|norm"]; links["act7|norm"] = LinkRow({"trust_level": (0.5, 0.6), "reality": (0.0, 0.5)})
+    links["new|norm"] = LinkRow({"stress_level": (-0.1, 0.7)})
+    assert a.cards_activate(_card(), mode="strict")
+    delta = a.export_delta(h0); d = json.loads(delta)
+    assert d["base"] == h0 and "full" not in d and d["personality"] == {"openness": a.personality.openness}
+    assert "agreeableness" not in d["personality"] and d["cards"]["order"] == [c.meta.id for c in a.card_mgr.active]
+    assert d["links"]["del"] == ["act3|norm"] and {"act7|norm", "new|norm"} <= set(d["links"]["set"])
+    assert len(delta) < len(a.export_state()) / 2
+    assert b.apply_delta(delta) == a.state_root() and b.state_hash() == json.loads(a.export_state())["hash"]
+
+    h1 = d["hash"]
+    a.state.user_wellbeing.trust_level = 0.9
+    d2 = json.loads(a.export_delta(h1))
+    assert set(d2) == {"delta", "version", "base", "hash", "user_wellbeing"}
+    b.apply_delta(json.dumps(d2)); assert b.state_hash() == a.state_hash() and b.state_root() == a.state_root()
+
+    with pytest.raises(ValueError): b.apply_delta(json.dumps(d2))                    # base が違う
+    bad = json.loads(a.export_delta(d2["hash"])); bad["hash"] = "0"*64; bad["personality"] = {"openness": 1}
+    bad["base"] = b.state_root(); before = b.state_hash()
+    with pytest.raises(ValueError): b.apply_delta(json.dumps(bad))
+    assert b.state_hash() == before                                                  # 失敗したら元に戻す
+
+    c = WisePartnerAgent(seed=3, profile=Profile.DESKTOP)
+    d3 = json.loads(a.export_delta("unknown"))
+    assert "full" in d3 and c.apply_delta(json.dumps(d3)) == a.state_root() and c.state_hash() == a.state_hash()
+
+def test_full_delta_over_link_cap_applies():
+    a = WisePartnerAgent(seed=1, profile=Profile.DESKTOP); a.set_link_capacity(0)
+    for i in range(40): a.state.world_model.links[f"act{i}|norm"] = LinkRow({"trust_level": (0.01*i, 0.5)})
+    c = WisePartnerAgent(seed=3, profile=Profile.DESKTOP); c.set_link_capacity(10)
+    d = json.loads(a.export_delta("unknown"))
+    assert "full" in d and c.apply_delta(json.dumps(d)) == a.state_root()           # 上限を超えても追い出さない
+    assert len(c.state.world_model.links) == len(a.state.world_model.links)
+
+def test_delta_sync_is_opt_in_and_compares_rows_by_content():
+    a = WisePartnerAgent(seed=1, profile=Profile.DESKTOP)
+    a.export_state(); a.import_state(a.export_state())
+    assert not a._delta_bases                                                        # 使わなければ起点を記録しない
+    links = a.state.world_model.links
+    links["k|norm"] = {"trust_level": (0.1, 0.5)}
+    h = a.set_delta_sync(); b = WisePartnerAgent(seed=2, profile=Profile.DESKTOP); b.import_state(a.export_state())
+    links["k|norm"] = {"trust_level": (0.1, 0.5)}                                   # 同じ内容の別オブジェクト → 差分なし
+    links["j|norm"] = {"trust_level": [0, 0.5]}
+    d = json.loads(a.export_delta(h))
+    assert set(d["links"]["set"]) == {"j|norm"} and b.apply_delta(json.dumps(d)) == a.state_root()
+    with pytest.raises(TypeError): links["j|norm"]["trust_level"] = (0.3, 0.5)       # 行の in-place 書き換えは不可
+    a.set_delta_sync(False); assert not a._delta_bases
@@ -0,0 +1,42 @@
+import time
+from core.wise_partner_core_v52_plus import WisePartnerAgent, Profile, GeometryS
+
+def _agent():
+    a = WisePartnerAgent(profile=Profile.LAB_STRICT); a.set_audit(True)
+    a._strict_steps, a._strict_iters = 40, 3      # 試験用に軽く
+    a.set_strict_verify("background")
+    return a
+
+def test_background_strict_returns_geo_and_audits_turn():
+    a = _agent()
+    out = a.respond("計画を立てたい", explain=True)             # auto → strict 要求だが応答は geo
+    assert "mode=geo(strict-bg)" in out
+    a.respond("少し休みたい", explain=False, metric_mode="strict")
+    a.strict_flush(timeout=120); assert a._sv_pending == 0
+    ev = {e["turn"]: e for e in a.audit_tail(50) if e["type"] == "strict_verify"}
+    assert set(ev) == {1, 2}
+    r = [e for e in a.audit_tail(50) if e["type"] == "respond"]
+    assert r[0]["mode"] == "geo(strict-bg)" and r[0]["mode_req"] == "strict"
+    assert abs(ev[1]["d_norm_geo"] - r[0]["d_norm"]) < 1e-12 and ev[1]["d_strict"] > 0
+    assert ev[1]["agree"] == (ev[1]["ok_geo"] == ev[1]["ok_strict"])
+
+    b = WisePartnerAgent(profile=Profile.LAB_STRICT); b.set_audit(True)    # 既定は従来どおりその場で strict
+    assert "mode=strict" in b.respond("計画を立てたい", explain=True, deadline_ms=60_000)
+
+def test_disagreement_triggers_deferred_g_correction():
+    a = _agent()
+    key = "respond_helpfully|be_kind"
+    before = {"project_success_prob": 0.5, "trust_level": 0.5, "stress_level": 0.5, "reality": 0.5}
+    after = {"project_success_prob": 0.7, "trust_level": 0.6, "stress_level": 0.4, "reality": 0.6}
+    # theta=0 なら strict は必ず不合格 → geo の「合格」と食い違う
+    a._strict_submit({"turn": 7, "q1": before, "q2": after, "d": 0.0, "d_norm": 0.0, "ok": True, "theta": 0.0,
+                      "g": (key, before, after, list(before))})
+    base0 = a._g_r_baseline
+    t0 = time.perf_counter()
+    while a._sv_pending and time.perf_counter() - t0 < 120: time.sleep(0.01)
+    assert a._g_r_baseline == base0                                         # 補正は応答スレッドで当てる
+    assert not any(e["type"] == "strict_verify" for e in a.audit_tail(50))  # 監査も応答スレッドで出す
+    a.respond("計画を立てたい", explain=False, metric_mode="geo")
+    ev = [e for e in a.audit_tail(50) if e["type"] in ("strict_verify", "g_correction")]
+    assert [e["type"] for e in ev] == ["strict_verify", "g_correction"] and ev[1]["turn"] == 7 and ev[1]["dr"] < 0
+    assert not ev[0]["agree"] and a.strict_flush(timeout=1) == 0
@@ -0,0 +1,25 @@
+import pytest
+from core.surrogate import Surrogate, train, sample_pairs
+from core.wise_partner_core_v52_plus import GeometryS, WisePartnerAgent, Profile
+
+def test_surrogate_train_roundtrip_and_mode(tmp_path):
+    s = train(64, seed=3, val_frac=0.1, strict_steps=20, strict_iters=2, truth_cache=str(tmp_path / "t.json"))
+    assert len(s.coef) == 55 and s.report["train"] == 58 and s.report["val_samples"] == 6
+    assert s.report["val_surrogate_mape"] < s.report["val_line_mape"]
+    p = tmp_path / "m.wpsg"; s.save(str(p))
+    t = Surrogate.load(str(p))
+    assert t.coef == s.coef and t.report == s.report and t.line_steps == 8
+    q1, q2 = sample_pairs(1, seed=5)[0]
+    assert t.dist(q1, q2) == s.dist(q1, q2) == t.dist(q2, q1) and t.dist(q1, q1) < 1e-4
+    b = bytearray(p.read_bytes()); b[-40] ^= 1; p.write_bytes(bytes(b))
+    with pytest.raises(ValueError): Surrogate.load(str(p))
+
+    assert GeometryS.dist(q1, q2, mode="surrogate")[1]["mode"] == "geo(no-surrogate)"
+    GeometryS.set_surrogate(t)
+    try:
+        L, st = GeometryS.dist(q1, q2, mode="surrogate")
+        assert st["mode"] == "surrogate" and L == t.dist(q1, q2)
+        a = WisePartnerAgent(profile=Profile.DESKTOP)
+        assert "mode=surrogate" in a.respond("計画を立てたい", explain=True, metric_mode="surrogate")
+    finally:
+        GeometryS.set_surrogate(None)